@@ -1,10 +1,13 @@
 import json
 import os
+import sys
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional
 from therapist_bot import TherapistBot, LLMCaller
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from openai import OpenAI
 from openai.types.chat import (
     ChatCompletionAssistantMessageParam,
     ChatCompletionMessageParam,
@@ -15,13 +18,36 @@ from dotenv import load_dotenv
 from interviews import INTERVIEWS
 import time
 
+# Share infrastructure (rate limiting, token counting) with dataset_gen
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "dataset_gen"))
+from utils.rate_limiter import get_rate_limiter
+from utils.retry import RATE_LIMIT, RetryPolicy, classify_error, get_circuit_breaker, retry_call
+from utils.token_utils import num_tokens_from_messages
+
 load_dotenv()
 
 class BatchInterviewProcessor:
-    def __init__(self, output_dir: str = "analysis_results", max_retries: int = 3):
+    def __init__(
+        self,
+        output_dir: str = "analysis_results",
+        max_retries: int = 3,
+        max_workers: int = 1,
+    ):
+        """
+        Args:
+            output_dir: Directory for the *_analysis.json files
+            max_retries: Attempts per question/answer analysis when the reply
+                is empty or not valid JSON (API errors are retried per call
+                by the shared retry policy)
+            max_workers: Number of answers analyzed concurrently in
+                process_multiple_interviews (1 keeps the sequential behavior)
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
         self.therapist_bot = TherapistBot()
         self.output_dir = output_dir
         self.max_retries = max_retries
+        self.max_workers = max_workers
         
         # Statistics tracking
         self.stats = {
@@ -31,16 +57,18 @@ class BatchInterviewProcessor:
             "retry_attempts": 0,
             "errors_by_type": {}
         }
+        # Analyses may run on several threads at once
+        self._stats_lock = threading.Lock()
         
-        # Initialize Aval AI client for direct API calls
+        # Direct API calls reuse the bot's Aval AI client (and its connection pool)
         AVALAI_BASE_URL = os.getenv("AVALAI_BASE_URL", "https://api.avalai.ir/v1")
         AVALAI_MODEL = os.getenv("AVALAI_MODEL", "gpt-4o")
         
-        self.client = OpenAI(
-            api_key=os.getenv("AVALAI_API_KEY"),
-            base_url=AVALAI_BASE_URL,
-        )
+        self.client = self.therapist_bot.chat.client
         self.model = AVALAI_MODEL
+        self.rate_limiter = get_rate_limiter().get(AVALAI_BASE_URL, AVALAI_MODEL)
+        self.retry_policy = RetryPolicy()
+        self.circuit_breaker = get_circuit_breaker(AVALAI_BASE_URL)
         
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
@@ -67,17 +95,6 @@ class BatchInterviewProcessor:
         print(f"🔄 Processing Interview: {interview_id}")
         print("=" * 50)
         
-        # Initialize conversation state
-        state = {
-            "messages": [],
-            "current_question_index": 0,
-            "user_responses": [],
-            "questions": questions,
-            "mindmap": self.therapist_bot.mindmap,
-            "mental_health_subjects": self.therapist_bot.mental_health_subjects,
-            "analysis": None,
-        }
-        
         all_analyses = []
         
         # Process each question-answer pair
@@ -86,16 +103,10 @@ class BatchInterviewProcessor:
             print(f"💬 Answer: {answer}")
             
             # Update statistics
-            self.stats["total_questions"] += 1
-            
-            # Update state for current question
-            state["current_question_index"] = i
-            state["user_responses"].append(answer)
-            state["messages"].append(AIMessage(content=question))
-            state["messages"].append(HumanMessage(content=answer))
+            self._count("total_questions")
             
             # Analyze the answer
-            analysis = self._analyze_single_answer(state, question, answer)
+            analysis = self._analyze_single_answer(question, answer)
             if analysis:
                 all_analyses.append({
                     "question_number": i + 1,
@@ -103,10 +114,6 @@ class BatchInterviewProcessor:
                     "answer": answer,
                     "analysis": analysis
                 })
-            
-
-            # Sleep for 5 seconds
-            time.sleep(5)
         
         # Compile final results
         results = {
@@ -114,7 +121,7 @@ class BatchInterviewProcessor:
             "timestamp": datetime.now().isoformat(),
             "total_questions": len(questions),
             "analyses": all_analyses,
-            "processing_stats": self.stats.copy()
+            "processing_stats": self._stats_snapshot()
         }
         
         # Save results to file
@@ -125,7 +132,7 @@ class BatchInterviewProcessor:
         
         return results
     
-    def _analyze_single_answer(self, state: Dict, question: str, answer: str) -> Dict:
+    def _analyze_single_answer(self, question: str, answer: str) -> Dict:
         """
         Analyze a single question-answer pair with retry logic
         """
@@ -142,17 +149,12 @@ class BatchInterviewProcessor:
 
         به عنوان یک روانشناس متخصص سالمندان، پاسخ های کاربر را به صورت جامع و دقیق تحلیل کنید و نشانگرهای سلامت روان را شناسایی کنید.
         """
+        system_prompt += "\n" + self.therapist_bot.knowledge_base_block
 
         analysis_prompt = f"""
             سوال: {question}
             پاسخ کاربر: {answer}
 
-            نشانگرهای سلامت روان:
-            {json.dumps(state["mindmap"], ensure_ascii=False, indent=2)}
-
-            توضیحات موضوعات سلامت روان:
-            {json.dumps(state["mental_health_subjects"], ensure_ascii=False, indent=2)}
-
             لطفاً نشانگرهای سلامت روان را در این پاسخ شناسایی کنید. یک پاسخ می‌تواند چندین نشانگر سالم و یا ناسالم داشته باشد.
 
             لطفاً پاسخ را در قالب JSON زیر ارائه دهید:
@@ -192,12 +194,29 @@ class BatchInterviewProcessor:
                 
                 print(f"📊 Using temperature: {min(temperature, 1.0):.2f}, top_p: {max(top_p, 0.5):.2f}")
                 
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    temperature=min(temperature, 1.0),  # Cap at 1.0
-                    top_p=max(top_p, 0.5),  # Cap at 0.5
-                    messages=messages,
+                estimated_tokens = num_tokens_from_messages(messages, self.model) + 1024
+                
+                def call():
+                    # Block only as long as the provider budget requires
+                    self.rate_limiter.acquire(estimated_tokens)
+                    return self.client.chat.completions.create(
+                        model=self.model,
+                        temperature=min(temperature, 1.0),  # Cap at 1.0
+                        top_p=max(top_p, 0.5),  # Cap at 0.5
+                        messages=messages,
+                    )
+                
+                def on_retry(error, retry, wait_time):
+                    kind = "Rate limit" if classify_error(error) == RATE_LIMIT else type(error).__name__
+                    print(f"🔄 {kind} on API call {retry + 1}, backing off ~{wait_time:.1f} seconds before retry...")
+                    self._count("retry_attempts")
+                
+                # Rate limits, timeouts and 5xx are retried here with backoff (honouring Retry-After)
+                response = retry_call(
+                    call, self.retry_policy, breaker=self.circuit_breaker, limiter=self.rate_limiter, on_retry=on_retry
                 )
+                usage = getattr(response, "usage", None)
+                self.rate_limiter.record_usage(estimated_tokens, getattr(usage, "total_tokens", None))
 
                 # Handle response content
                 content = response.choices[0].message.content
@@ -225,7 +244,7 @@ class BatchInterviewProcessor:
                     
                     analysis_data = json.loads(analysis_text)
                     print("✅ Analysis completed successfully")
-                    self.stats["successful_analyses"] += 1
+                    self._count("successful_analyses")
                     return analysis_data
                     
                 except json.JSONDecodeError as je:
@@ -234,45 +253,46 @@ class BatchInterviewProcessor:
                     
                     if attempt < self.max_retries - 1:
                         print("🔄 Retrying with different parameters...")
-                        self.stats["retry_attempts"] += 1
+                        self._count("retry_attempts")
                         time.sleep(2)  # Wait before retry
                         continue
                     else:
-                        self.stats["failed_analyses"] += 1
-                        self.stats["errors_by_type"]["JSON parsing"] = self.stats["errors_by_type"].get("JSON parsing", 0) + 1
+                        self._count("failed_analyses", error_type="JSON parsing")
                         return {
                             "error": "JSON parsing failed after all retries",
                             "raw_response": analysis_text
                         }
 
             except Exception as e:
+                # Not retryable, or still failing after the retry policy's attempts
                 error_type = type(e).__name__
-                print(f"⚠️ Analysis error on attempt {attempt + 1} ({error_type}): {e}")
-                
-                if attempt < self.max_retries - 1:
-                    # Different wait times based on error type
-                    if "rate" in str(e).lower() or "limit" in str(e).lower():
-                        wait_time = 5 + (attempt * 2)  # Longer wait for rate limits
-                        print(f"🔄 Rate limit detected, waiting {wait_time} seconds before retry...")
-                    else:
-                        wait_time = 2 + attempt  # Progressive backoff for other errors
-                        print(f"🔄 Retrying in {wait_time} seconds...")
-                    
-                    self.stats["retry_attempts"] += 1
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    self.stats["failed_analyses"] += 1
-                    self.stats["errors_by_type"][error_type] = self.stats["errors_by_type"].get(error_type, 0) + 1
-                    return {
-                        "error": f"Analysis failed after {self.max_retries} attempts: {error_type}: {str(e)}",
-                        "error_type": error_type,
-                        "attempts": self.max_retries
-                    }
+                print(f"⚠️ Analysis error on attempt {attempt + 1} ({error_type}, {classify_error(e)}): {e}")
+                self._count("failed_analyses", error_type=error_type)
+                return {
+                    "error": f"Analysis failed: {error_type}: {str(e)}",
+                    "error_type": error_type,
+                    "attempts": attempt + 1
+                }
         
         # This should never be reached, but just in case
         return {"error": "Unexpected error in retry logic"}
     
+    def _count(self, stat: str, error_type: Optional[str] = None):
+        """
+        Increment a statistics counter (thread-safe)
+        """
+        with self._stats_lock:
+            self.stats[stat] += 1
+            if error_type is not None:
+                self.stats["errors_by_type"][error_type] = self.stats["errors_by_type"].get(error_type, 0) + 1
+    
+    def _stats_snapshot(self) -> Dict:
+        """
+        Copy of the statistics, consistent across threads
+        """
+        with self._stats_lock:
+            return {**self.stats, "errors_by_type": dict(self.stats["errors_by_type"])}
+    
     def _save_results(self, results: Dict, interview_id: str):
         """
         Save analysis results to a JSON file
@@ -294,6 +314,9 @@ class BatchInterviewProcessor:
         Returns:
             List of analysis results for each interview
         """
+        if self.max_workers > 1:
+            return self._process_interviews_concurrently(interviews_data)
+        
         all_results = []
         
         for i, interview_data in enumerate(interviews_data):
@@ -307,6 +330,84 @@ class BatchInterviewProcessor:
         
         return all_results
     
+    def _process_interviews_concurrently(self, interviews_data: List[Dict[str, List[str]]]) -> List[Dict]:
+        """
+        Analyze all question/answer pairs of all interviews on a thread pool
+        
+        Each analysis only needs its own question and answer, so pairs from
+        every interview run in parallel (at most max_workers at a time). An
+        interview's results are assembled in question order and saved as soon
+        as its last analysis finishes, in the same format as process_interview.
+        """
+        interviews = []
+        for interview_data in interviews_data:
+            questions = interview_data['questions']
+            answers = interview_data['answers']
+            if len(questions) != len(answers):
+                raise ValueError(f"Questions list ({len(questions)}) and answers list ({len(answers)}) must have the same length")
+            interviews.append({
+                "interview_id": f"interview_{interview_data['id']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                "questions": questions,
+                "answers": answers,
+                "analyses": [None] * len(questions),
+                "remaining": len(questions),
+            })
+        
+        total_pairs = sum(len(interview["questions"]) for interview in interviews)
+        print(f"🔄 Analyzing {total_pairs} answers from {len(interviews)} interviews with {self.max_workers} workers")
+        
+        # Interviews without questions have nothing to wait for
+        results_by_interview: Dict[int, Dict] = {
+            interview_idx: self._assemble_results(interview)
+            for interview_idx, interview in enumerate(interviews)
+            if interview["remaining"] == 0
+        }
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {}
+            for interview_idx, interview in enumerate(interviews):
+                for i, (question, answer) in enumerate(zip(interview["questions"], interview["answers"])):
+                    self._count("total_questions")
+                    future = executor.submit(self._analyze_single_answer, question, answer)
+                    futures[future] = (interview_idx, i)
+            
+            for future in as_completed(futures):
+                interview_idx, i = futures[future]
+                interview = interviews[interview_idx]
+                interview["analyses"][i] = future.result()
+                interview["remaining"] -= 1
+                if interview["remaining"] == 0:
+                    results_by_interview[interview_idx] = self._assemble_results(interview)
+        
+        return [results_by_interview[idx] for idx in range(len(interviews))]
+    
+    def _assemble_results(self, interview: Dict) -> Dict:
+        """
+        Build and save the results of an interview whose analyses are all done
+        """
+        all_analyses = []
+        for i, (question, answer, analysis) in enumerate(zip(interview["questions"], interview["answers"], interview["analyses"])):
+            if analysis:
+                all_analyses.append({
+                    "question_number": i + 1,
+                    "question": question,
+                    "answer": answer,
+                    "analysis": analysis
+                })
+        
+        results = {
+            "interview_id": interview["interview_id"],
+            "timestamp": datetime.now().isoformat(),
+            "total_questions": len(interview["questions"]),
+            "analyses": all_analyses,
+            "processing_stats": self._stats_snapshot()
+        }
+        self._save_results(results, interview["interview_id"])
+        
+        print(f"\n✅ Interview {interview['interview_id']} processed successfully!")
+        print(f"📁 Results saved to: {self.output_dir}/{interview['interview_id']}_analysis.json")
+        
+        return results
+    
     def print_statistics(self):
         """Print processing statistics"""
         print("\n📊 Processing Statistics:")
@@ -341,8 +442,14 @@ def main():
             {"questions": [...], "answers": [...]}
         ]
         results = processor.process_multiple_interviews(interviews)
+    
+    Pass --max-workers N to analyze up to N answers concurrently.
     """
-    processor = BatchInterviewProcessor()
+    parser = argparse.ArgumentParser(description="Analyze interviews for mental health indicators")
+    parser.add_argument("--max-workers", type=int, default=1, help="Number of answers analyzed concurrently (1 = sequential)")
+    args = parser.parse_args()
+    
+    processor = BatchInterviewProcessor(max_workers=args.max_workers)
     
     print("🚀 Starting Batch Interview Processing")
     print("=" * 60)
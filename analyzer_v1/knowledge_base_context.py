@@ -0,0 +1,49 @@
+"""
+Compact knowledge-base context for answer analysis.
+
+The mindmap and subject descriptions are serialized once, minified and with
+stable key order, so every analysis request carries a byte-identical block in
+its system message (which lets provider-side prompt caching hit).
+"""
+import sys
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+# Share token counting with dataset_gen
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "dataset_gen"))
+from utils.token_utils import compare_token_counts
+
+
+def _minified(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def _indented(data: Any) -> str:
+    # The per-call rendering used before the compact block
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def build_knowledge_base_block(mindmap: Dict, mental_health_subjects: Any) -> str:
+    """
+    Build the knowledge-base block placed in the analysis system message
+    """
+    return (
+        "نشانگرهای سلامت روان:\n"
+        f"{_minified(mindmap)}\n\n"
+        "توضیحات موضوعات سلامت روان:\n"
+        f"{_minified(mental_health_subjects)}"
+    )
+
+
+def knowledge_base_token_report(mindmap: Dict, mental_health_subjects: Any, block: str, model: str) -> Dict[str, int]:
+    """
+    Token counts of the old indented knowledge-base dump vs. the compact block
+    """
+    before = (
+        "نشانگرهای سلامت روان:\n"
+        f"{_indented(mindmap)}\n\n"
+        "توضیحات موضوعات سلامت روان:\n"
+        f"{_indented(mental_health_subjects)}"
+    )
+    return compare_token_counts(before, block, model)
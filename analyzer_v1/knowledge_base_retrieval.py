@@ -0,0 +1,225 @@
+"""
+Evaluation of question-relevant retrieval over the mental health subject descriptions.
+
+Secondary subjects from knowledge_base/mental_health_subjects.py are indexed
+offline with TF-IDF over their Persian names and descriptions, and the index
+is scored against the subject labels in analysis_results/*.json:
+
+    python knowledge_base_retrieval.py --results analysis_results --top-k 8 16 20
+
+Measured on analysis_results (631 labels over 234 Q/A pairs, 30 subjects),
+the index is only a little better than picking subjects at random:
+
+    k     label recall    random
+    8     36.5%           26.7%
+    16    59.4%           53.3%
+    20    70.5%           66.7%
+
+Always sending the 8 most frequently labeled subjects already covers 65.1%
+of the labels, so the text of a Q/A pair says little about which subjects
+the analysis will use. The analyzer therefore keeps sending all 30 subject
+descriptions (a compact, cached block, see knowledge_base_context.py); this
+module only exists to measure retrieval approaches.
+"""
+import re
+import sys
+import json
+import math
+import argparse
+from glob import glob
+from pathlib import Path
+from collections import Counter
+from typing import Dict, List, Optional
+
+# Share the knowledge base with dataset_gen
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "dataset_gen"))
+
+# Arabic code points commonly mixed into Persian text, and diacritics/tatweel
+_CHAR_MAP = str.maketrans({"ي": "ی", "ى": "ی", "ك": "ک", "ة": "ه", "ۀ": "ه", "أ": "ا", "إ": "ا", "آ": "ا", "‌": " "})
+_DIACRITICS = re.compile(r"[ً-ٰٟـ]")
+_TOKEN = re.compile(r"\w+")
+
+# Frequent function words that carry no subject information
+STOPWORDS = {
+    "و", "در", "به", "از", "که", "را", "با", "این", "آن", "برای", "یا", "هم", "نیز", "تا", "بر",
+    "است", "هست", "بود", "شود", "شده", "میشود", "می", "کند", "میکند", "کرد", "کرده", "دارد", "داشته",
+    "خود", "او", "ما", "من", "شما", "ها", "های", "یک", "هر", "اگر", "چه", "چون", "ولی", "اما",
+    "مثل", "مانند", "عنوان", "مثال", "همچنین", "بدین", "معنی", "سالمند", "سالمندان", "دارای", "سلامت", "معنوی",
+}
+
+INDEX_FIELDS = ("subject_id", "aspect", "relational_reference")
+
+# Prefix length used as a stem; on analysis_results 3 gives label recall@8 of
+# 36.5% (no prefixes: 30.9%, 4: 34.1%, 5: 34.4%)
+PREFIX_LENGTH = 3
+
+
+def normalize_persian(text: str) -> str:
+    """
+    Unify Arabic/Persian letter variants and drop diacritics and ZWNJ
+    """
+    return _DIACRITICS.sub("", text.translate(_CHAR_MAP))
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split normalized text into terms: words plus short prefixes
+
+    The prefixes give a light, dependency-free stemming for Persian suffixes
+    (e.g. "پذیرش" / "پذیرندگی" / "پذیرا").
+    """
+    terms = []
+    for word in _TOKEN.findall(normalize_persian(text).lower()):
+        if word in STOPWORDS or len(word) < 2 or word.isdigit():
+            continue
+        terms.append(word)
+        if len(word) > PREFIX_LENGTH:
+            terms.append(word[:PREFIX_LENGTH] + "*")
+    return terms
+
+
+def load_mental_health_subjects() -> List[Dict]:
+    """
+    Load MENTAL_HEALTH_SUBJECTS from the dataset_gen knowledge base
+    """
+    from knowledge_base.mental_health_subjects import MENTAL_HEALTH_SUBJECTS
+    return MENTAL_HEALTH_SUBJECTS
+
+
+class SubjectRetriever:
+    """
+    Offline TF-IDF index over secondary subjects
+    """
+
+    def __init__(self, mental_health_subjects: Optional[List[Dict]] = None):
+        """
+        Args:
+            mental_health_subjects: Subject categories with 'secondary_subjects'
+                (defaults to knowledge_base/mental_health_subjects.py)
+        """
+        if mental_health_subjects is None:
+            mental_health_subjects = load_mental_health_subjects()
+
+        # One entry per secondary subject, tagged with its category's subject_id
+        self.entries: List[Dict] = []
+        for category in mental_health_subjects:
+            for secondary in category["secondary_subjects"]:
+                self.entries.append({
+                    "subject_id": category["subject_id"],
+                    "category": category["subject_name"],
+                    **secondary,
+                })
+
+        documents = [
+            tokenize(" ".join([entry["subject_name"]] * 3 + [entry["category"], entry.get("description", "")]))
+            for entry in self.entries
+        ]
+        document_frequency = Counter(term for doc in documents for term in set(doc))
+        n_docs = len(documents)
+        self.idf = {term: math.log((1 + n_docs) / (1 + df)) + 1 for term, df in document_frequency.items()}
+        self.vectors = [self._vectorize(doc) for doc in documents]
+
+    def _vectorize(self, terms: List[str]) -> Dict[str, float]:
+        counts = Counter(term for term in terms if term in self.idf)
+        vector = {term: (1 + math.log(count)) * self.idf[term] for term, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {term: weight / norm for term, weight in vector.items()}
+
+    def search(self, question: str, answer: str, top_k: int = 8, **filters) -> List[Dict]:
+        """
+        Rank secondary subjects by relevance to a question/answer pair
+
+        Args:
+            question: Interview question
+            answer: User's answer
+            top_k: Number of entries to return
+            **filters: Optional exact-match filters on subject_id, aspect or
+                relational_reference
+
+        Returns:
+            Top-k subject entries, most relevant first
+        """
+        unknown = set(filters) - set(INDEX_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown filter field(s): {sorted(unknown)}")
+
+        query = self._vectorize(tokenize(f"{question} {answer}"))
+        scored = []
+        for idx, (entry, vector) in enumerate(zip(self.entries, self.vectors)):
+            if any(entry.get(field) != value for field, value in filters.items()):
+                continue
+            score = sum(weight * vector.get(term, 0.0) for term, weight in query.items())
+            scored.append((-score, idx))
+        scored.sort()
+        return [self.entries[idx] for _, idx in scored[:top_k]]
+
+    def subject_names(self) -> set:
+        """
+        Names of all indexed secondary subjects
+        """
+        return {entry["subject_name"] for entry in self.entries}
+
+
+def evaluate_hit_rate(retriever: SubjectRetriever, results_dir: str, top_k: int) -> Dict[str, float]:
+    """
+    Measure retrieval against the subject labels of saved analyses
+
+    Only labels naming an indexed secondary subject are counted (mindmap
+    leaves such as emotions are not part of the index).
+
+    Returns:
+        Dictionary with label recall@k (and the recall of picking k subjects
+        at random), the share of Q/A pairs with at least one labeled subject
+        retrieved, and the counts they are based on
+    """
+    names = retriever.subject_names()
+    labels = retrieved = pairs = pairs_hit = 0
+    for path in sorted(glob(str(Path(results_dir) / "*_analysis.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            results = json.load(f)
+        for item in results.get("analyses", []):
+            analysis = item.get("analysis")
+            if not isinstance(analysis, dict):
+                continue
+            gold = {
+                indicator.get("subject")
+                for key in ("healthy", "unhealthy")
+                for indicator in analysis.get(key, []) or []
+                if isinstance(indicator, dict) and indicator.get("subject") in names
+            }
+            if not gold:
+                continue
+            found = {entry["subject_name"] for entry in retriever.search(item["question"], item["answer"], top_k)}
+            labels += len(gold)
+            retrieved += len(gold & found)
+            pairs += 1
+            pairs_hit += bool(gold & found)
+    return {
+        "top_k": top_k,
+        "label_recall": retrieved / labels if labels else 0.0,
+        "random_recall": min(1.0, top_k / len(retriever.entries)) if retriever.entries else 0.0,
+        "pair_hit_rate": pairs_hit / pairs if pairs else 0.0,
+        "labels": labels,
+        "pairs": pairs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure subject retrieval hit rate against saved analyses")
+    parser.add_argument("--results", type=str, default="analysis_results", help="Directory with *_analysis.json files")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[4, 8, 12, 16], help="Values of k to evaluate")
+    args = parser.parse_args()
+
+    retriever = SubjectRetriever()
+    print(f"📚 Indexed {len(retriever.entries)} secondary subjects")
+    for top_k in args.top_k:
+        report = evaluate_hit_rate(retriever, args.results, top_k)
+        print(
+            f"k={top_k:>2}: label recall {report['label_recall']:.1%} (random {report['random_recall']:.1%}), "
+            f"Q/A hit rate {report['pair_hit_rate']:.1%} "
+            f"({report['labels']} labels over {report['pairs']} Q/A pairs)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ from typing import List, Dict, TypedDict
 from langchain.output_parsers import PydanticOutputParser
 import json
 import os
+import sys
+from pathlib import Path
 from openai import OpenAI
 from openai.types.chat import (
     ChatCompletionAssistantMessageParam,
@@ -14,6 +16,12 @@ from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import InMemorySaver
 from dotenv import load_dotenv
 from graph.output.models import MentalHealthAnalysis, MentalHealthIndicator
+from knowledge_base_context import build_knowledge_base_block, knowledge_base_token_report
+
+# Share the pooled HTTP clients and the retry policy with dataset_gen
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "dataset_gen"))
+from utils.http_clients import get_http_client_pool
+from utils.retry import RetryPolicy, get_circuit_breaker, retry_call
 
 load_dotenv()
 
@@ -29,9 +37,10 @@ class ConversationState(TypedDict):
 
 
 class LLMCaller:
-    def __init__(self, client: OpenAI, model: str):
+    def __init__(self, client: OpenAI, model: str, retry_policy: RetryPolicy | None = None):
         self.client = client
         self.model = model
+        self.retry_policy = retry_policy or RetryPolicy()
 
     def _role(self, m):
         return "assistant" if m.type == "ai" else "user" if m.type == "human" else "system"
@@ -72,11 +81,15 @@ class LLMCaller:
     def invoke(self, messages: List, model: str | None = None):
         payload: List[ChatCompletionMessageParam] = self._build_payload(messages)
         model_to_use = model or self.model
-        resp = self.client.chat.completions.create(
-            model=model_to_use,
-            temperature=0.7,
-            top_p=0.9,
-            messages=payload,
+        resp = retry_call(
+            lambda: self.client.chat.completions.create(
+                model=model_to_use,
+                temperature=0.7,
+                top_p=0.9,
+                messages=payload,
+            ),
+            self.retry_policy,
+            breaker=get_circuit_breaker(str(self.client.base_url)),
         )
         # Return a response object that mimics langchain's response
         class Response:
@@ -94,6 +107,8 @@ class TherapistBot:
         client = OpenAI(
             api_key=os.getenv("AVALAI_API_KEY"),
             base_url=AVALAI_BASE_URL,
+            http_client=get_http_client_pool().get(AVALAI_BASE_URL),
+            max_retries=0,  # retried by LLMCaller / BatchInterviewProcessor
         )
         
         self.chat = LLMCaller(client, AVALAI_MODEL)
@@ -106,6 +121,16 @@ class TherapistBot:
         with open("knowledge_base/mental_health_subjects.json", "r", encoding="utf-8") as f:
             self.mental_health_subjects = json.load(f)
 
+        # Built once: identical bytes in every analysis system message
+        self.knowledge_base_block = build_knowledge_base_block(self.mindmap, self.mental_health_subjects)
+        token_report = knowledge_base_token_report(
+            self.mindmap, self.mental_health_subjects, self.knowledge_base_block, AVALAI_MODEL
+        )
+        print(
+            f"📚 Knowledge base context: {token_report['before_tokens']} -> {token_report['after_tokens']} tokens "
+            f"({token_report['saved_tokens']} saved per analysis)"
+        )
+
         # self.questions = [
         #     "از مسیری که در زندگی طی کرده اید و مرور گذشته چه احساسی دارید؟",
         #     "دوره سالمندی را توصیف کنید",
@@ -226,18 +251,12 @@ class TherapistBot:
 
         به عنوان یک روانشناس متخصص سالمندان، پاسخ های کاربر را به صورت جامع و دقیق تحلیل کنید و نشانگرهای سلامت روان را شناسایی کنید.
         گام به گام جواب های کاربر را تحلیل کنید و دلایل منطقی انتخاب را بیان کنید.
-        """
+        """ + "\n" + self.knowledge_base_block
 
         analysis_prompt = f"""
             سوال: {current_question}
             پاسخ کاربر: {current_response}
 
-            نشانگرهای سلامت روان:
-            {json.dumps(state["mindmap"], ensure_ascii=False, indent=2)}
-
-            توضیحات موضوعات سلامت روان:
-            {json.dumps(state["mental_health_subjects"], ensure_ascii=False, indent=2)}
-
             لطفاً نشانگرهای سلامت روان را در این پاسخ شناسایی کنید. یک پاسخ می‌تواند چندین نشانگر سالم و یا ناسالم داشته باشد.
 
 
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+Offline mock of the OpenAI-compatible endpoints used by the generators.
+
+Serves `POST /v1/chat/completions` (optionally streamed), `POST /v1/files`, `GET /v1/files/{id}`,
+`GET /v1/files/{id}/content`, `POST /v1/batches` and `GET /v1/batches/{id}`
+with configurable latency, server errors and 429 rate-limit responses, so
+throughput can be measured without spending API credits. Chat completions
+report `prompt_tokens_details.cached_tokens` for the longest message prefix
+seen before, like a provider-side prompt cache.
+
+Answers are synthetic but shaped like the real ones: persona requests get a
+JSON array of the requested size, analyzer requests get a healthy/unhealthy
+JSON object and interview turns get a short Persian answer.
+"""
+import re
+import sys
+import json
+import time
+import uuid
+import hashlib
+import random
+import logging
+import argparse
+import threading
+from pathlib import Path
+from email.parser import BytesParser
+from email.policy import HTTP
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models.persona_schema import (
+    PERSONA_FIELD_VALUES,
+    PERSONA_INT_RANGES,
+    PERSONA_LIST_LENGTHS,
+    REQUIRED_PERSONA_FIELDS,
+)
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+_COUNT_PATTERN = re.compile(r"(?:Complete all|Generate)\s+(\d+)\s+persona")
+
+
+@dataclass
+class MockServerConfig:
+    """Behaviour of the mock server."""
+
+    latency_ms: float = 50.0            # Mean latency of a chat completion
+    latency_jitter_ms: float = 20.0     # Uniform jitter added to the latency
+    ms_per_output_token: float = 0.0    # Extra latency per generated token
+    error_rate: float = 0.0             # Share of requests answered with HTTP 500
+    rate_limit_rate: float = 0.0        # Share of requests answered with HTTP 429
+    retry_after_seconds: float = 1.0    # Retry-After header on 429 responses
+    batch_latency_s: float = 1.0        # Time a batch stays in progress
+    answer_tokens: int = 80             # Approximate length of interview answers
+    seed: Optional[int] = None
+
+
+_MORAL_TRAITS = ["صبر", "قناعت", "امید", "صداقت"]
+
+
+def _persona(index: int) -> Dict[str, Any]:
+    """
+    Synthetic completed persona that passes `validate_persona`.
+
+    Every field of the persona schema is filled with an accepted value,
+    cycling through the allowed values by index.
+    """
+    persona: Dict[str, Any] = {}
+    for name in sorted(REQUIRED_PERSONA_FIELDS):
+        if name in PERSONA_FIELD_VALUES:
+            values = PERSONA_FIELD_VALUES[name]
+            persona[name] = values[index % len(values)]
+        elif name in PERSONA_INT_RANGES:
+            low, high = PERSONA_INT_RANGES[name]
+            persona[name] = low + index % (high - low + 1)
+        elif name in PERSONA_LIST_LENGTHS:
+            low, high = PERSONA_LIST_LENGTHS[name]
+            persona[name] = _MORAL_TRAITS[:low + index % (high - low + 1)]
+        else:
+            persona[name] = f"مقدار {index}"
+    return persona
+
+
+def synthetic_answer(body: Dict[str, Any], answer_tokens: int) -> str:
+    """
+    Build a plausible answer for a chat completion request body.
+
+    Args:
+        body: Chat completion request body
+        answer_tokens: Approximate length of interview answers
+
+    Returns:
+        Response content
+    """
+    messages = body.get("messages") or []
+    text = "\n".join(str(m.get("content", "")) for m in messages)
+    last = str(messages[-1].get("content", "")) if messages else ""
+
+    match = _COUNT_PATTERN.search(last)
+    if match:
+        return json.dumps([_persona(i) for i in range(int(match.group(1)))], ensure_ascii=False)
+    if "unhealthy" in text:
+        return json.dumps({"unhealthy": [], "healthy": [{
+            "aspect": "belief", "subject": "پذیرندگی",
+            "based_on_answer": last[:40], "reasoning": "پاسخ آزمایشی",
+        }]}, ensure_ascii=False)
+    return " ".join(["این یک پاسخ آزمایشی است."] * max(1, answer_tokens // 8))
+
+
+def chat_completion(body: Dict[str, Any], answer_tokens: int, cached_tokens: int = 0) -> Dict[str, Any]:
+    """Build a ChatCompletion response dict for a request body."""
+    content = synthetic_answer(body, answer_tokens)
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages") or []) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": content},
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": min(cached_tokens, prompt_tokens)},
+        },
+    }
+
+
+class MockState:
+    """Files, batches and counters shared by all request handlers."""
+
+    def __init__(self, config: MockServerConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.counters = {
+            "chat": 0, "errors": 0, "rate_limited": 0, "files": 0, "batches": 0,
+            "prompt_tokens": 0, "cached_tokens": 0,
+        }
+        self.prefixes = set()
+        self.lock = threading.Lock()
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.counters[name] += 1
+
+    def cached_prompt_tokens(self, messages) -> int:
+        """
+        Tokens of the longest message prefix seen in an earlier request.
+
+        Every message prefix of the request is remembered, so a request that
+        repeats an earlier one and appends to it is served mostly from cache.
+        """
+        digest = hashlib.sha256()
+        chars = cached_chars = 0
+        with self.lock:
+            for message in messages or []:
+                digest.update(json.dumps(message, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+                chars += len(str(message.get("content", "")))
+                key = digest.copy().digest()
+                if key in self.prefixes:
+                    cached_chars = chars
+                else:
+                    self.prefixes.add(key)
+            self.counters["prompt_tokens"] += chars // 4
+            self.counters["cached_tokens"] += cached_chars // 4
+        return cached_chars // 4
+
+    def fault(self) -> Optional[int]:
+        """Pick an injected failure status (429/500) or None."""
+        with self.lock:
+            roll = self.random.random()
+        if roll < self.config.rate_limit_rate:
+            return 429
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            return 500
+        return None
+
+    def add_file(self, filename: str, purpose: str, data: bytes) -> Dict[str, Any]:
+        file_obj = {
+            "id": f"file-{uuid.uuid4().hex[:24]}",
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        with self.lock:
+            self.files[file_obj["id"]] = {"meta": file_obj, "data": data}
+        return file_obj
+
+    def create_batch(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex[:24]}",
+            "object": "batch",
+            "endpoint": body.get("endpoint", "/v1/chat/completions"),
+            "input_file_id": body["input_file_id"],
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "in_progress",
+            "created_at": int(time.time()),
+            "metadata": body.get("metadata"),
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        }
+        with self.lock:
+            self.batches[batch["id"]] = batch
+        timer = threading.Timer(self.config.batch_latency_s, self._complete_batch, args=(batch["id"],))
+        timer.daemon = True
+        timer.start()
+        return batch
+
+    def _complete_batch(self, batch_id: str) -> None:
+        """Answer every request of a batch and attach output/error files."""
+        with self.lock:
+            batch = self.batches[batch_id]
+            data = self.files[batch["input_file_id"]]["data"]
+        outputs, errors = [], []
+        for line in data.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            record = {"id": f"batch_req_{uuid.uuid4().hex[:16]}", "custom_id": request["custom_id"]}
+            if self.fault() == 500:
+                errors.append({**record, "response": None, "error": {"code": "server_error", "message": "Injected error"}})
+                continue
+            outputs.append({**record, "response": {
+                "status_code": 200,
+                "request_id": uuid.uuid4().hex,
+                "body": chat_completion(request["body"], self.config.answer_tokens),
+            }, "error": None})
+
+        def to_file(records, name):
+            if not records:
+                return None
+            payload = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+            return self.add_file(name, "batch_output", payload)["id"]
+
+        output_file_id = to_file(outputs, f"{batch_id}_output.jsonl")
+        error_file_id = to_file(errors, f"{batch_id}_errors.jsonl")
+        with self.lock:
+            batch.update({
+                "status": "completed",
+                "completed_at": int(time.time()),
+                "output_file_id": output_file_id,
+                "error_file_id": error_file_id,
+                "request_counts": {"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)},
+            })
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """HTTP handler dispatching to the mock endpoints."""
+
+    server_version = "MockOpenAI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self) -> MockState:
+        return self.server.state  # type: ignore[attr-defined]
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int, message: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self._send_json(status, {"error": {"message": message, "type": "mock_error", "code": status}}, headers)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _route(self) -> Tuple[str, ...]:
+        path = self.path.split("?", 1)[0].rstrip("/")
+        parts = [p for p in path.split("/") if p]
+        if parts and parts[0] == "v1":
+            parts = parts[1:]
+        return tuple(parts)
+
+    def do_POST(self) -> None:
+        route = self._route()
+        body = self._read_body()
+        if route == ("chat", "completions"):
+            self._chat_completions(json.loads(body or b"{}"))
+        elif route == ("files",):
+            self._upload_file(body)
+        elif route == ("batches",):
+            self.state.count("batches")
+            self._send_json(200, self.state.create_batch(json.loads(body or b"{}")))
+        else:
+            self._send_error(404, f"Unknown endpoint POST {self.path}")
+
+    def do_GET(self) -> None:
+        route = self._route()
+        with self.state.lock:
+            if len(route) >= 2 and route[0] == "files":
+                entry = self.state.files.get(route[1])
+            elif len(route) == 2 and route[0] == "batches":
+                entry = self.state.batches.get(route[1])
+                entry = dict(entry) if entry else None
+            else:
+                entry = None
+        if entry is None:
+            self._send_error(404, f"Not found: {self.path}")
+        elif route[0] == "batches":
+            self._send_json(200, entry)
+        elif len(route) == 3 and route[2] == "content":
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(entry["data"])))
+            self.end_headers()
+            self.wfile.write(entry["data"])
+        else:
+            self._send_json(200, entry["meta"])
+
+    def _chat_completions(self, body: Dict[str, Any]) -> None:
+        config = self.state.config
+        self.state.count("chat")
+        fault = self.state.fault()
+        if fault == 429:
+            self.state.count("rate_limited")
+            self._send_error(429, "Rate limit reached (mock)", {"Retry-After": str(config.retry_after_seconds)})
+            return
+        if fault == 500:
+            self.state.count("errors")
+            self._send_error(500, "Internal server error (mock)")
+            return
+
+        response = chat_completion(body, config.answer_tokens, self.state.cached_prompt_tokens(body.get("messages")))
+        with self.state.lock:
+            jitter = self.state.random.uniform(-config.latency_jitter_ms, config.latency_jitter_ms)
+        if body.get("stream"):
+            self._stream_chat_completion(body, response, max(0.0, config.latency_ms + jitter))
+            return
+        delay_ms = config.latency_ms + jitter + config.ms_per_output_token * response["usage"]["completion_tokens"]
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+        self._send_json(200, response)
+
+    def _stream_chat_completion(self, body: Dict[str, Any], response: Dict[str, Any], first_token_ms: float) -> None:
+        """Send a completion as server-sent `chat.completion.chunk` events."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        # No Content-Length: the end of the stream is marked by closing the connection
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta: Dict[str, Any], finish_reason: Optional[str] = None, usage: Optional[Dict] = None) -> None:
+            chunk = {
+                "id": response["id"],
+                "object": "chat.completion.chunk",
+                "created": response["created"],
+                "model": response["model"],
+                "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            if usage:
+                chunk["usage"] = usage
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        time.sleep(first_token_ms / 1000.0)
+        content = response["choices"][0]["message"]["content"]
+        piece = 64
+        for start in range(0, len(content), piece):
+            event({"content": content[start:start + piece]} if start else {"role": "assistant", "content": content[:piece]})
+            time.sleep(self.state.config.ms_per_output_token * (piece // 4) / 1000.0)
+        event({}, finish_reason="stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            event({}, usage=response["usage"])
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _upload_file(self, body: bytes) -> None:
+        # Parse the multipart/form-data upload with the stdlib email parser
+        header = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode("utf-8")
+        message = BytesParser(policy=HTTP).parsebytes(header + body)
+        fields, data, filename = {}, b"", "upload.jsonl"
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if part.get_filename():
+                filename = part.get_filename()
+                data = part.get_payload(decode=True) or b""
+            elif name:
+                fields[name] = part.get_content().strip()
+        self.state.count("files")
+        self._send_json(200, self.state.add_file(filename, fields.get("purpose", "batch"), data))
+
+
+class MockOpenAIServer:
+    """Mock server running on a background thread (usable as a context manager)."""
+
+    def __init__(self, config: Optional[MockServerConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        Initialize mock server.
+
+        Args:
+            config: Server behaviour (latency, failures, batch timing)
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+        """
+        self.config = config or MockServerConfig()
+        self.state = MockState(self.config)
+        self.httpd = ThreadingHTTPServer((host, port), MockRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = self.state  # type: ignore[attr-defined]
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to pass to the OpenAI client."""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockOpenAIServer":
+        """Start serving on a background thread."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Mock OpenAI server listening on {self.base_url}")
+        return self
+
+    def stop(self) -> None:
+        """Stop the server."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "MockOpenAIServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an offline mock OpenAI-compatible server")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port to bind")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mean chat completion latency (ms)")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="Uniform latency jitter (ms)")
+    parser.add_argument("--ms-per-token", type=float, default=0.0, help="Extra latency per output token (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with HTTP 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on 429 responses")
+    parser.add_argument("--batch-latency", type=float, default=1.0, help="Seconds until a batch completes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    config = MockServerConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.jitter_ms,
+        ms_per_output_token=args.ms_per_token,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after_seconds=args.retry_after,
+        batch_latency_s=args.batch_latency,
+    )
+    server = MockOpenAIServer(config, args.host, args.port)
+    print(f"Mock server running at {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
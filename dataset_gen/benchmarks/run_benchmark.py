@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmark against the offline mock server.
+
+Drives the interview generators (sequential, async and Batch API waves),
+persona batch generation through BatchProcessor, and the analyzer's
+BatchInterviewProcessor against `mock_server.py`. Reports throughput,
+p50/p95 request latency and memory per scenario, and can compare the
+results with a saved baseline so performance regressions show up before a
+real run.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+import tempfile
+import tracemalloc
+import contextlib
+from pathlib import Path
+from functools import wraps
+from statistics import quantiles
+from typing import Callable, Dict, List
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from mock_server import MockOpenAIServer, MockServerConfig
+from generators import PersonaGenerator
+from generators.interview_generator import DatasetGenerator, AsyncDatasetGenerator, BatchDatasetGenerator
+from utils import (
+    LLMClient,
+    AsyncLLMClient,
+    BatchProcessor,
+    create_openai_client,
+    create_async_openai_client,
+    add_rate_limit,
+)
+from questions import INTERVIEW_QUESTIONS
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gpt-4o-mini"
+ANALYZER_DIR = Path(__file__).resolve().parent.parent.parent / "analyzer_v1"
+SCENARIOS = ["interviews", "interviews_async", "interviews_batch", "personas_batch", "analyzer"]
+
+
+class LatencyRecorder:
+    """Collects per-request latencies of a (sync or async) client method."""
+
+    def __init__(self):
+        self.samples: List[float] = []
+
+    def wrap(self, func: Callable) -> Callable:
+        @wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.samples.append(time.perf_counter() - start)
+        return timed
+
+    def wrap_async(self, func: Callable) -> Callable:
+        @wraps(func)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.samples.append(time.perf_counter() - start)
+        return timed
+
+    def percentiles(self) -> Dict[str, float]:
+        """p50/p95 latency in milliseconds."""
+        if len(self.samples) < 2:
+            value = self.samples[0] * 1000 if self.samples else 0.0
+            return {"p50_ms": value, "p95_ms": value}
+        cuts = quantiles(self.samples, n=100, method="inclusive")
+        return {"p50_ms": cuts[49] * 1000, "p95_ms": cuts[94] * 1000}
+
+
+def timed_client(client, recorder: LatencyRecorder, async_: bool = False):
+    """Record the latency of every chat completion made through `client`."""
+    completions = client.chat.completions
+    wrap = recorder.wrap_async if async_ else recorder.wrap
+    completions.create = wrap(completions.create)
+    return client
+
+
+def load_benchmark_personas(count: int) -> List[Dict]:
+    """Reference personas from the knowledge base, cycled to `count` with unique ids."""
+    with open(Path(__file__).parent.parent / "knowledge_base" / "personas.json", "r", encoding="utf-8") as f:
+        reference = json.load(f)
+    return [{**reference[i % len(reference)], "id": f"bench_{i}"} for i in range(count)]
+
+
+def run_interviews(base_url: str, args, mode: str) -> Dict:
+    """Run one interview generator mode; returns units (turns) and latencies."""
+    personas = load_benchmark_personas(args.personas)
+    questions = INTERVIEW_QUESTIONS[:args.questions]
+    recorder = LatencyRecorder()
+    with tempfile.TemporaryDirectory() as output_dir:
+        if mode == "async":
+            client = timed_client(create_async_openai_client("mock", base_url), recorder, async_=True)
+            generator = AsyncDatasetGenerator(
+                personas, questions, [args.model], AsyncLLMClient(client), output_dir,
+                max_concurrency=args.concurrency,
+            )
+        elif mode == "batch":
+            generator = BatchDatasetGenerator(
+                personas, questions, [args.model], BatchProcessor(create_openai_client("mock", base_url)),
+                output_dir, poll_interval=args.poll_interval,
+            )
+        else:
+            client = timed_client(create_openai_client("mock", base_url), recorder)
+            generator = DatasetGenerator(personas, questions, [args.model], LLMClient(client), output_dir)
+        generator.generate_dataset(delay=0.0)
+        return {"units": generator.row_count, "unit": "turns", "latencies": recorder}
+
+
+def run_personas_batch(base_url: str, args) -> Dict:
+    """Submit persona batches, wait for them and save the parsed personas."""
+    client = create_openai_client("mock", base_url)
+    batch_processor = BatchProcessor(client)
+    generator = PersonaGenerator(LLMClient(client))
+    batch_count = max(1, args.personas // args.batch_size)
+    with tempfile.TemporaryDirectory() as output_dir:
+        batch = generator.generate_batch_with_stats(
+            batch_processor,
+            personas_per_batch=args.batch_size,
+            batch_count=batch_count,
+            model=args.model,
+            batch_file_path=str(Path(output_dir) / "batch_input_personas.jsonl"),
+        )
+        while batch_processor.fetch_batch_results(batch) is None:
+            time.sleep(args.poll_interval)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            saved = batch_processor.save_batch_output(
+                batch, output_dir=output_dir, output_format="jsonl", base_personas=generator.batch_base_personas
+            )
+        with open(saved, "r", encoding="utf-8") as f:
+            personas = sum(1 for _ in f)
+    return {"units": personas, "unit": "personas", "latencies": LatencyRecorder()}
+
+
+def run_analyzer(base_url: str, args) -> Dict:
+    """Analyze interviews with BatchInterviewProcessor against the mock server."""
+    os.environ["AVALAI_BASE_URL"] = base_url
+    os.environ.setdefault("AVALAI_API_KEY", "mock")
+    # Lift the default budget for unknown providers so the mock is not throttled
+    add_rate_limit("*", rpm=1_000_000, tpm=1_000_000_000, base_url=base_url)
+    sys.path.insert(0, str(ANALYZER_DIR))
+    # The analyzer reads its knowledge base relative to its own directory
+    with contextlib.chdir(ANALYZER_DIR), tempfile.TemporaryDirectory() as output_dir:
+        from batch_interview_processor import BatchInterviewProcessor
+        from interviews import INTERVIEWS
+
+        recorder = LatencyRecorder()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            processor = BatchInterviewProcessor(output_dir=output_dir, max_workers=args.concurrency)
+            timed_client(processor.client, recorder)
+            interviews = INTERVIEWS[:args.interviews]
+            processor.process_multiple_interviews(interviews)
+        return {"units": processor.stats["total_questions"], "unit": "answers", "latencies": recorder}
+
+
+def measure(name: str, func: Callable[[], Dict], trace_memory: bool) -> Dict:
+    """Run a scenario and collect throughput, latency and memory figures."""
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        outcome = func()
+    finally:
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+        if trace_memory:
+            tracemalloc.stop()
+    return {
+        "scenario": name,
+        "unit": outcome["unit"],
+        "units": outcome["units"],
+        "seconds": elapsed,
+        "per_second": outcome["units"] / elapsed if elapsed > 0 else 0.0,
+        "requests": len(outcome["latencies"].samples),
+        **outcome["latencies"].percentiles(),
+        "peak_traced_mb": peak / 1024 / 1024,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def compare_with_baseline(results: List[Dict], baseline_path: str, tolerance: float) -> List[str]:
+    """
+    Compare results with a baseline file.
+
+    Args:
+        results: Scenario results of this run
+        baseline_path: JSON file written by an earlier run with --output
+        tolerance: Allowed relative slowdown (0.2 = 20%)
+
+    Returns:
+        Human-readable regression messages (empty if none)
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        base = baseline.get(result["scenario"])
+        if not base:
+            continue
+        if result["per_second"] < base["per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{result['scenario']}: {result['per_second']:.1f} {result['unit']}/s "
+                f"(baseline {base['per_second']:.1f})"
+            )
+        if base["p95_ms"] and result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{result['scenario']}: p95 {result['p95_ms']:.0f} ms (baseline {base['p95_ms']:.0f} ms)"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the generators against an offline mock server")
+    parser.add_argument("--scenarios", type=str, nargs="+", default=SCENARIOS, choices=SCENARIOS, help="Scenarios to run")
+    parser.add_argument("--personas", type=int, default=20, help="Personas per interview scenario (and personas generated in personas_batch)")
+    parser.add_argument("--questions", type=int, default=3, help="Interview questions per persona (each with its follow-ups)")
+    parser.add_argument("--interviews", type=int, default=3, help="Interviews analyzed in the analyzer scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrency for interviews_async and analyzer")
+    parser.add_argument("--batch-size", type=int, default=10, help="Personas per batch request in personas_batch")
+    parser.add_argument("--model", type=str, default=DEFAULT_MODEL, help="Model name sent to the mock server")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mock chat completion latency (ms)")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="Mock latency jitter (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of mock requests failing with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of mock requests failing with HTTP 429")
+    parser.add_argument("--batch-latency", type=float, default=0.5, help="Seconds until a mock batch completes")
+    parser.add_argument("--poll-interval", type=float, default=0.1, help="Batch polling interval (seconds)")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Skip Python allocation tracing (lower overhead)")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON (usable as a later --baseline)")
+    parser.add_argument("--baseline", type=str, default=None, help="Compare with a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression against the baseline")
+    parser.add_argument("--log-level", type=str, default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="Logging level")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    config = MockServerConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        batch_latency_s=args.batch_latency,
+        seed=0,
+    )
+    runners = {
+        "interviews": lambda url: run_interviews(url, args, "sync"),
+        "interviews_async": lambda url: run_interviews(url, args, "async"),
+        "interviews_batch": lambda url: run_interviews(url, args, "batch"),
+        "personas_batch": lambda url: run_personas_batch(url, args),
+        "analyzer": lambda url: run_analyzer(url, args),
+    }
+
+    results = []
+    with MockOpenAIServer(config) as server:
+        for name in args.scenarios:
+            try:
+                result = measure(name, lambda: runners[name](server.base_url), not args.no_tracemalloc)
+            except Exception as e:
+                print(f"{name:<18} skipped: {type(e).__name__}: {e}")
+                continue
+            results.append(result)
+            print(
+                f"{name:<18} {result['units']:>6} {result['unit']:<8} {result['seconds']:>7.2f}s "
+                f"{result['per_second']:>8.1f}/s  p50 {result['p50_ms']:>6.0f} ms  p95 {result['p95_ms']:>6.0f} ms  "
+                f"peak {result['peak_traced_mb']:>6.1f} MB  rss {result['max_rss_mb']:>6.0f} MB"
+            )
+        mock_counters = dict(server.state.counters)
+    print(f"Mock server counters: {mock_counters}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline, args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
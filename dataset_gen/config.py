@@ -8,8 +8,11 @@ load_dotenv()
 
 # API Configuration
 METIS_API_KEY = os.getenv("METIS_API_KEY")
+TAPSAGE_API_KEY = os.getenv("TAPSAGE_API_KEY")
+AVALAI_API_KEY = os.getenv("AVALAI_API_KEY")
 METIS_BASE_URL = "https://api.metisai.ir/openai/v1"
 TAPSAGE_BASE_URL = "https://api.tapsage.com/openai/v1"
+AVALAI_BASE_URL = "https://api.avalai.ir/v1"
 
 # Model Configuration
 DEFAULT_MODEL = "gpt-5-mini"
@@ -34,7 +37,3 @@ SEED = 42
 # Version
 VERSION = "v2.0"
 
-# Data validation
-if not METIS_API_KEY:
-    raise ValueError("METIS_API_KEY environment variable is not set. Please set it in your .env file.")
-
@@ -17,3 +17,8 @@ BASE_PERSONA_FIELDS = {
     "language",
     "religion_and_sect",
 }
+
+# Stable persona identifier assigned when the base persona is drawn and
+# carried through completion, validation and interviews
+PERSONA_ID_FIELD = "id"
+
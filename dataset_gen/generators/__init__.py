@@ -2,11 +2,16 @@
 Generators for personas and interviews.
 """
 from .persona_generator import PersonaGenerator, generate_base_persona
+from .base_persona_sampler import BasePersonaSampler, sample_base_personas, persona_records, quota_deviation
 from .interview_generator import InterviewGenerator
 
 __all__ = [
     "PersonaGenerator",
     "generate_base_persona",
+    "BasePersonaSampler",
+    "sample_base_personas",
+    "persona_records",
+    "quota_deviation",
     "InterviewGenerator",
 ]
 
@@ -5,14 +5,17 @@ Interview generation logic for elderly personas.
 import uuid
 import json
 import time
+import asyncio
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Callable
 from pathlib import Path
 from datetime import datetime
 
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from prompts.interview_prompts import format_system_prompt, format_answer_prompt
-from utils import LLMClient, save_to_csv
+from utils import LLMClient, AsyncLLMClient, BatchProcessor, save_to_csv, cached_prompt_tokens
+from utils.checkpoint import RunCheckpoint, assign_persona_ids
+from utils.dataset_writer import create_dataset_writer, DEFAULT_MAX_FILE_BYTES
 from config import DEFAULT_MODEL
 
 # Get logger for this module
@@ -20,7 +23,15 @@ logger = logging.getLogger(__name__)
 
 
 class InterviewGenerator:
-    """Generator for creating interview responses from personas."""
+    """
+    Generator for creating interview responses from personas.
+
+    Every turn is sent as system prompt, history, new question. The system
+    prompt is built once per interview and history turns keep the exact
+    prompt text they were asked with, so each request extends the previous
+    one byte for byte and the provider's prompt prefix cache can serve all
+    but the newest turn.
+    """
 
     def __init__(self, llm_client: LLMClient):
         """
@@ -49,49 +60,161 @@ class InterviewGenerator:
                 history_messages.append(AIMessage(content=msg["content"]))
         return history_messages
 
-    def generate_response(
+    def _build_messages(
         self,
         persona: Dict,
         question: str,
-        history: Optional[List[Dict]] = None,
-        model: Optional[str] = None,
-    ) -> str:
+        history: Optional[List[Dict]],
+        model_name: str,
+        system_prompt: Optional[str] = None,
+    ) -> List:
         """
-        Generate a response to a question as the given persona.
+        Build the langchain messages for a single interview turn.
 
         Args:
             persona: Persona dictionary
             question: Interview question
             history: Conversation history (optional)
-            model: Model to use (defaults to config)
+            model_name: Model name (used for logging only)
+            system_prompt: Prebuilt system prompt of the persona (built if not given)
 
         Returns:
-            Generated response text
+            List of langchain messages
         """
         history = history or []
-        model_name = model or DEFAULT_MODEL
         persona_id = persona.get("id", "unknown")
 
         logger.debug(f"Generating response for persona {persona_id} using model '{model_name}'")
         logger.debug(f"Question: {question[:100]}...")
         logger.debug(f"History length: {len(history)} messages")
 
-        # Build messages
-        system_content = format_system_prompt(persona)
-        history_messages = self._build_history(history)
-        human_content = format_answer_prompt(question)
+        return [
+            SystemMessage(content=system_prompt or format_system_prompt(persona)),
+            *self._build_history(history),
+            HumanMessage(content=format_answer_prompt(question)),
+        ]
+
+    @staticmethod
+    def build_request_messages(
+        persona: Dict,
+        question: str,
+        history: Optional[List[Dict]] = None,
+        system_prompt: Optional[str] = None,
+    ) -> List[Dict]:
+        """
+        Build the raw chat messages for a turn (used for Batch API requests).
+
+        Args:
+            persona: Persona dictionary
+            question: Interview question
+            history: Conversation history (optional)
+            system_prompt: Prebuilt system prompt of the persona (built if not given)
 
-        messages = [
-            SystemMessage(content=system_content),
-            *history_messages,
-            HumanMessage(content=human_content),
+        Returns:
+            List of message dicts with 'role' and 'content'
+        """
+        return [
+            {"role": "system", "content": system_prompt or format_system_prompt(persona)},
+            *(history or []),
+            {"role": "user", "content": format_answer_prompt(question)},
         ]
 
+    @staticmethod
+    def _build_turns(questions: List[Dict]) -> List[Dict]:
+        """
+        Flatten questions into the ordered list of interview turns.
+
+        Each main question is followed by its follow-ups, matching the
+        order in which they are asked.
+
+        Args:
+            questions: List of question dictionaries with 'main_question' and 'follow_ups'
+
+        Returns:
+            List of turn dictionaries with 'question_index', 'question_meta',
+            'question_type' and 'question'
+        """
+        turns = []
+        for idx, q in enumerate(questions, 1):
+            turns.append({"question_index": idx, "question_meta": q, "question_type": "main", "question": q["main_question"]})
+            for follow_up in q.get("follow_ups", []):
+                turns.append({"question_index": idx, "question_meta": q, "question_type": "follow_up", "question": follow_up})
+        return turns
+
+    @staticmethod
+    def history_turn(question: str, answer: str) -> List[Dict]:
+        """
+        History messages of an answered turn.
+
+        The question is stored as the exact prompt it was asked with, so
+        later requests repeat the earlier ones unchanged.
+
+        Args:
+            question: Interview question
+            answer: Generated answer
+
+        Returns:
+            User and assistant message dicts
+        """
+        return [
+            {"role": "user", "content": format_answer_prompt(question)},
+            {"role": "assistant", "content": answer},
+        ]
+
+    @staticmethod
+    def _make_interaction(turn: Dict, answer: str, model_name: str) -> Dict:
+        """
+        Build the interaction record for an answered turn.
+
+        Args:
+            turn: Turn dictionary from `_build_turns`
+            answer: Generated answer
+            model_name: Model that produced the answer
+
+        Returns:
+            Interaction dictionary
+        """
+        q = turn["question_meta"]
+        return {
+            "id": str(uuid.uuid4()),
+            "question_id": q.get("id"),
+            "question_type": turn["question_type"],
+            "subject": q.get("subject", "unknown"),
+            "question": turn["question"],
+            "answer": answer,
+            "model": model_name,
+        }
+
+    def generate_response(
+        self,
+        persona: Dict,
+        question: str,
+        history: Optional[List[Dict]] = None,
+        model: Optional[str] = None,
+        system_prompt: Optional[str] = None,
+    ) -> str:
+        """
+        Generate a response to a question as the given persona.
+
+        Args:
+            persona: Persona dictionary
+            question: Interview question
+            history: Conversation history (optional)
+            model: Model to use (defaults to config)
+            system_prompt: Prebuilt system prompt of the persona (built if not given)
+
+        Returns:
+            Generated response text
+        """
+        model_name = model or DEFAULT_MODEL
+        messages = self._build_messages(persona, question, history, model_name, system_prompt)
+
         # Generate response
         logger.debug(f"Sending request to model '{model_name}'...")
         response = self.llm_client.generate(messages, model=model)
         answer = response.choices[0].message.content
         
+        self._log_usage(model_name, response)
         logger.debug(f"Received response from '{model_name}' ({len(answer)} characters)")
         logger.debug(f"Answer preview: {answer[:150]}...")
         
@@ -103,6 +226,8 @@ class InterviewGenerator:
         questions: List[Dict],
         model: Optional[str] = None,
         delay: float = 1.0,
+        completed_interactions: Optional[List[Dict]] = None,
+        on_turn: Optional[Callable[[int, Dict], None]] = None,
     ) -> List[Dict]:
         """
         Generate a full interview with a persona.
@@ -112,6 +237,9 @@ class InterviewGenerator:
             questions: List of question dictionaries with 'main_question' and 'follow_ups'
             model: Model to use (defaults to config)
             delay: Delay between API calls in seconds
+            completed_interactions: Interactions of an interrupted run; the
+                interview continues after them, reusing them as history
+            on_turn: Callback invoked with (turn_index, interaction) after each new turn
 
         Returns:
             List of interaction dictionaries
@@ -120,68 +248,146 @@ class InterviewGenerator:
         persona_id = persona.get("id", "unknown")
         logger.info(f"Starting interview generation for persona {persona_id} with {len(questions)} questions")
         
-        history = []
-        interactions = []
-
-        for idx, q in enumerate(questions, 1):
-            main_question = q["main_question"]
-            follow_ups = q.get("follow_ups", [])
-            subject = q.get("subject", "unknown")
-
-            logger.info(f"Processing question {idx}/{len(questions)}: {subject}")
-            logger.debug(f"Main question: {main_question[:100]}...")
-
-            # Generate response to main question
-            answer = self.generate_response(persona, main_question, history, model)
-
-            interaction = {
-                "id": str(uuid.uuid4()),
-                "question_id": q.get("id"),
-                "question_type": "main",
-                "subject": subject,
-                "question": main_question,
-                "answer": answer,
-                "model": model_name,
-            }
+        interactions = list(completed_interactions or [])
+        history = self._history_from_interactions(interactions)
+        if interactions:
+            logger.info(f"Resuming interview for persona {persona_id} after {len(interactions)} completed turn(s)")
+
+        system_prompt = format_system_prompt(persona)
+        turns = self._build_turns(questions)
+        for turn_index in range(len(interactions), len(turns)):
+            turn = turns[turn_index]
+            self._log_turn(turn, questions)
+            answer = self.generate_response(persona, turn["question"], history, model, system_prompt)
+
+            interaction = self._make_interaction(turn, answer, model_name)
             interactions.append(interaction)
-            logger.debug(f"Added main question interaction (total: {len(interactions)})")
+            if on_turn is not None:
+                on_turn(turn_index, interaction)
+            logger.debug(f"Added {turn['question_type']} interaction (total: {len(interactions)})")
 
             # Update history
-            history.append({"role": "user", "content": main_question})
-            history.append({"role": "assistant", "content": answer})
+            history.extend(self.history_turn(turn["question"], answer))
 
             if delay > 0:
                 logger.debug(f"Waiting {delay}s before next API call...")
                 time.sleep(delay)
 
-            # Generate responses to follow-up questions
-            if follow_ups:
-                logger.debug(f"Processing {len(follow_ups)} follow-up question(s)")
-            for follow_idx, follow_up in enumerate(follow_ups, 1):
-                logger.debug(f"Follow-up {follow_idx}/{len(follow_ups)}: {follow_up[:80]}...")
-                answer = self.generate_response(persona, follow_up, history, model)
-
-                interaction = {
-                    "id": str(uuid.uuid4()),
-                    "question_id": q.get("id"),
-                    "question_type": "follow_up",
-                    "subject": subject,
-                    "question": follow_up,
-                    "answer": answer,
-                    "model": model_name,
-                }
-                interactions.append(interaction)
-                logger.debug(f"Added follow-up interaction (total: {len(interactions)})")
+        logger.info(f"Completed interview for persona {persona_id}: {len(interactions)} interactions generated")
+        return interactions
 
-                # Update history
-                history.append({"role": "user", "content": follow_up})
-                history.append({"role": "assistant", "content": answer})
+    @staticmethod
+    def _history_from_interactions(interactions: List[Dict]) -> List[Dict]:
+        """Rebuild the conversation history from already generated interactions."""
+        history = []
+        for interaction in interactions:
+            history.extend(InterviewGenerator.history_turn(interaction["question"], interaction["answer"]))
+        return history
+
+    @staticmethod
+    def _log_usage(model_name: str, response) -> None:
+        """Log the prompt tokens of a turn and how many the provider served from its prefix cache."""
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            logger.debug(
+                f"Usage from '{model_name}': {usage.prompt_tokens} prompt tokens "
+                f"({cached_prompt_tokens(usage)} cached), {usage.completion_tokens} completion tokens"
+            )
+
+    def _log_turn(self, turn: Dict, questions: List[Dict]) -> None:
+        """Log progress for the turn about to be generated."""
+        q = turn["question_meta"]
+        if turn["question_type"] == "main":
+            logger.info(f"Processing question {turn['question_index']}/{len(questions)}: {q.get('subject', 'unknown')}")
+            logger.debug(f"Main question: {turn['question'][:100]}...")
+        else:
+            logger.debug(f"Follow-up: {turn['question'][:80]}...")
+
+    async def agenerate_response(
+        self,
+        persona: Dict,
+        question: str,
+        history: Optional[List[Dict]] = None,
+        model: Optional[str] = None,
+        system_prompt: Optional[str] = None,
+    ) -> str:
+        """
+        Async variant of `generate_response`; requires an AsyncLLMClient.
 
-                if delay > 0:
-                    logger.debug(f"Waiting {delay}s before next API call...")
-                    time.sleep(delay)
+        Args:
+            persona: Persona dictionary
+            question: Interview question
+            history: Conversation history (optional)
+            model: Model to use (defaults to config)
+            system_prompt: Prebuilt system prompt of the persona (built if not given)
 
-        logger.info(f"Completed interview for persona {persona_id}: {len(interactions)} interactions generated")
+        Returns:
+            Generated response text
+        """
+        model_name = model or DEFAULT_MODEL
+        messages = self._build_messages(persona, question, history, model_name, system_prompt)
+
+        logger.debug(f"Sending request to model '{model_name}'...")
+        response = await self.llm_client.generate(messages, model=model)
+        answer = response.choices[0].message.content
+
+        self._log_usage(model_name, response)
+
+        logger.debug(f"Received response from '{model_name}' ({len(answer)} characters)")
+        return answer
+
+    async def agenerate_full_interview(
+        self,
+        persona: Dict,
+        questions: List[Dict],
+        model: Optional[str] = None,
+        delay: float = 0.0,
+        completed_interactions: Optional[List[Dict]] = None,
+        on_turn: Optional[Callable[[int, Dict], None]] = None,
+    ) -> List[Dict]:
+        """
+        Async variant of `generate_full_interview`.
+
+        Turns are still generated one after another because each turn
+        depends on the history of the previous ones; concurrency comes from
+        running several interviews at once.
+
+        Args:
+            persona: Persona dictionary
+            questions: List of question dictionaries with 'main_question' and 'follow_ups'
+            model: Model to use (defaults to config)
+            delay: Delay between API calls in seconds
+            completed_interactions: Interactions of an interrupted run to continue from
+            on_turn: Callback invoked with (turn_index, interaction) after each new
+                turn; it runs in a worker thread and must be thread-safe
+
+        Returns:
+            List of interaction dictionaries
+        """
+        model_name = model or DEFAULT_MODEL
+        persona_id = persona.get("id", "unknown")
+        logger.info(f"Starting interview generation for persona {persona_id} with {model_name}")
+
+        interactions = list(completed_interactions or [])
+        history = self._history_from_interactions(interactions)
+
+        system_prompt = format_system_prompt(persona)
+        turns = self._build_turns(questions)
+        for turn_index in range(len(interactions), len(turns)):
+            turn = turns[turn_index]
+            answer = await self.agenerate_response(persona, turn["question"], history, model, system_prompt)
+            interaction = self._make_interaction(turn, answer, model_name)
+            interactions.append(interaction)
+            if on_turn is not None:
+                # Journaling fsyncs; keep it off the event loop
+                await asyncio.to_thread(on_turn, turn_index, interaction)
+
+            history.extend(self.history_turn(turn["question"], answer))
+
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        logger.info(f"Completed interview for persona {persona_id} with {model_name}: {len(interactions)} interactions generated")
         return interactions
 
 
@@ -195,6 +401,11 @@ class DatasetGenerator:
         models: List[str],
         llm_client: LLMClient,
         output_dir: str = "data/output",
+        checkpoint: Optional[RunCheckpoint] = None,
+        run_config: Optional[Dict] = None,
+        output_format: str = "jsonl",
+        max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+        keep_rows: bool = False,
     ):
         """
         Initialize dataset generator.
@@ -205,6 +416,14 @@ class DatasetGenerator:
             models: List of model names to use
             llm_client: LLM client for generation
             output_dir: Directory to save output files
+            checkpoint: Checkpoint of an interrupted run to resume; a new run
+                directory is created under `output_dir/runs/` if not provided
+            run_config: Run configuration recorded in a new run's manifest
+            output_format: "jsonl" or "parquet" for streaming, size-rolled part
+                files; "csv" writes one CSV per persona × model combo
+            max_file_bytes: Roll over to a new part file beyond this size
+            keep_rows: Also keep every row in memory and return it from
+                `generate_dataset` (memory grows with the dataset)
         """
         self.personas = personas
         self.interview_questions = interview_questions
@@ -214,20 +433,49 @@ class DatasetGenerator:
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
         self.interview_generator = InterviewGenerator(llm_client)
-        self.session_prefix = datetime.now().strftime("%Y%m%d_%H%M%S")
-
+        if checkpoint is None:
+            self.session_prefix = datetime.now().strftime("%Y%m%d_%H%M%S")
+            checkpoint = RunCheckpoint.create(str(self.output_dir), self.session_prefix, run_config)
+        else:
+            # Reuse the original prefix so resumed combos land in the same files
+            self.session_prefix = checkpoint.session_prefix
+        self.checkpoint = checkpoint
+        # Combos are keyed by persona ID, so every persona needs a unique one
+        checkpoint.check_personas(assign_persona_ids(personas), len(personas))
+        self.resume_turns = checkpoint.load_turns()
+
+        self.output_format = output_format
+        self.writer = None
+        if output_format != "csv":
+            # Combos are marked completed only once the writer made their rows durable
+            self.writer = create_dataset_writer(
+                output_format,
+                str(self.output_dir),
+                f"synthetic_elder_fa_{self.session_prefix}",
+                max_file_bytes=max_file_bytes,
+                on_commit=self._on_commit,
+                resume_position=checkpoint.dataset_position,
+            )
+
+        self.keep_rows = keep_rows
         self.all_rows = []
+        self.row_count = 0
         self.error_count = 0
 
     def write_batch(self, batch_rows: List[Dict], model: str, persona_id: str) -> None:
         """
-        Write a batch of interactions to a CSV file.
+        Write a batch of interactions to the dataset sink (or a per-combo CSV file).
 
         Args:
             batch_rows: List of interaction dictionaries
             model: Model name
             persona_id: Persona identifier
         """
+        if self.writer is not None:
+            self.writer.write_rows(batch_rows, tag=(str(persona_id), model))
+            logger.info(f"✓ Appended {len(batch_rows)} rows for {model}/{persona_id}")
+            return
+
         batch_path = (
             self.output_dir
             / f"synthetic_elder_fa_{self.session_prefix}_{model}_{persona_id}.csv"
@@ -239,8 +487,18 @@ class DatasetGenerator:
         except Exception as e:
             logger.error(f"Write failed: {e}", exc_info=True)
             raise
+        self.checkpoint.mark_completed(str(persona_id), model)
+
+    def _on_commit(self, tags: List) -> None:
+        """Mark combos completed once the writer reports their rows as durable."""
+        self.checkpoint.commit(tags, self.writer.committed_position)
+
+    def close(self) -> None:
+        """Finish the dataset files (commits rows still buffered by the writer)."""
+        if self.writer is not None:
+            self.writer.close()
 
-    def generate_dataset(self, delay: float = 5.0) -> List[Dict]:
+    def generate_dataset(self, delay: float = 0.0) -> List[Dict]:
         """
         Generate complete dataset for all personas and models.
 
@@ -248,49 +506,436 @@ class DatasetGenerator:
             delay: Delay between API calls in seconds
 
         Returns:
-            List of all interaction dictionaries
+            List of all interaction dictionaries (empty unless `keep_rows` is set)
         """
         total_combos = len(self.personas) * len(self.models)
-        current = 0
 
+        try:
+            self._generate_all(delay, total_combos)
+        finally:
+            self.close()
+
+        self._log_summary()
+        return self.all_rows
+
+    def _generate_all(self, delay: float, total_combos: int) -> None:
+        """Run every persona × model combo sequentially."""
+        current = 0
         for persona in self.personas:
             for model in self.models:
                 current += 1
                 persona_id = persona.get('id', '?')
+                if self._is_completed(persona, model):
+                    logger.info(f"Skipping completed combo {current}/{total_combos}: Persona {persona_id} with {model}")
+                    continue
                 logger.info(f"\n{'='*80}")
                 logger.info(f"Processing combo {current}/{total_combos}: Persona {persona_id} with {model}")
                 logger.info(f"{'='*80}")
 
                 try:
-                    # Generate full interview
+                    # Generate full interview (continuing from journaled turns, if any)
                     interactions = self.interview_generator.generate_full_interview(
-                        persona, self.interview_questions, model=model, delay=delay
+                        persona,
+                        self.interview_questions,
+                        model=model,
+                        delay=delay,
+                        **self._resume_kwargs(persona, model),
                     )
 
-                    # Add persona info to each interaction
-                    for interaction in interactions:
-                        interaction["persona_id"] = persona.get("id")
-
-                    # Write batch
-                    self.write_batch(
-                        interactions, model, persona.get("id", "unknown_id")
-                    )
+                    self._finish_combo(persona, model, interactions)
+                    self.row_count += len(interactions)
 
                     # Collect globally
-                    self.all_rows.extend(interactions)
+                    if self.keep_rows:
+                        self.all_rows.extend(interactions)
                     logger.info(f"✓ Completed combo {current}/{total_combos}: {len(interactions)} interactions")
 
                 except Exception as e:
-                    logger.error(f"Error processing persona {persona_id} with {model}: {e}", exc_info=True)
-                    self.error_count += 1
-                    if self.error_count > 10:
-                        logger.error("Too many errors, stopping generation")
-                        raise Exception("Too many errors, stopping")
+                    self._record_error(persona_id, model, e)
+
+    def _finish_combo(self, persona: Dict, model: str, interactions: List[Dict]) -> None:
+        """
+        Tag a finished interview with its persona and write it out.
+
+        Args:
+            persona: Persona dictionary
+            model: Model name
+            interactions: Interactions generated for the combo
+        """
+        # Add persona info to each interaction
+        for interaction in interactions:
+            interaction["persona_id"] = persona.get("id")
+
+        # Write batch
+        self.write_batch(interactions, model, str(persona["id"]))
+
+    def _is_completed(self, persona: Dict, model: str) -> bool:
+        """Check whether a combo was already finished in a resumed run."""
+        return self.checkpoint.is_completed(str(persona["id"]), model)
+
+    def _resume_kwargs(self, persona: Dict, model: str) -> Dict:
+        """
+        Build the resume arguments for `generate_full_interview`.
+
+        Args:
+            persona: Persona dictionary
+            model: Model name
 
+        Returns:
+            Dictionary with 'completed_interactions' and 'on_turn'
+        """
+        persona_id = str(persona["id"])
+
+        def on_turn(turn_index: int, interaction: Dict) -> None:
+            self.checkpoint.record_turn(persona_id, model, turn_index, interaction)
+
+        return {
+            "completed_interactions": self.resume_turns.get(RunCheckpoint.combo_key(persona_id, model)),
+            "on_turn": on_turn,
+        }
+
+    def _record_error(self, persona_id: str, model: str, error: Exception) -> None:
+        """
+        Log a failed combo and stop the run once too many have failed.
+
+        Args:
+            persona_id: Persona identifier
+            model: Model name
+            error: Exception raised while processing the combo
+        """
+        logger.error(f"Error processing persona {persona_id} with {model}: {error}", exc_info=error)
+        self.error_count += 1
+        if self.error_count > 10:
+            logger.error("Too many errors, stopping generation")
+            raise Exception("Too many errors, stopping")
+
+    def _log_summary(self) -> None:
+        """Log the end-of-run summary."""
         logger.info(f"\n{'='*80}")
         logger.info(f"Dataset generation complete!")
-        logger.info(f"Total interactions: {len(self.all_rows)}")
+        logger.info(f"Total interactions: {self.row_count}")
         logger.info(f"Errors: {self.error_count}")
+        usage = getattr(self.llm_client, "usage_stats", None)
+        if usage is not None and usage.requests:
+            logger.info(
+                f"Prompt tokens: {usage.prompt_tokens} ({usage.cached_tokens} cached, "
+                f"{usage.cache_hit_rate:.1%} prefix cache hit rate); completion tokens: {usage.completion_tokens}"
+            )
         logger.info(f"{'='*80}\n")
 
+
+class AsyncDatasetGenerator(DatasetGenerator):
+    """
+    Generate the dataset with many persona × model interviews in flight at once.
+
+    Produces the same rows as DatasetGenerator; only the scheduling differs
+    (streamed rows are appended in completion order, each tagged with its
+    persona and model). At most `max_concurrency` interviews run at a time.
+    """
+
+    def __init__(
+        self,
+        personas: List[Dict],
+        interview_questions: List[Dict],
+        models: List[str],
+        llm_client: AsyncLLMClient,
+        output_dir: str = "data/output",
+        max_concurrency: int = 8,
+        checkpoint: Optional[RunCheckpoint] = None,
+        run_config: Optional[Dict] = None,
+        **writer_options,
+    ):
+        """
+        Initialize async dataset generator.
+
+        Args:
+            personas: List of persona dictionaries
+            interview_questions: List of interview question dictionaries
+            models: List of model names to use
+            llm_client: Async LLM client for generation
+            output_dir: Directory to save output files
+            max_concurrency: Maximum number of interviews running at once
+            checkpoint: Checkpoint of an interrupted run to resume
+            run_config: Run configuration recorded in a new run's manifest
+            **writer_options: output_format, max_file_bytes and keep_rows as
+                for DatasetGenerator
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        super().__init__(
+            personas, interview_questions, models, llm_client, output_dir,
+            checkpoint=checkpoint, run_config=run_config, **writer_options
+        )
+        self.max_concurrency = max_concurrency
+
+    async def _run_combo(
+        self,
+        semaphore: asyncio.Semaphore,
+        persona: Dict,
+        model: str,
+        combo_idx: int,
+        total_combos: int,
+        delay: float,
+    ) -> List[Dict]:
+        """Run one persona × model interview under the concurrency cap."""
+        persona_id = persona.get("id", "?")
+        if self._is_completed(persona, model):
+            logger.info(f"Skipping completed combo {combo_idx}/{total_combos}: Persona {persona_id} with {model}")
+            return []
+        async with semaphore:
+            logger.info(f"Starting combo {combo_idx}/{total_combos}: Persona {persona_id} with {model}")
+            try:
+                interactions = await self.interview_generator.agenerate_full_interview(
+                    persona,
+                    self.interview_questions,
+                    model=model,
+                    delay=delay,
+                    **self._resume_kwargs(persona, model),
+                )
+                # Writing is blocking; keep it off the event loop
+                await asyncio.to_thread(self._finish_combo, persona, model, interactions)
+                self.row_count += len(interactions)
+                logger.info(f"✓ Completed combo {combo_idx}/{total_combos}: {len(interactions)} interactions")
+                return interactions
+            except Exception as e:
+                self._record_error(persona_id, model, e)
+                return []
+
+    async def agenerate_dataset(self, delay: float = 0.0) -> List[Dict]:
+        """
+        Generate complete dataset for all personas and models concurrently.
+
+        Args:
+            delay: Delay between API calls within one interview in seconds
+
+        Returns:
+            List of all interaction dictionaries in persona × model order
+            (empty unless `keep_rows` is set)
+        """
+        combos = [(persona, model) for persona in self.personas for model in self.models]
+        total_combos = len(combos)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        logger.info(f"Running {total_combos} combos with up to {self.max_concurrency} concurrent interviews")
+
+        tasks = [
+            asyncio.create_task(self._run_combo(semaphore, persona, model, idx, total_combos, delay))
+            for idx, (persona, model) in enumerate(combos, 1)
+        ]
+        try:
+            results = await asyncio.gather(*tasks)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            await asyncio.to_thread(self.close)
+
+        # Collect in combo order so the output matches the sequential generator
+        if self.keep_rows:
+            for interactions in results:
+                self.all_rows.extend(interactions)
+
+        self._log_summary()
+        return self.all_rows
+
+    def generate_dataset(self, delay: float = 0.0) -> List[Dict]:
+        """
+        Generate complete dataset, running the async engine to completion.
+
+        Args:
+            delay: Delay between API calls within one interview in seconds
+
+        Returns:
+            List of all interaction dictionaries
+        """
+        return asyncio.run(self.agenerate_dataset(delay=delay))
+
+
+class BatchDatasetGenerator(DatasetGenerator):
+    """
+    Generate the dataset through the Batch API in turn-synchronous waves.
+
+    Every wave submits the next turn of every unfinished interview as one
+    batch job per model. When a wave's batches come back, each interview's
+    history is extended and the following turn goes into the next wave.
+    Requests that failed inside a batch are resubmitted in the next wave.
+    This trades latency for cheaper, higher-throughput generation.
+    """
+
+    def __init__(
+        self,
+        personas: List[Dict],
+        interview_questions: List[Dict],
+        models: List[str],
+        batch_processor: BatchProcessor,
+        output_dir: str = "data/output",
+        poll_interval: float = 60.0,
+        max_attempts: int = 3,
+        checkpoint: Optional[RunCheckpoint] = None,
+        run_config: Optional[Dict] = None,
+        **writer_options,
+    ):
+        """
+        Initialize batch dataset generator.
+
+        Args:
+            personas: List of persona dictionaries
+            interview_questions: List of interview question dictionaries
+            models: List of model names to use
+            batch_processor: Batch processor used to submit and collect waves
+            output_dir: Directory to save output files
+            poll_interval: Seconds between status checks of in-flight batches
+            max_attempts: Submissions of a turn before its interview is given up
+            checkpoint: Checkpoint of an interrupted run to resume
+            run_config: Run configuration recorded in a new run's manifest
+            **writer_options: output_format, max_file_bytes and keep_rows as
+                for DatasetGenerator
+        """
+        super().__init__(
+            personas, interview_questions, models, None, output_dir,
+            checkpoint=checkpoint, run_config=run_config, **writer_options
+        )
+        self.batch_processor = batch_processor
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.in_flight: Dict[str, object] = {}
+
+    def generate_dataset(self, delay: float = 0.0) -> List[Dict]:
+        """
+        Generate complete dataset for all personas and models in batch waves.
+
+        Args:
+            delay: Unused; pacing is determined by batch completion
+
+        Returns:
+            List of all interaction dictionaries in persona × model order
+            (empty unless `keep_rows` is set)
+        """
+        turns = InterviewGenerator._build_turns(self.interview_questions)
+        states = {}
+        for persona in self.personas:
+            for model in self.models:
+                if self._is_completed(persona, model):
+                    continue
+                persona_id = str(persona["id"])
+                interactions = list(self.resume_turns.get(RunCheckpoint.combo_key(persona_id, model)) or [])
+                states[RunCheckpoint.combo_key(persona_id, model)] = {
+                    "persona": persona,
+                    "model": model,
+                    "interactions": interactions,
+                    "history": InterviewGenerator._history_from_interactions(interactions),
+                    "system_prompt": format_system_prompt(persona),
+                    "attempts": 0,
+                    "on_turn": self._resume_kwargs(persona, model)["on_turn"],
+                }
+        logger.info(f"Running {len(states)} interviews of {len(turns)} turns in batch waves")
+
+        finished = {}
+        try:
+            wave = 0
+            while states:
+                # Interviews resumed with every turn journaled need no request
+                for key in [k for k, st in states.items() if len(st["interactions"]) >= len(turns)]:
+                    finished[key] = self._finish_state(states.pop(key))
+                if not states:
+                    break
+
+                wave += 1
+                answers = self._run_wave(wave, states, turns)
+                for key, state in list(states.items()):
+                    answer = answers.get(self._custom_id(key, len(state["interactions"])))
+                    if answer is None:
+                        state["attempts"] += 1
+                        if state["attempts"] >= self.max_attempts:
+                            states.pop(key)
+                            self._record_error(
+                                state["persona"].get("id", "?"), state["model"],
+                                Exception(f"Turn {len(state['interactions'])} failed {state['attempts']} times in batch"),
+                            )
+                        continue
+                    self._apply_answer(state, turns, answer)
+        finally:
+            self.close()
+
+        # Collect in combo order so the output matches the sequential generator
+        if self.keep_rows:
+            for persona in self.personas:
+                for model in self.models:
+                    key = RunCheckpoint.combo_key(str(persona["id"]), model)
+                    self.all_rows.extend(finished.get(key, []))
+
+        self._log_summary()
         return self.all_rows
+
+    @staticmethod
+    def _custom_id(combo_key: str, turn_index: int) -> str:
+        """Custom ID of a turn request in a batch file."""
+        return f"{combo_key}|{turn_index}"
+
+    def _apply_answer(self, state: Dict, turns: List[Dict], answer: str) -> None:
+        """Record an answered turn and extend the interview's history."""
+        turn_index = len(state["interactions"])
+        turn = turns[turn_index]
+        interaction = InterviewGenerator._make_interaction(turn, answer, state["model"])
+        state["interactions"].append(interaction)
+        state["on_turn"](turn_index, interaction)
+        state["history"].extend(InterviewGenerator.history_turn(turn["question"], answer))
+        state["attempts"] = 0
+
+    def _finish_state(self, state: Dict) -> List[Dict]:
+        """Write out a finished interview."""
+        self._finish_combo(state["persona"], state["model"], state["interactions"])
+        self.row_count += len(state["interactions"])
+        logger.info(f"✓ Completed persona {state['persona'].get('id', '?')} with {state['model']}")
+        return state["interactions"]
+
+    def _run_wave(self, wave: int, states: Dict[str, Dict], turns: List[Dict]) -> Dict[str, str]:
+        """
+        Submit the next turn of every interview and wait for the wave to finish.
+
+        Args:
+            wave: Wave number (used in batch file names)
+            states: Interview states keyed by combo key
+            turns: Interview turns from `_build_turns`
+
+        Returns:
+            Dictionary mapping custom_id to answer for successful requests
+        """
+        by_model: Dict[str, Dict[str, List]] = {}
+        for key, state in states.items():
+            turn_index = len(state["interactions"])
+            requests = by_model.setdefault(state["model"], {"custom_ids": [], "messages": []})
+            requests["custom_ids"].append(self._custom_id(key, turn_index))
+            requests["messages"].append(
+                self.interview_generator.build_request_messages(
+                    state["persona"], turns[turn_index]["question"], state["history"], state["system_prompt"]
+                )
+            )
+
+        for model, requests in by_model.items():
+            batch_file_path = self.checkpoint.run_dir / f"wave{wave:03d}_{model}.jsonl"
+            batch = self.batch_processor.create_batch(
+                requests["messages"],
+                model=model,
+                batch_file_path=str(batch_file_path),
+                description=f"Interview wave {wave} ({len(requests['messages'])} turns) for run {self.session_prefix}",
+                custom_ids=requests["custom_ids"],
+            )
+            self.in_flight[batch.id] = batch
+            logger.info(f"Wave {wave}: submitted batch {batch.id} with {len(requests['messages'])} turns for {model}")
+
+        answers: Dict[str, str] = {}
+        while self.in_flight:
+            for batch_id, batch in list(self.in_flight.items()):
+                results = self.batch_processor.fetch_batch_results(batch)
+                if results is None:
+                    continue
+                del self.in_flight[batch_id]
+                answers.update(results)
+                logger.info(f"Wave {wave}: batch {batch_id} returned {len(results)} answers")
+            if self.in_flight:
+                logger.debug(f"Wave {wave}: {len(self.in_flight)} batch(es) in flight, next check in {self.poll_interval}s")
+                time.sleep(self.poll_interval)
+
+        return answers
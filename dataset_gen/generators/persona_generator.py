@@ -4,12 +4,22 @@ Persona generation logic with statistical distributions.
 
 import random
 import json
+import uuid
 import logging
-from typing import List, Dict, Optional
-
-from prompts import PERSONA_GENERATION_PROMPT, create_constrained_persona_prompt
-from utils import LLMClient, BatchProcessor
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Dict, Optional, Tuple
+
+from prompts import PERSONA_GENERATION_PROMPT, create_constrained_persona_prompt, create_persona_repair_prompt
+from models import coerce_persona, describe_allowed, validate_persona
+from utils import LLMClient, BatchProcessor, JsonArrayStreamParser, estimate_persona_tokens, get_output_token_budget
+from utils import BaseFieldEnforcer
+from utils.batch_utils import new_batch_run_dir
 from config import DEFAULT_MODEL, SEED
+from constants import BASE_PERSONA_FIELDS, PERSONA_ID_FIELD
+from utils.distributions import DistributionTables, load_distribution_tables
+from .base_persona_sampler import BasePersonaSampler, persona_records
 
 # Get logger for this module
 logger = logging.getLogger(__name__)
@@ -17,112 +27,117 @@ logger = logging.getLogger(__name__)
 # Set seed for reproducibility
 random.seed(SEED)
 
-
-def generate_base_persona() -> (
+# Upper bound on personas per completion request
+DEFAULT_MAX_CHUNK_SIZE = 25
+
+# Headroom for pretty-printed JSON and longer-than-sample values
+OUTPUT_TOKEN_SAFETY_FACTOR = 1.5
+
+# Representative completed persona used to estimate output tokens per persona
+PERSONA_TOKEN_SAMPLE = {
+    "age": 78,
+    "gender": "Female",
+    "marital_status": "Widowed",
+    "children": "2-3",
+    "living_situation": "Living with Family",
+    "general_health": "Average",
+    "chronic_disease": "Chronic Obstructive Pulmonary Disease",
+    "mobility": "With Cane or Walker",
+    "hearing_senses": "Average",
+    "vision_senses": "Poor",
+    "daily_energy": "Average",
+    "personality_type": "ISFJ",
+    "cognitive_status": "Mild Forgetfulness",
+    "dominant_emotion": "Anxious",
+    "emotional_intelligence": "Average",
+    "iq": "Average",
+    "attitude_toward_aging": "Meaning-Seeking",
+    "main_social_role": "Grandmother",
+    "social_support": "Large Family",
+    "social_participation": "Inactive",
+    "income": "Dependent on Children",
+    "economic_decile": 4,
+    "housing": "Own Home",
+    "religion_and_sect": "Shia Muslim",
+    "internalized_moral_traits": ["Patience", "Generosity", "Stubbornness", "Distrust of strangers"],
+    "religiosity_level": "High",
+    "ethnicity": "Mazandarani",
+    "language": "Mazandarani",
+    "important_personal_experiences": "Battle with Serious Illness (e.g., Cancer, Chronic Disease)",
+    "life_satisfaction": "Neutral",
+    "meaning_and_purpose_in_old_age": "Spiritual Activities",
+}
+
+
+def generate_base_persona(tables: Optional[DistributionTables] = None) -> (
     Dict[str, any] # pyright: ignore[reportGeneralTypeIssues]
 ):  
     """
     Generate a base persona with statistically-based demographic fields.
-    Returns a dictionary with predefined fields based on Iranian elderly population statistics.
-    The LLM will fill in the remaining fields.
+    Returns a dictionary with predefined fields based on Iranian elderly population statistics
+    and a stable `id`. The LLM will fill in the remaining fields. Use `sample_base_personas`
+    to draw many personas at once.
+
+    Args:
+        tables: Compiled distribution tables (defaults to
+            knowledge_base/demographic_distributions.json)
 
     Returns:
-        Dictionary with demographic fields
+        Dictionary with the persona ID and demographic fields
     """
-    # Gender distribution (F: 53%, M: 47%)
-    gender = random.choices(["Female", "Male"], weights=[53, 47])[0]
-
-    # Age distribution (decaying distribution for elderly)
-    age = random.choices(range(65, 95), weights=[
-        20, 20, 20, 20, 20, # 65-70
-        15, 15, 15, 15, 15, # 71-75
-        10, 10, 10, 10, 10, # 76-80
-        5, 5, 5, 5, 5,      # 81-85
-        3, 3, 3, 3, 3,      # 86-90
-        1, 1, 1, 1, 1       # 91-95
-    ])[0]
-
-    # Marital status distribution
-    marital_status = random.choices(
-        ["Married", "Single", "Divorced", "Widowed"], weights=[60, 30, 5, 5]
-    )[0]
-
-    # Children distribution
-    children = random.choices(["None", "1", "2-3", "4+"], weights=[5, 15, 30, 50])[0]
-
-    # Living situation distribution
-    living_situation = random.choices(
-        ["Living with Family", "Living Alone", "Shared Housing"], weights=[50, 30, 20]
-    )[0]
-
-    # Ethnicity distribution (approximate Iranian demographics)
-    ethnicity = random.choices(
-        [
-            "Persian",
-            "Azeri",
-            "Kurdish",
-            "Lur",
-            "Baloch",
-            "Arab",
-            "Turkmen",
-            "Gilaki",
-            "Mazandarani",
-            "Qashqai",
-        ],
-        weights=[50, 25, 10, 5, 3, 2, 1, 2, 1, 1],
-    )[0]
-
-    # Language typically matches ethnicity
-    language_map = {
-        "Persian": "Persian",
-        "Azeri": "Azeri",
-        "Kurdish": "Kurdish",
-        "Lur": "Luri",
-        "Baloch": "Balochi",
-        "Arab": "Arabic",
-        "Turkmen": "Turkmen",
-        "Gilaki": "Gilaki",
-        "Mazandarani": "Mazandarani",
-        "Qashqai": "Qashqai",
-    }
-    language = language_map.get(ethnicity, "Persian")
-
-    # Religion distribution
-    if ethnicity in ["Persian", "Azeri", "Gilaki", "Mazandarani"]:
-        religion = random.choices(["Shia Muslim", "Sunni Muslim"], weights=[95, 5])[0]
-    elif ethnicity in ["Kurdish", "Baloch", "Turkmen"]:
-        religion = random.choices(["Sunni Muslim", "Shia Muslim"], weights=[80, 20])[0]
-    elif ethnicity == "Arab":
-        religion = random.choices(["Shia Muslim", "Sunni Muslim"], weights=[70, 30])[0]
-    else:
-        religion = random.choices(
-            ["Shia Muslim", "Sunni Muslim", "Zoroastrian", "Christian", "Jewish"],
-            weights=[85, 10, 2, 2, 1],
-        )[0]
-
-    return {
-        "age": age,
-        "gender": gender,
-        "marital_status": marital_status,
-        "children": children,
-        "living_situation": living_situation,
-        "ethnicity": ethnicity,
-        "language": language,
-        "religion_and_sect": religion,
-    }
+    # Not drawn from the seeded `random`: every process would repeat the same IDs
+    persona = {PERSONA_ID_FIELD: f"b-{uuid.uuid4().hex[:12]}"}
+    for name, table in (tables or load_distribution_tables()).fields.items():
+        persona[name] = table.sample_value(random, persona.get(table.given))
+    return persona
 
 
 class PersonaGenerator:
     """Generator for creating Iranian elderly personas."""
 
-    def __init__(self, llm_client: LLMClient):
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        seed: Optional[int] = SEED,
+        stream: int = 0,
+        tables: Optional[DistributionTables] = None,
+        sampling_method: str = "random",
+        run_id: Optional[str] = None,
+    ):
         """
         Initialize persona generator.
 
         Args:
             llm_client: LLM client for generation
+            seed: Seed for base persona sampling
+            stream: Sampling stream (use a distinct value per shard worker)
+            tables: Demographic distribution tables (defaults to the knowledge base file)
+            sampling_method: "random" or "quota"; quota cohorts match the
+                target distributions exactly up to rounding
         """
         self.llm_client = llm_client
+        self.sampler = BasePersonaSampler(seed=seed, stream=stream, tables=tables, run_id=run_id)
+        self.sampling_method = sampling_method
+        self.failed_base_personas: List[Dict] = []
+        self.invalid_personas: List[Dict] = []
+        self.repair_stats: Dict[str, int] = {}
+        self.base_field_enforcer = BaseFieldEnforcer()
+        self.drift_stats: Dict = {}
+        self.batch_base_personas: Dict[str, List[Dict]] = {}
+        self.batch_base_personas_path: Optional[str] = None
+        self._persona_tokens: Dict[str, int] = {}
+
+    def sample_base_personas(self, count: int) -> List[Dict]:
+        """
+        Draw base personas with the generator's sampler and sampling method.
+
+        Args:
+            count: Number of personas
+
+        Returns:
+            List of base persona dictionaries
+        """
+        return persona_records(self.sampler.sample(count, method=self.sampling_method))
 
     def generate_full_personas(
         self, count: int, model: Optional[str] = None
@@ -166,49 +181,373 @@ class PersonaGenerator:
             logger.error(f"Response content: {content[:500]}")
             raise
 
-    def complete_personas(
-        self, base_personas: List[Dict], model: Optional[str] = None
-    ) -> List[Dict]:
+    def completion_messages(self, base_personas: List[Dict]) -> List[Dict[str, str]]:
         """
-        Complete personas with predefined demographic fields.
+        Build the chat messages asking the LLM to complete base personas.
 
         Args:
             base_personas: List of dictionaries with demographic fields
-            model: Model to use (defaults to config)
 
         Returns:
-            List of completed persona dictionaries
+            List of role/content message dictionaries
         """
-        model_name = model or DEFAULT_MODEL
-        logger.info(f"Completing {len(base_personas)} persona(s) using model '{model_name}'")
-        logger.debug(f"Base personas sample: {json.dumps(base_personas[0] if base_personas else {}, indent=2, ensure_ascii=False)}")
-        
-        system_prompt = create_constrained_persona_prompt(base_personas)
-        messages = [
-            {"role": "system", "content": system_prompt},
+        return [
+            {"role": "system", "content": create_constrained_persona_prompt(base_personas)},
             {
                 "role": "user",
                 "content": f"Complete all {len(base_personas)} persona(s) by filling in the missing fields. Return ONLY the JSON array with complete personas, no extra text or markdown formatting.",
             },
         ]
 
-        logger.debug(f"Sending request to model '{model_name}'...")
-        response = self.llm_client.generate_simple(messages, model=model)
-        content = response.choices[0].message.content
-        
-        logger.debug(f"Received response from '{model_name}' ({len(content)} characters)")
-        logger.debug(f"Response preview: {content[:200]}...")
+    def plan_chunk_size(self, model: Optional[str] = None, max_chunk_size: int = DEFAULT_MAX_CHUNK_SIZE) -> int:
+        """
+        Number of personas one completion request can return within the
+        model's output token budget.
+
+        Args:
+            model: Model to use (defaults to config)
+            max_chunk_size: Upper bound on personas per request
+
+        Returns:
+            Personas per request (at least 1)
+        """
+        model_name = model or DEFAULT_MODEL
+        if model_name not in self._persona_tokens:
+            estimate = estimate_persona_tokens(PERSONA_TOKEN_SAMPLE, 1, model_name)
+            self._persona_tokens[model_name] = int(estimate["single_persona_tokens"] * OUTPUT_TOKEN_SAFETY_FACTOR)
+        per_persona = self._persona_tokens[model_name]
+        chunk_size = max(1, min(max_chunk_size, get_output_token_budget(model_name) // per_persona))
+        logger.debug(
+            f"Chunk size for '{model_name}': {chunk_size} "
+            f"(~{per_persona} output tokens per persona, budget {get_output_token_budget(model_name)})"
+        )
+        return chunk_size
 
+    def _complete_chunk(
+        self,
+        chunk: List[Dict],
+        model_name: str,
+        max_retries: int,
+        on_persona: Optional[Callable[[Dict], None]] = None,
+    ) -> List[Optional[Dict]]:
+        """
+        Complete one chunk of base personas, retrying it on its own.
+
+        A reply cut off at the output limit is split in half and each half is
+        requested separately; a half that fails does not discard the other.
+
+        Returns:
+            Completed personas in chunk order (None where a split half failed)
+
+        Raises:
+            ValueError: If the chunk still fails after `max_retries` retries
+        """
+        error = None
+        for attempt in range(max_retries + 1):
+            try:
+                response = self.llm_client.generate_simple(self.completion_messages(chunk), model=model_name)
+            except Exception as e:
+                error = f"request failed ({e})"
+                logger.warning(f"Chunk of {len(chunk)} persona(s) failed (attempt {attempt + 1}/{max_retries + 1}): {error}")
+                continue
+            choice = response.choices[0]
+            content = choice.message.content or ""
+            logger.debug(f"Received response from '{model_name}' ({len(content)} characters) for {len(chunk)} persona(s)")
+
+            if choice.finish_reason == "length" and len(chunk) > 1:
+                half = len(chunk) // 2
+                logger.warning(f"Reply for {len(chunk)} persona(s) was truncated; splitting into {half} + {len(chunk) - half}")
+                return (
+                    self._complete_half(chunk[:half], model_name, max_retries, on_persona)
+                    + self._complete_half(chunk[half:], model_name, max_retries, on_persona)
+                )
+
+            try:
+                personas = json.loads(content)
+            except json.JSONDecodeError as e:
+                error = f"invalid JSON ({e})"
+                logger.debug(f"Response content: {content[:500]}")
+            else:
+                if isinstance(personas, list) and len(personas) == len(chunk) and all(isinstance(p, dict) for p in personas):
+                    # Pair replies with base records by echoed ID (else position) and restore the base fields
+                    slots = self.base_field_enforcer.match(personas, chunk)
+                    if None in slots:
+                        slots = list(range(len(chunk)))
+                    completed: List[Optional[Dict]] = [None] * len(chunk)
+                    for persona, slot in zip(personas, slots):
+                        completed[slot] = self.base_field_enforcer.enforce(persona, chunk[slot])
+                    if on_persona is not None:
+                        for persona in completed:
+                            on_persona(persona)
+                    return completed
+                error = f"expected a list of {len(chunk)} persona object(s)"
+            logger.warning(f"Chunk of {len(chunk)} persona(s) failed (attempt {attempt + 1}/{max_retries + 1}): {error}")
+        raise ValueError(f"Could not complete chunk of {len(chunk)} persona(s): {error}")
+
+    def _complete_half(
+        self,
+        chunk: List[Dict],
+        model_name: str,
+        max_retries: int,
+        on_persona: Optional[Callable[[Dict], None]] = None,
+    ) -> List[Optional[Dict]]:
+        """Complete half of a split chunk; None for every persona if it fails."""
         try:
-            personas = json.loads(content)
-            logger.info(f"Successfully parsed {len(personas)} completed persona(s)")
-            if personas:
-                logger.debug(f"Sample completed persona: {json.dumps(personas[0], indent=2, ensure_ascii=False)}")
-            return personas
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON response: {e}")
-            logger.error(f"Response content: {content[:500]}")
-            raise
+            return self._complete_chunk(chunk, model_name, max_retries, on_persona)
+        except Exception as e:
+            logger.error(f"Half chunk of {len(chunk)} persona(s) failed: {e}")
+            return [None] * len(chunk)
+
+    def _stream_chunk(
+        self,
+        chunk: List[Dict],
+        model_name: str,
+        max_retries: int,
+        on_persona: Optional[Callable[[Dict], None]] = None,
+    ) -> List[Optional[Dict]]:
+        """
+        Complete one chunk with a streamed request, parsing personas as they arrive.
+
+        Each array element is decoded as soon as it is complete and emitted
+        through `on_persona`. Elements that are malformed or missing (e.g. a
+        truncated reply) are re-requested on their own in the next attempt.
+
+        Returns:
+            Completed personas in chunk order (None where all attempts failed)
+        """
+        results: List[Optional[Dict]] = [None] * len(chunk)
+        pending = list(range(len(chunk)))
+        for attempt in range(max_retries + 1):
+            request = [chunk[i] for i in pending]
+            parser = JsonArrayStreamParser()
+            used = set()
+            try:
+                stream = self.llm_client.stream_simple(self.completion_messages(request), model=model_name)
+                for text in stream:
+                    for index, value, error in parser.feed(text):
+                        if error is None and isinstance(value, dict):
+                            # Pair with a base record by echoed ID (else position) and restore the base fields
+                            slot = self.base_field_enforcer.match([value], request, used=used, start=index)[0]
+                            if slot is None:
+                                continue
+                            persona = self.base_field_enforcer.enforce(value, request[slot])
+                            results[pending[slot]] = persona
+                            if on_persona is not None:
+                                on_persona(persona)
+                        else:
+                            logger.debug(f"Persona {index + 1}/{len(request)} could not be used: {error or 'not an object'}")
+                outcome = f"finish reason: {stream.finish_reason}"
+            except Exception as e:
+                # Personas parsed before the stream broke are kept
+                outcome = f"stream failed: {e}"
+
+            pending = [i for i in pending if results[i] is None]
+            if not pending:
+                break
+            logger.warning(
+                f"{len(pending)} of {len(request)} streamed persona(s) failed "
+                f"(attempt {attempt + 1}/{max_retries + 1}, {outcome})"
+                + ("; re-requesting only those" if attempt < max_retries else "")
+            )
+        return results
+
+    def repair_personas(
+        self,
+        invalid: List[Tuple[Dict, Dict[str, str]]],
+        model: Optional[str] = None,
+        max_rounds: int = 2,
+        chunk_size: int = DEFAULT_MAX_CHUNK_SIZE,
+    ) -> List[Tuple[Dict, Dict[str, str]]]:
+        """
+        Re-request only the invalid fields of completed personas.
+
+        Each request lists the invalid fields of a few personas with their
+        allowed values (the rest of the persona is sent as context) and asks
+        for those fields only. Returned values are merged into the personas
+        in place; base demographic fields are never changed.
+
+        Args:
+            invalid: (persona, errors) pairs as returned by `validate_persona`
+            model: Model to use (defaults to config)
+            max_rounds: Repair requests per persona
+            chunk_size: Personas per repair request
+
+        Returns:
+            (persona, errors) pairs that are still invalid
+        """
+        model_name = model or DEFAULT_MODEL
+        pending = [
+            (persona, {name: error for name, error in errors.items() if name not in BASE_PERSONA_FIELDS})
+            for persona, errors in invalid
+        ]
+        unrepairable = [(persona, errors) for persona, errors in pending if not errors]
+        pending = [(persona, errors) for persona, errors in pending if errors]
+
+        for round_number in range(max_rounds):
+            if not pending:
+                break
+            logger.info(
+                f"Repairing {sum(len(errors) for _, errors in pending)} field(s) of {len(pending)} persona(s) "
+                f"(round {round_number + 1}/{max_rounds})"
+            )
+            still_invalid = []
+            for start in range(0, len(pending), chunk_size):
+                chunk = pending[start:start + chunk_size]
+                repairs = [
+                    {
+                        "index": index,
+                        "persona": {name: value for name, value in persona.items() if name not in errors},
+                        "fields": {name: describe_allowed(name) for name in errors},
+                    }
+                    for index, (persona, errors) in enumerate(chunk)
+                ]
+                messages = [
+                    {"role": "system", "content": create_persona_repair_prompt(repairs)},
+                    {
+                        "role": "user",
+                        "content": f"Repair the listed fields of all {len(chunk)} persona(s). Return ONLY the JSON array, no extra text or markdown formatting.",
+                    },
+                ]
+                try:
+                    response = self.llm_client.generate_simple(messages, model=model_name)
+                    fixes = json.loads(response.choices[0].message.content or "")
+                except Exception as e:
+                    logger.warning(f"Repair request for {len(chunk)} persona(s) failed: {e}")
+                    fixes = []
+
+                for fix in fixes if isinstance(fixes, list) else []:
+                    index = fix.get("index") if isinstance(fix, dict) else None
+                    if not isinstance(index, int) or not 0 <= index < len(chunk):
+                        continue
+                    persona, errors = chunk[index]
+                    persona.update({name: fix[name] for name in errors if name in fix})
+
+                for persona, errors in chunk:
+                    persona.update(coerce_persona(persona))
+                    remaining = {name: error for name, error in validate_persona(persona).items() if name not in BASE_PERSONA_FIELDS}
+                    if remaining:
+                        still_invalid.append((persona, remaining))
+            pending = still_invalid
+        return unrepairable + pending
+
+    def complete_personas(
+        self,
+        base_personas: List[Dict],
+        model: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+        max_workers: int = 4,
+        max_retries: int = 2,
+        stream: bool = False,
+        on_persona: Optional[Callable[[Dict], None]] = None,
+        repair: bool = True,
+    ) -> List[Dict]:
+        """
+        Complete personas with predefined demographic fields.
+
+        Base personas are split into chunks sized to the model's output token
+        budget (see `plan_chunk_size`) and completed concurrently. A failed
+        chunk is retried on its own; with `stream=True` replies are parsed
+        element by element and only the failed personas are re-requested.
+        Base personas that still fail are left out and kept in
+        `self.failed_base_personas`.
+
+        Replies are paired with their base records by the echoed persona ID
+        (by position if the model dropped it) and the base fields are restored
+        as each persona arrives; drift counts are kept in `self.drift_stats`.
+
+        Every completed persona is checked against the persona schema (see
+        `models.persona_schema`). With `repair=True` the invalid fields are
+        re-requested in a targeted repair pass (see `repair_personas`);
+        personas that stay invalid are still returned and listed in
+        `self.invalid_personas`, and counts are kept in `self.repair_stats`.
+
+        Args:
+            base_personas: List of dictionaries with demographic fields
+            model: Model to use (defaults to config)
+            chunk_size: Personas per request (defaults to the planned size)
+            max_workers: Maximum concurrent requests
+            max_retries: Retries per chunk
+            stream: Stream replies and parse personas as they arrive
+            on_persona: Called with each completed persona as soon as it is
+                available (from worker threads; must be thread-safe); invalid
+                personas are passed on after the repair pass
+            repair: Re-request invalid fields of completed personas
+
+        Returns:
+            List of completed persona dictionaries in base persona order
+        """
+        model_name = model or DEFAULT_MODEL
+        chunk_size = chunk_size or self.plan_chunk_size(model_name)
+        chunks = [base_personas[i:i + chunk_size] for i in range(0, len(base_personas), chunk_size)]
+        logger.info(
+            f"Completing {len(base_personas)} persona(s) using model '{model_name}' "
+            f"in {len(chunks)} chunk(s) of up to {chunk_size}{' (streaming)' if stream else ''}"
+        )
+        logger.debug(f"Base personas sample: {json.dumps(base_personas[0] if base_personas else {}, indent=2, ensure_ascii=False)}")
+
+        self.base_field_enforcer = BaseFieldEnforcer()
+        invalid: List[Tuple[Dict, Dict[str, str]]] = []
+        invalid_lock = threading.Lock()
+
+        def accept(persona: Dict):
+            """Validate a completed persona; hold invalid ones back for repair."""
+            persona.update(coerce_persona(persona))
+            errors = validate_persona(persona)
+            if errors:
+                logger.debug(f"Completed persona has invalid field(s): {errors}")
+                with invalid_lock:
+                    invalid.append((persona, errors))
+            elif on_persona is not None:
+                on_persona(persona)
+
+        complete_chunk = self._stream_chunk if stream else self._complete_chunk
+        results: List[List[Optional[Dict]]] = [[None] * len(chunk) for chunk in chunks]
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+            futures = {
+                executor.submit(complete_chunk, chunk, model_name, max_retries, accept): index
+                for index, chunk in enumerate(chunks)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    logger.error(f"Chunk {index + 1}/{len(chunks)} failed: {e}")
+
+        # Personas of failed chunks may have been accepted before the failure
+        completed = {id(persona) for chunk_results in results for persona in chunk_results if persona is not None}
+        invalid = [(persona, errors) for persona, errors in invalid if id(persona) in completed]
+        remaining = self.repair_personas(invalid, model_name, chunk_size=chunk_size) if repair and invalid else invalid
+        if on_persona is not None:
+            for persona, _ in invalid:
+                on_persona(persona)
+        self.invalid_personas = [{"persona": persona, "errors": errors} for persona, errors in remaining]
+        self.repair_stats = {
+            "invalid": len(invalid),
+            "invalid_fields": sum(len(errors) for _, errors in invalid),
+            "repaired": len(invalid) - len(remaining),
+            "still_invalid": len(remaining),
+        }
+        self.drift_stats = self.base_field_enforcer.summary()
+        logger.info(f"Base fields: {self.base_field_enforcer.describe()}")
+        if invalid:
+            logger.info(
+                f"Schema check: {len(invalid)} persona(s) had invalid fields, "
+                f"{self.repair_stats['repaired']} repaired, {len(remaining)} still invalid"
+            )
+
+        personas = []
+        self.failed_base_personas = []
+        for chunk, chunk_results in zip(chunks, results):
+            for base, persona in zip(chunk, chunk_results):
+                if persona is None:
+                    self.failed_base_personas.append(base)
+                else:
+                    personas.append(persona)
+        logger.info(f"Successfully completed {len(personas)}/{len(base_personas)} persona(s)")
+        if personas:
+            logger.debug(f"Sample completed persona: {json.dumps(personas[0], indent=2, ensure_ascii=False)}")
+        return personas
 
     def generate_with_stats(
         self, count: int, model: Optional[str] = None
@@ -223,7 +562,7 @@ class PersonaGenerator:
         Returns:
             List of completed persona dictionaries
         """
-        base_personas = [generate_base_persona() for _ in range(count)]
+        base_personas = self.sample_base_personas(count)
         return self.complete_personas(base_personas, model=model)
 
     def generate_batch_with_stats(
@@ -232,41 +571,50 @@ class PersonaGenerator:
         personas_per_batch: int = 10,
         batch_count: int = 1,
         model: Optional[str] = None,
-        batch_file_path: str = "batch_input_personas.jsonl",
+        batch_file_path: Optional[str] = None,
     ):
         """
         Generate personas using batch API with predefined statistics.
 
+        The base records of every request are kept in
+        `self.batch_base_personas` (keyed by custom_id) and written next to the
+        batch input file as `<name>.base.json`; pass them to
+        `BatchProcessor.save_batch_output(base_personas=...)` so base fields
+        are restored when the output is saved.
+
         Args:
             batch_processor: Batch processor instance
             personas_per_batch: Number of personas per batch request
             batch_count: Number of batch requests
             model: Model to use (defaults to config)
-            batch_file_path: Path for batch input file
+            batch_file_path: Path for batch input file (default: a fresh
+                directory under cache/batches)
 
         Returns:
-            Batch object
+            Batch object (ShardedBatch if the requests were split)
         """
         messages_list = []
-
-        for _ in range(batch_count):
-            # Generate base personas for this batch
-            base_personas = [generate_base_persona() for _ in range(personas_per_batch)]
-
-            # Create messages
-            system_prompt = create_constrained_persona_prompt(base_personas)
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {
-                    "role": "user",
-                    "content": f"Complete all {len(base_personas)} persona(s) by filling in the missing fields. Return ONLY the JSON array with complete personas, no extra text or markdown formatting.",
-                },
-            ]
-            messages_list.append(messages)
+        cohort = self.sample_base_personas(personas_per_batch * batch_count)
+        self.batch_base_personas = {}
+
+        for i in range(batch_count):
+            # Base personas for this batch
+            base_personas = cohort[i * personas_per_batch:(i + 1) * personas_per_batch]
+            self.batch_base_personas[f"request-{i + 1}"] = base_personas
+            messages_list.append(self.completion_messages(base_personas))
+
+        if batch_file_path is None:
+            batch_file_path = str(new_batch_run_dir("personas") / "batch_input_personas.jsonl")
+        base_file_path = Path(batch_file_path).with_suffix(".base.json")
+        with open(base_file_path, "w", encoding="utf-8") as f:
+            json.dump(self.batch_base_personas, f, ensure_ascii=False)
+        self.batch_base_personas_path = str(base_file_path)
+        logger.info(f"Saved base personas of {batch_count} request(s) to {base_file_path}")
 
         return batch_processor.create_batch(
             messages_list,
             model=model or DEFAULT_MODEL,
             batch_file_path=batch_file_path,
             description=f"Batch processing for {batch_count * personas_per_batch} personas with base demographics",
+            custom_ids=list(self.batch_base_personas),
         )
@@ -3,6 +3,21 @@ Data models for persona generation and interviews.
 """
 from .persona import PersonaDetails
 from .enums import SUBJECTS
+from .persona_schema import (
+    PERSONA_FIELD_VALUES,
+    REQUIRED_PERSONA_FIELDS,
+    coerce_persona,
+    describe_allowed,
+    validate_persona,
+)
 
-__all__ = ["PersonaDetails", "SUBJECTS"]
+__all__ = [
+    "PersonaDetails",
+    "SUBJECTS",
+    "PERSONA_FIELD_VALUES",
+    "REQUIRED_PERSONA_FIELDS",
+    "coerce_persona",
+    "describe_allowed",
+    "validate_persona",
+]
 
@@ -0,0 +1,153 @@
+"""
+Allowed values of completed persona fields and a fast validator.
+
+The enumerations mirror the accepted values listed in
+PERSONA_GENERATION_PROMPT / CONSTRAINED_PERSONA_PROMPT_TEMPLATE; the set of
+required fields comes from the PersonaDetails dataclass. Lookups are
+precompiled into frozensets and case-insensitive maps, so validating a
+persona is a handful of dictionary lookups.
+"""
+from dataclasses import fields
+from numbers import Integral
+from typing import Any, Dict, FrozenSet, List, Optional
+
+from .persona import PersonaDetails
+
+_HEALTH_LEVELS = ["Good", "Average", "Poor"]
+_LOW_AVERAGE_HIGH = ["Low", "Average", "High"]
+
+# Enumerated string fields and their accepted values
+PERSONA_FIELD_VALUES: Dict[str, List[Optional[str]]] = {
+    "gender": ["Male", "Female"],
+    "marital_status": ["Single", "Married", "Widowed", "Divorced"],
+    "children": ["None", "1", "2-3", "4+"],
+    "living_situation": ["Living with Family", "Living Alone", "Shared Housing"],
+    "general_health": _HEALTH_LEVELS,
+    "chronic_disease": [
+        None, "High Blood Pressure", "Cardiovascular Diseases", "Type 2 Diabetes", "Arthritis and Joint Pain",
+        "Osteoporosis", "Alzheimer's and Dementia", "Chronic Kidney Disease", "Chronic Obstructive Pulmonary Disease",
+        "Chronic Depression and Anxiety", "Vision and Hearing Problems", "Chronic Liver Failure", "Parkinson's",
+        "Chronic Sleep Disorders", "Chronic Gastrointestinal Issues",
+    ],
+    "mobility": ["Independent", "With Cane or Walker", "In Wheelchair", "Dependent"],
+    "hearing_senses": _HEALTH_LEVELS,
+    "vision_senses": _HEALTH_LEVELS,
+    "daily_energy": ["High", "Average", "Low"],
+    "personality_type": [
+        "INTJ", "INTP", "ENTJ", "ENTP", "INFJ", "INFP", "ENFJ", "ENFP",
+        "ISTJ", "ISFJ", "ESTJ", "ESFJ", "ISTP", "ISFP", "ESTP", "ESFP",
+    ],
+    "cognitive_status": ["Healthy Memory", "Mild Forgetfulness", "Alzheimer's"],
+    "dominant_emotion": ["Happy", "Sad", "Anxious", "Calm"],
+    "emotional_intelligence": _LOW_AVERAGE_HIGH,
+    "iq": _LOW_AVERAGE_HIGH,
+    "attitude_toward_aging": ["Acceptance", "Resistance", "Meaning-Seeking", "Denial"],
+    "main_social_role": ["Grandfather", "Grandmother", "Retired", "Social Activist"],
+    "social_support": ["Large Family", "Alone", "Supportive Friends", "Government Support"],
+    "social_participation": ["Active", "Inactive"],
+    "income": ["Independent", "Retirement Pension", "Dependent on Children", "No Income"],
+    "housing": ["Own Home", "Rented", "Nursing Home"],
+    "religion_and_sect": ["Shia Muslim", "Sunni Muslim", "Christian", "Zoroastrian", "Jewish"],
+    "religiosity_level": _LOW_AVERAGE_HIGH,
+    "ethnicity": ["Persian", "Azeri", "Kurdish", "Lur", "Baloch", "Arab", "Turkmen", "Gilaki", "Mazandarani", "Qashqai"],
+    "language": ["Persian", "Azeri", "Kurdish", "Luri", "Balochi", "Arabic", "Turkmen", "Gilaki", "Mazandarani", "Qashqai"],
+    "important_personal_experiences": [
+        "Immigration", "Career Success", "Loss of Loved Ones", "War Experience", "Economic Hardship",
+        "Educational Achievement", "Battle with Serious Illness (e.g., Cancer, Chronic Disease)",
+    ],
+    "life_satisfaction": ["Satisfied", "Dissatisfied", "Neutral"],
+    "meaning_and_purpose_in_old_age": ["Helping Family", "Spiritual Activities", "Waiting for Death", "Pleasure-Seeking"],
+}
+
+# Integer fields and their inclusive ranges
+PERSONA_INT_RANGES = {
+    "age": (60, 100),
+    "economic_decile": (1, 10),
+}
+
+# List fields and their allowed lengths
+PERSONA_LIST_LENGTHS = {
+    "internalized_moral_traits": (2, 4),
+}
+
+REQUIRED_PERSONA_FIELDS: FrozenSet[str] = frozenset(f.name for f in fields(PersonaDetails))
+
+# Precompiled lookups
+_ALLOWED: Dict[str, FrozenSet] = {name: frozenset(values) for name, values in PERSONA_FIELD_VALUES.items()}
+_CANONICAL: Dict[str, Dict[str, Optional[str]]] = {
+    name: {str(value).strip().lower(): value for value in values if value is not None}
+    for name, values in PERSONA_FIELD_VALUES.items()
+}
+_NULL_STRINGS = frozenset({"", "none", "null", "n/a"})
+
+
+def describe_allowed(field: str) -> str:
+    """Human/LLM-readable description of the accepted values of a field."""
+    if field in PERSONA_FIELD_VALUES:
+        return ", ".join("null" if value is None else value for value in PERSONA_FIELD_VALUES[field])
+    if field in PERSONA_INT_RANGES:
+        low, high = PERSONA_INT_RANGES[field]
+        return f"integer {low}-{high}"
+    if field in PERSONA_LIST_LENGTHS:
+        low, high = PERSONA_LIST_LENGTHS[field]
+        return f"list of {low}-{high} short strings"
+    return "string"
+
+
+def coerce_persona(persona: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fix harmless formatting differences without changing meaning.
+
+    Integer strings become integers, enumerated values are matched
+    case-insensitively, and "None"/"null" become None where None is allowed.
+
+    Args:
+        persona: Persona dictionary
+
+    Returns:
+        New persona dictionary
+    """
+    coerced = dict(persona)
+    for name, value in persona.items():
+        if name in PERSONA_INT_RANGES and isinstance(value, str) and value.strip().lstrip("-").isdigit():
+            coerced[name] = int(value.strip())
+        elif name in _CANONICAL and isinstance(value, str):
+            key = value.strip().lower()
+            if key in _CANONICAL[name]:
+                coerced[name] = _CANONICAL[name][key]
+            elif key in _NULL_STRINGS and None in _ALLOWED[name]:
+                coerced[name] = None
+    return coerced
+
+
+def validate_persona(persona: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Check a completed persona against the schema.
+
+    Fields not in PersonaDetails (e.g. identifiers) are ignored.
+
+    Args:
+        persona: Persona dictionary
+
+    Returns:
+        Dictionary mapping invalid field name to the reason (empty if valid)
+    """
+    errors = {}
+    for name in REQUIRED_PERSONA_FIELDS - persona.keys():
+        errors[name] = "missing"
+    for name, value in persona.items():
+        if name in _ALLOWED:
+            try:
+                if value not in _ALLOWED[name]:
+                    errors[name] = f"{value!r} is not an accepted value"
+            except TypeError:
+                errors[name] = f"{value!r} is not an accepted value"
+        elif name in PERSONA_INT_RANGES:
+            low, high = PERSONA_INT_RANGES[name]
+            if isinstance(value, bool) or not isinstance(value, Integral) or not low <= value <= high:
+                errors[name] = f"{value!r} is not an integer in {low}-{high}"
+        elif name in PERSONA_LIST_LENGTHS:
+            low, high = PERSONA_LIST_LENGTHS[name]
+            if not isinstance(value, list) or not low <= len(value) <= high or not all(isinstance(v, str) for v in value):
+                errors[name] = f"expected a list of {low}-{high} strings"
+    return errors
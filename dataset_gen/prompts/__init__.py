@@ -4,7 +4,9 @@ Prompt templates for persona and interview generation.
 from .persona_prompts import (
     PERSONA_GENERATION_PROMPT,
     CONSTRAINED_PERSONA_PROMPT_TEMPLATE,
-    create_constrained_persona_prompt
+    PERSONA_REPAIR_PROMPT_TEMPLATE,
+    create_constrained_persona_prompt,
+    create_persona_repair_prompt,
 )
 from .interview_prompts import (
     INTERVIEW_SYSTEM_PROMPT_TEMPLATE,
@@ -17,6 +19,8 @@ __all__ = [
     "PERSONA_GENERATION_PROMPT",
     "CONSTRAINED_PERSONA_PROMPT_TEMPLATE",
     "create_constrained_persona_prompt",
+    "PERSONA_REPAIR_PROMPT_TEMPLATE",
+    "create_persona_repair_prompt",
     "INTERVIEW_SYSTEM_PROMPT_TEMPLATE",
     "INTERVIEW_ANSWER_PROMPT_TEMPLATE",
     "format_system_prompt",
@@ -1,7 +1,7 @@
 """
 Prompts for interview generation.
 """
-from typing import Dict
+from typing import Any, Dict
 
 
 INTERVIEW_SYSTEM_PROMPT_TEMPLATE = """
@@ -49,17 +49,32 @@ INTERVIEW_ANSWER_PROMPT_TEMPLATE = """
 """
 
 
+def _format_persona_value(value: Any) -> Any:
+    """Render a persona field the same way every time (lists joined, sets sorted)."""
+    if isinstance(value, (set, frozenset)):
+        value = sorted(value, key=str)
+    if isinstance(value, (list, tuple)):
+        return "، ".join(str(v) for v in value)
+    return value
+
+
 def format_system_prompt(persona: Dict) -> str:
     """
     Format the system prompt with persona information.
     
+    The result depends only on the persona's field values, so every turn of
+    an interview starts with byte-identical text and the provider's prompt
+    prefix cache can serve it.
+    
     Args:
         persona: Dictionary containing persona information
     
     Returns:
         Formatted system prompt string
     """
-    return INTERVIEW_SYSTEM_PROMPT_TEMPLATE.format(**persona)
+    return INTERVIEW_SYSTEM_PROMPT_TEMPLATE.format(
+        **{key: _format_persona_value(value) for key, value in persona.items()}
+    )
 
 
 def format_answer_prompt(question: str) -> str:
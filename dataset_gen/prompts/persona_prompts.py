@@ -123,6 +123,7 @@ CONSTRAINED_PERSONA_PROMPT_TEMPLATE = f"""You must complete the following Irania
 
 Rules:
 - The demographic fields ({_BASE_FIELDS_LIST}) are already provided. DO NOT change them.
+- Copy each persona's "id" unchanged.
 - Fill in all the remaining fields with realistic values that are consistent with the provided demographic information.
 - Ensure diversity in the values you assign, but maintain realism and internal consistency.
 - Personas should reflect cultural and social realities of Iran.
@@ -184,3 +185,29 @@ def create_constrained_persona_prompt(base_personas: List[Dict]) -> str:
     # Format the template: first replace base_personas, then it's already an f-string for _BASE_FIELDS_LIST
     return CONSTRAINED_PERSONA_PROMPT_TEMPLATE.replace("{base_personas}", personas_str)
 
+
+PERSONA_REPAIR_PROMPT_TEMPLATE = """Some fields of the following Iranian elderly persona(s) have values that are not allowed.
+
+Rules:
+- Replace ONLY the listed fields of each persona, choosing from the allowed values given for that field.
+- Keep the new values realistic and consistent with the rest of the persona.
+- Return a JSON array with one object per persona, in the same order. Each object must contain "index" and the listed fields only.
+
+Personas to repair:
+{repairs}
+"""
+
+
+def create_persona_repair_prompt(repairs: List[Dict]) -> str:
+    """
+    Create a prompt asking to re-fill only the invalid fields of personas.
+
+    Args:
+        repairs: List of dictionaries with "index", "persona" (the valid
+            fields, for context) and "fields" (field name -> allowed values)
+
+    Returns:
+        Formatted prompt string
+    """
+    repairs_str = json.dumps(repairs, ensure_ascii=False)
+    return PERSONA_REPAIR_PROMPT_TEMPLATE.replace("{repairs}", repairs_str)
@@ -1,4 +1,4 @@
-from utils import SUBJECTS
+from models import SUBJECTS
 
 INTERVIEW_QUESTIONS = [
     {
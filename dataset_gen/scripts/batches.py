@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Script to list and watch registered batch jobs.
+
+Batches submitted by generate_personas.py / generate_interviews.py are
+recorded in the batch registry. `watch` polls every unfinished batch with
+exponential backoff and saves finished outputs; it can be stopped and
+restarted at any time.
+"""
+import sys
+import argparse
+from pathlib import Path
+from datetime import datetime
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils import BatchProcessor, BatchRegistry, create_openai_client, watch_batches
+from utils.batch_registry import DEFAULT_REGISTRY_PATH
+from utils.logging_utils import setup_logging, log_section
+
+
+def print_jobs(jobs, logger):
+    """Log one line per job."""
+    if not jobs:
+        logger.info("No batches registered")
+        return
+    for job in jobs:
+        counts = job["request_counts"] or {}
+        progress = f"{counts.get('completed', 0)}/{counts.get('total', '?')}" if counts else "-"
+        created = datetime.fromtimestamp(job["created_at"]).strftime("%Y-%m-%d %H:%M")
+        logger.info(
+            f"{job['batch_id']}  {job['kind']:<9} {job['status']:<11} {progress:>9}  {created}  "
+            f"{job['output_path'] or job['output_dir'] or ''}"
+            + (f"  error: {job['error']}" if job["error"] else "")
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List and watch registered batch jobs")
+    parser.add_argument("--registry", type=str, default=DEFAULT_REGISTRY_PATH, help="Batch job registry (SQLite)")
+    parser.add_argument("--log-level", type=str, default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="Logging level")
+    parser.add_argument("--log-file", type=str, default=None, help="Path to log file (optional)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="List registered batches")
+    list_parser.add_argument("--pending", action="store_true", help="Only batches that are running or not yet saved")
+
+    watch_parser = subparsers.add_parser("watch", help="Poll pending batches and save finished outputs")
+    watch_parser.add_argument("--interval", type=float, default=30.0, help="Seconds before the second check of a batch")
+    watch_parser.add_argument("--max-interval", type=float, default=600.0, help="Upper bound on seconds between checks")
+    watch_parser.add_argument("--backoff", type=float, default=2.0, help="Growth factor of the interval per check")
+    watch_parser.add_argument("--max-workers", type=int, default=8, help="Batches checked concurrently")
+    watch_parser.add_argument("--once", action="store_true", help="Check every pending batch once and exit")
+    watch_parser.add_argument("--no-download", action="store_true", help="Only track status; do not save outputs")
+
+    args = parser.parse_args()
+
+    # Setup logging
+    log_file = args.log_file or f"logs/batches_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+    logger = setup_logging(log_level=args.log_level, log_file=log_file, script_name="batches")
+
+    registry = BatchRegistry(args.registry)
+    if args.command == "list":
+        print_jobs(registry.jobs(pending_only=args.pending), logger)
+        return
+
+    log_section(logger, "BATCH WATCH STARTED", "INFO")
+    logger.info(f"Registry: {args.registry}")
+    batch_processor = BatchProcessor(create_openai_client(), registry=registry)
+    try:
+        jobs = watch_batches(
+            batch_processor,
+            registry,
+            download=not args.no_download,
+            initial_interval=args.interval,
+            max_interval=args.max_interval,
+            backoff=args.backoff,
+            max_workers=args.max_workers,
+            once=args.once,
+        )
+    except KeyboardInterrupt:
+        logger.warning("Interrupted; run the command again to continue watching")
+        sys.exit(130)
+    print_jobs(jobs, logger)
+    log_section(logger, "BATCH WATCH COMPLETED", "INFO")
+
+
+if __name__ == "__main__":
+    main()
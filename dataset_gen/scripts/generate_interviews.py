@@ -14,8 +14,11 @@ import pandas as pd
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from generators import InterviewGenerator
-from generators.interview_generator import DatasetGenerator
-from utils import LLMClient, create_openai_client
+from generators.interview_generator import DatasetGenerator, AsyncDatasetGenerator, BatchDatasetGenerator
+from utils import BatchProcessor, BatchRegistry, LLMClient, AsyncLLMClient, create_openai_client, create_async_openai_client, get_rate_limiter, ResponseCache, ProviderRouter
+from utils.provider_router import PROVIDERS
+from utils.checkpoint import RunCheckpoint
+from utils.dataset_writer import OUTPUT_FORMATS
 from utils.logging_utils import setup_logging, log_model_response, log_progress, log_section
 from questions import INTERVIEW_QUESTIONS
 from config import DEFAULT_MODEL, VERSION
@@ -42,6 +45,10 @@ def load_personas(personas_path: str, logger: logging.Logger):
                         # Split comma-separated strings back to lists
                         persona[key] = [v.strip() for v in value.split(",") if v.strip()]
             logger.info(f"Successfully loaded {len(personas)} personas from CSV")
+        elif personas_path.endswith(".parquet"):
+            logger.debug("Loading from Parquet format...")
+            personas = pd.read_parquet(personas_path).to_dict("records")
+            logger.info(f"Successfully loaded {len(personas)} personas from Parquet")
         elif personas_path.endswith(".jsonl"):
             logger.debug("Loading from JSONL format...")
             personas = []
@@ -68,14 +75,38 @@ def load_personas(personas_path: str, logger: logging.Logger):
 
 def main():
     parser = argparse.ArgumentParser(description="Generate interview dataset from personas")
-    parser.add_argument("--personas", type=str, required=True, help="Path to personas file (JSON, JSONL, or CSV)")
+    parser.add_argument("--personas", type=str, default=None, help="Path to personas file (JSON, JSONL, or CSV); required unless --resume is given")
     parser.add_argument("--models", type=str, nargs="+", default=[DEFAULT_MODEL], help="Models to use")
     parser.add_argument("--output-dir", type=str, default=f"data/{VERSION}", help="Output directory")
-    parser.add_argument("--delay", type=float, default=5.0, help="Delay between API calls (seconds)")
+    parser.add_argument("--delay", type=float, default=0.0, help="Extra fixed delay between API calls (seconds); throttling is handled by the per-model rate limiter")
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of interviews to run concurrently (values > 1 use the async engine)")
+    parser.add_argument("--batch", action="store_true", help="Use the Batch API: turn k of every interview is submitted as one batch job per model")
+    parser.add_argument("--poll-interval", type=float, default=60.0, help="Seconds between status checks of in-flight batches (with --batch)")
+    parser.add_argument("--output-format", type=str, default="jsonl", choices=OUTPUT_FORMATS + ["csv"], help="Dataset format: streamed JSONL/Parquet part files, or one CSV per persona × model (legacy)")
+    parser.add_argument("--max-file-mb", type=int, default=256, help="Roll over to a new JSONL/Parquet part file beyond this size (MB)")
+    parser.add_argument("--resume", type=str, default=None, help="Run directory (<output-dir>/runs/<session>) of an interrupted run to resume")
+    parser.add_argument("--providers", type=str, nargs="+", default=None, choices=list(PROVIDERS), help="Spread requests over these providers with failover (not used with --batch; default: Metis only)")
+    parser.add_argument("--cache", type=str, default=None, help="Path to an on-disk response cache (SQLite); identical requests are not paid for twice")
+    parser.add_argument("--replay", action="store_true", help="Serve requests only from --cache and fail on misses (no API calls)")
     parser.add_argument("--log-level", type=str, default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="Logging level")
     parser.add_argument("--log-file", type=str, default=None, help="Path to log file (optional)")
     
     args = parser.parse_args()
+    if args.replay and not args.cache:
+        parser.error("--replay requires --cache")
+    if args.batch and args.concurrency > 1:
+        parser.error("--batch cannot be combined with --concurrency")
+    
+    # A resumed run keeps the personas, models and output directory it started with
+    checkpoint = None
+    if args.resume:
+        checkpoint = RunCheckpoint.load(args.resume)
+        args.personas = checkpoint.config.get("personas", args.personas)
+        args.models = checkpoint.config.get("models", args.models)
+        args.output_dir = checkpoint.config.get("output_dir", args.output_dir)
+        args.output_format = checkpoint.config.get("output_format", args.output_format)
+    if not args.personas:
+        parser.error("--personas is required unless --resume is given")
     
     # Setup logging
     log_file = args.log_file or f"logs/interview_generation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
@@ -86,8 +117,13 @@ def main():
     logger.info(f"  - Personas file: {args.personas}")
     logger.info(f"  - Models: {', '.join(args.models)}")
     logger.info(f"  - Output directory: {args.output_dir}")
+    logger.info(f"  - Output format: {args.output_format}")
     logger.info(f"  - Delay: {args.delay}s")
+    logger.info(f"  - Concurrency: {args.concurrency}")
+    logger.info(f"  - Batch mode: {args.batch}")
+    logger.info(f"  - Resume: {args.resume or 'no'}")
     logger.info(f"  - Log file: {log_file}")
+    logger.info(f"  - Response cache: {args.cache or 'disabled'}{' (replay)' if args.replay else ''}")
     logger.debug(f"Full arguments: {vars(args)}")
     
     # Load personas
@@ -109,12 +145,29 @@ def main():
         logger.error(f"Failed to create output directory: {e}", exc_info=True)
         raise
     
+    # Optional response cache (replay mode never calls the API)
+    cache = ResponseCache(args.cache, replay=args.replay) if args.cache else None
+    
     # Create client and generator
     logger.info("Initializing OpenAI client and LLM client...")
     try:
-        client = create_openai_client()
-        logger.debug("OpenAI client created")
-        llm_client = LLMClient(client)
+        router = ProviderRouter(args.providers) if args.providers and not args.batch else None
+        if router is not None:
+            logger.info(f"Routing requests over providers: {', '.join(args.providers)}")
+        if args.batch:
+            client = create_openai_client()
+            logger.debug("OpenAI client created")
+            # Waves are collected by the generator; the registry only records them
+            batch_processor = BatchProcessor(client, registry=BatchRegistry())
+            llm_client = None
+        elif args.concurrency > 1:
+            client = create_async_openai_client()
+            logger.debug("AsyncOpenAI client created")
+            llm_client = AsyncLLMClient(client, rate_limiter=get_rate_limiter(), cache=cache, router=router)
+        else:
+            client = create_openai_client()
+            logger.debug("OpenAI client created")
+            llm_client = LLMClient(client, rate_limiter=get_rate_limiter(), cache=cache, router=router)
         logger.debug("LLM client initialized")
     except Exception as e:
         logger.error(f"Failed to initialize clients: {e}", exc_info=True)
@@ -132,31 +185,75 @@ def main():
     
     # Generate dataset
     log_section(logger, "STARTING DATASET GENERATION", "INFO")
+    run_config = {
+        "personas": str(Path(args.personas).resolve()),
+        "models": args.models,
+        "output_dir": str(output_dir.resolve()),
+        "output_format": args.output_format,
+    }
+    writer_options = {
+        "output_format": args.output_format,
+        "max_file_bytes": args.max_file_mb * 1024 * 1024,
+    }
     try:
-        logger.info("Creating DatasetGenerator...")
-        dataset_generator = DatasetGenerator(
-            personas=personas,
-            interview_questions=INTERVIEW_QUESTIONS,
-            models=args.models,
-            llm_client=llm_client,
-            output_dir=str(output_dir)
-        )
+        if args.batch:
+            logger.info(f"Creating BatchDatasetGenerator (poll interval={args.poll_interval}s)...")
+            dataset_generator = BatchDatasetGenerator(
+                personas=personas,
+                interview_questions=INTERVIEW_QUESTIONS,
+                models=args.models,
+                batch_processor=batch_processor,
+                output_dir=str(output_dir),
+                poll_interval=args.poll_interval,
+                checkpoint=checkpoint,
+                run_config=run_config,
+                **writer_options
+            )
+        elif args.concurrency > 1:
+            logger.info(f"Creating AsyncDatasetGenerator (concurrency={args.concurrency})...")
+            dataset_generator = AsyncDatasetGenerator(
+                personas=personas,
+                interview_questions=INTERVIEW_QUESTIONS,
+                models=args.models,
+                llm_client=llm_client,
+                output_dir=str(output_dir),
+                max_concurrency=args.concurrency,
+                checkpoint=checkpoint,
+                run_config=run_config,
+                **writer_options
+            )
+        else:
+            logger.info("Creating DatasetGenerator...")
+            dataset_generator = DatasetGenerator(
+                personas=personas,
+                interview_questions=INTERVIEW_QUESTIONS,
+                models=args.models,
+                llm_client=llm_client,
+                output_dir=str(output_dir),
+                checkpoint=checkpoint,
+                run_config=run_config,
+                **writer_options
+            )
         logger.info("DatasetGenerator created successfully")
         logger.debug(f"Session prefix: {dataset_generator.session_prefix}")
+        logger.info(f"Run directory (use with --resume): {dataset_generator.checkpoint.run_dir}")
         
         logger.info(f"Starting generation with delay of {args.delay}s between API calls...")
-        all_interactions = dataset_generator.generate_dataset(delay=args.delay)
+        dataset_generator.generate_dataset(delay=args.delay)
         
         logger.info(f"✓ Generation completed successfully")
-        logger.info(f"✓ Total interactions generated: {len(all_interactions)}")
+        logger.info(f"✓ Total interactions generated: {dataset_generator.row_count}")
         logger.info(f"✓ Files saved in: {output_dir.absolute()}")
         
         # List generated files
-        csv_files = list(output_dir.glob("*.csv"))
-        if csv_files:
-            logger.info(f"Generated {len(csv_files)} CSV file(s):")
-            for csv_file in csv_files:
-                logger.info(f"  - {csv_file.name}")
+        if dataset_generator.writer is not None:
+            output_files = dataset_generator.writer.paths
+        else:
+            output_files = list(output_dir.glob(f"*_{dataset_generator.session_prefix}_*.csv"))
+        if output_files:
+            logger.info(f"Generated {len(output_files)} {args.output_format.upper()} file(s):")
+            for output_file in output_files:
+                logger.info(f"  - {output_file.name}")
         
     except Exception as e:
         logger.error(f"Failed during dataset generation: {e}", exc_info=True)
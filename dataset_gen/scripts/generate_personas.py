@@ -11,10 +11,15 @@ from datetime import datetime
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from generators import PersonaGenerator, generate_base_persona
-from utils import LLMClient, create_openai_client, BatchProcessor, save_to_csv
+from generators import PersonaGenerator, persona_records, quota_deviation
+from generators.base_persona_sampler import SAMPLING_METHODS
+from utils import LLMClient, create_openai_client, BatchProcessor, BatchRegistry, batch_shards, save_to_csv, get_rate_limiter, ResponseCache, ProviderRouter, load_distribution_tables
+from utils.provider_router import PROVIDERS
+from utils.dataset_writer import OUTPUT_FORMATS, create_dataset_writer, write_dataset
+from utils.batch_registry import DEFAULT_REGISTRY_PATH, watch_batches
+from utils.batch_utils import MAX_BATCH_REQUESTS
 from utils.logging_utils import setup_logging, log_section
-from config import DEFAULT_MODEL
+from config import DEFAULT_MODEL, SEED
 
 
 def main():
@@ -22,14 +27,32 @@ def main():
     parser.add_argument("--count", type=int, default=10, help="Number of personas to generate")
     parser.add_argument("--model", type=str, default=DEFAULT_MODEL, help="Model to use")
     parser.add_argument("--with-stats", action="store_true", help="Use statistical base demographics")
+    parser.add_argument("--seed", type=int, default=SEED, help="Seed for base persona sampling")
+    parser.add_argument("--stream", type=int, default=0, help="Sampling stream; give each parallel worker its own value")
+    parser.add_argument("--run-id", type=str, default=None, help="Run token in persona IDs; give parallel workers of one run the same value (default: random per invocation)")
+    parser.add_argument("--sampling", type=str, default="random", choices=SAMPLING_METHODS, help="Base persona sampling: independent draws or quota allocation matching the target distributions")
+    parser.add_argument("--distributions", type=str, default=None, help="Demographic distribution file (JSON/YAML; default: knowledge_base/demographic_distributions.json)")
     parser.add_argument("--output-dir", type=str, default="outputs/personas", help="Output directory for generated personas")
     parser.add_argument("--output", type=str, default=None, help="Output file name (optional, auto-generated if not provided)")
+    parser.add_argument("--output-format", type=str, default="csv", choices=["csv"] + OUTPUT_FORMATS, help="Output format for persona files")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Personas per completion request (default: sized to the model's output token budget)")
+    parser.add_argument("--max-workers", type=int, default=4, help="Concurrent completion requests")
+    parser.add_argument("--stream-completions", action="store_true", help="Stream completions: personas are parsed (and written, for JSONL/Parquet) as they arrive and only failed ones are re-requested")
+    parser.add_argument("--no-repair", action="store_true", help="Do not re-request persona fields that fail the schema check")
     parser.add_argument("--batch", action="store_true", help="Use batch API")
     parser.add_argument("--batch-size", type=int, default=10, help="Personas per batch request")
+    parser.add_argument("--max-batch-requests", type=int, default=MAX_BATCH_REQUESTS, help="Most requests per batch input file; larger batches are split into shards")
+    parser.add_argument("--registry", type=str, default=DEFAULT_REGISTRY_PATH, help="Batch job registry (SQLite) used by scripts/batches.py")
+    parser.add_argument("--watch", action="store_true", help="With --batch: wait for the batch and save its output before exiting")
+    parser.add_argument("--providers", type=str, nargs="+", default=None, choices=list(PROVIDERS), help="Spread completion requests over these providers with failover (not used with --batch; default: Metis only)")
+    parser.add_argument("--cache", type=str, default=None, help="Path to an on-disk response cache (SQLite); identical requests are not paid for twice")
+    parser.add_argument("--replay", action="store_true", help="Serve requests only from --cache and fail on misses (no API calls)")
     parser.add_argument("--log-level", type=str, default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="Logging level")
     parser.add_argument("--log-file", type=str, default=None, help="Path to log file (optional)")
     
     args = parser.parse_args()
+    if args.replay and not args.cache:
+        parser.error("--replay requires --cache")
     
     # Setup logging
     log_file = args.log_file or f"logs/persona_generation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
@@ -48,20 +71,38 @@ def main():
     logger.info(f"  - Count: {args.count}")
     logger.info(f"  - Model: {args.model}")
     logger.info(f"  - With statistics: {args.with_stats}")
+    logger.info(f"  - Sampling: {args.sampling} (seed {args.seed}, stream {args.stream})")
+    tables = load_distribution_tables(args.distributions)
+    logger.info(f"  - Distributions: {tables.source} (version {tables.version})")
     logger.info(f"  - Batch mode: {args.batch}")
     logger.info(f"  - Batch size: {args.batch_size if args.batch else 'N/A'}")
     logger.info(f"  - Output directory: {output_dir}")
+    logger.info(f"  - Output format: {args.output_format}")
     logger.info(f"  - Log file: {log_file}")
+    logger.info(f"  - Response cache: {args.cache or 'disabled'}{' (replay)' if args.replay else ''}")
     logger.debug(f"Full arguments: {vars(args)}")
     
+    # Optional response cache (replay mode never calls the API)
+    cache = ResponseCache(args.cache, replay=args.replay) if args.cache else None
+    
     # Create client and generator
     logger.info("Initializing OpenAI client and persona generator...")
     try:
         client = create_openai_client()
         logger.debug("OpenAI client created successfully")
-        llm_client = LLMClient(client)
+        router = ProviderRouter(args.providers) if args.providers and not args.batch else None
+        if router is not None:
+            logger.info(f"Routing requests over providers: {', '.join(args.providers)}")
+        llm_client = LLMClient(client, rate_limiter=get_rate_limiter(), cache=cache, router=router)
         logger.debug("LLM client initialized")
-        persona_generator = PersonaGenerator(llm_client)
+        persona_generator = PersonaGenerator(
+            llm_client,
+            seed=args.seed,
+            stream=args.stream,
+            tables=tables,
+            sampling_method=args.sampling,
+            run_id=args.run_id,
+        )
         logger.info("Persona generator initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize clients: {e}", exc_info=True)
@@ -71,7 +112,8 @@ def main():
         log_section(logger, "BATCH GENERATION MODE", "INFO")
         # Batch generation
         logger.info("Initializing batch processor...")
-        batch_processor = BatchProcessor(client)
+        registry = BatchRegistry(args.registry)
+        batch_processor = BatchProcessor(client, registry=registry, max_requests=args.max_batch_requests)
         batch_count = (args.count + args.batch_size - 1) // args.batch_size
         logger.info(f"Will create {batch_count} batch(es) with {args.batch_size} personas each")
         
@@ -87,6 +129,19 @@ def main():
                 logger.info(f"Batch created successfully: {batch.id}")
                 logger.info(f"Batch status: {batch.status}")
                 logger.debug(f"Batch metadata: {batch.metadata}")
+                # The watcher saves the output next to the run's other files
+                for shard in batch_shards(batch):
+                    registry.update(
+                        shard.id,
+                        kind="personas",
+                        output_dir=str(output_dir),
+                        output_format=args.output_format,
+                        metadata={
+                            "base_personas_path": persona_generator.batch_base_personas_path,
+                            "output_prefix": f"final_personas_{timestamp}",
+                        },
+                    )
+                logger.info(f"Batch registered in {args.registry}")
             except Exception as e:
                 logger.error(f"Failed to create batch: {e}", exc_info=True)
                 raise
@@ -94,30 +149,52 @@ def main():
             logger.error("Batch mode without stats is not implemented")
             raise NotImplementedError("Batch mode without stats not yet implemented")
         
-        logger.info("\nTo check status and retrieve results, use:")
-        logger.info(f"  batch_processor.poll_batch_status(batch)")
-        logger.info(f"  batch_processor.save_batch_output(batch, output_dir='personas')")
+        if args.watch:
+            logger.info("Waiting for the batch to finish...")
+            watch_batches(batch_processor, registry)
+            for shard in batch_shards(batch):
+                job = registry.get(shard.id)
+                logger.info(f"Batch {shard.id}: {job['status']}" + (f" → {job['output_path']}" if job['output_path'] else ""))
+        else:
+            logger.info("\nTo wait for the batch and save its output, run:")
+            logger.info(f"  python scripts/batches.py --registry {args.registry} watch")
         
     else:
         log_section(logger, "SYNCHRONOUS GENERATION MODE", "INFO")
+        
+        def save_personas(rows, name):
+            """Save persona rows as CSV or JSONL/Parquet part files; returns the first path."""
+            if args.output_format == "csv":
+                path = output_dir / f"{name}.csv"
+                save_to_csv(rows, str(path))
+                return path
+            return write_dataset(rows, args.output_format, str(output_dir), name)[0]
+        
         # Synchronous generation
         personas = []
         base_personas = []
         base_output_path = None
         
+        # Streamed personas go straight to the final JSONL/Parquet file as they arrive
+        final_writer = None
+        if args.stream_completions and args.with_stats and args.output_format != "csv":
+            final_writer = create_dataset_writer(args.output_format, str(output_dir), f"final_personas_{timestamp}")
+        
         try:
             if args.with_stats:
                 logger.info("Generating base personas with statistical demographics...")
-                base_personas = [generate_base_persona() for _ in range(args.count)]
+                base_frame = persona_generator.sampler.sample(args.count, method=args.sampling)
+                base_personas = persona_records(base_frame)
                 logger.info(f"Generated {len(base_personas)} base personas")
+                deviations = quota_deviation(base_frame, tables)
+                logger.info(f"Largest gap to target counts: {max(deviations.values()):.2f} persona(s)")
+                logger.debug(f"Gap to target counts per field: {deviations}")
                 logger.debug(f"Sample base persona: {json.dumps(base_personas[0], indent=2, ensure_ascii=False)}")
                 
                 # Save base personas
-                base_output_file = f"base_personas_{timestamp}.csv"
-                base_output_path = output_dir / base_output_file
-                logger.info(f"Saving {len(base_personas)} base personas to {base_output_path.name}...")
+                logger.info(f"Saving {len(base_personas)} base personas ({args.output_format})...")
                 try:
-                    save_to_csv(base_personas, str(base_output_path))
+                    base_output_path = save_personas(base_personas, f"base_personas_{timestamp}")
                     logger.info(f"✓ Saved base personas to: {base_output_path}")
                 except Exception as e:
                     logger.error(f"Failed to save base personas: {e}", exc_info=True)
@@ -125,9 +202,22 @@ def main():
                 
                 logger.info(f"Completing personas using model '{args.model}'...")
                 logger.info("Sending request to LLM...")
-                personas = persona_generator.complete_personas(base_personas, model=args.model)
-                logger.info(f"Received response from model '{args.model}'")
-                logger.debug(f"Response contains {len(personas)} personas")
+                personas = persona_generator.complete_personas(
+                    base_personas,
+                    model=args.model,
+                    chunk_size=args.chunk_size,
+                    max_workers=args.max_workers,
+                    stream=args.stream_completions,
+                    repair=not args.no_repair,
+                    on_persona=(lambda persona: final_writer.write_rows([persona])) if final_writer else None,
+                )
+                logger.info(f"Received {len(personas)} completed personas from model '{args.model}'")
+                if persona_generator.failed_base_personas:
+                    logger.warning(f"{len(persona_generator.failed_base_personas)} base persona(s) could not be completed")
+                logger.info(f"Base-field drift: {persona_generator.drift_stats}")
+                if persona_generator.invalid_personas:
+                    logger.warning(f"{len(persona_generator.invalid_personas)} persona(s) still have invalid fields")
+                    logger.debug(f"Invalid fields: {[item['errors'] for item in persona_generator.invalid_personas]}")
                 
                 # Log first persona as sample
                 if personas:
@@ -145,14 +235,19 @@ def main():
                     logger.info(json.dumps(personas[0], indent=2, ensure_ascii=False))
         except Exception as e:
             logger.error(f"Failed to generate personas: {e}", exc_info=True)
+            if final_writer is not None:
+                # Keep the personas that were streamed before the failure
+                final_writer.close()
             raise
         
         # Save final personas
-        final_output_file = f"final_personas_{timestamp}.csv"
-        final_output_path = output_dir / final_output_file
-        logger.info(f"Saving {len(personas)} final personas to {final_output_path.name}...")
+        logger.info(f"Saving {len(personas)} final personas ({args.output_format})...")
         try:
-            save_to_csv(personas, str(final_output_path))
+            if final_writer is not None:
+                final_writer.close()
+                final_output_path = final_writer.paths[0] if final_writer.paths else save_personas(personas, f"final_personas_{timestamp}")
+            else:
+                final_output_path = save_personas(personas, f"final_personas_{timestamp}")
             logger.info(f"✓ Saved final personas to: {final_output_path}")
         except Exception as e:
             logger.error(f"Failed to save final personas: {e}", exc_info=True)
@@ -4,218 +4,324 @@ Validation script to compare base and final personas.
 
 This script ensures that the LLM does not modify the base demographic fields
 that were provided in the base personas.
+
+Personas are matched by their stable `id` (files written before personas had
+IDs are matched by position). The base file is held as categorical codes and
+the final file is streamed in chunks, so the comparison over all
+BASE_PERSONA_FIELDS is a vectorized NumPy operation per chunk.
 """
+import re
 import sys
 import argparse
 import json
 from pathlib import Path
-from typing import List, Dict, Set, Tuple
+from typing import Dict, Iterator, List, Sequence, Tuple, Union
+
+import numpy as np
 import pandas as pd
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from utils.logging_utils import setup_logging, log_section
-from constants import BASE_PERSONA_FIELDS
+from constants import BASE_PERSONA_FIELDS, PERSONA_ID_FIELD
+
+# Rows read per chunk
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Identifiers and example mismatches listed in the report
+DEFAULT_MAX_EXAMPLES = 20
+
+PERSONA_FILE_SUFFIXES = (".csv", ".jsonl", ".parquet")
 
+# Key used for files without persona IDs
+POSITION_KEY = "_position"
 
-def normalize_value(value) -> str:
+
+def normalize_column(values: pd.Series) -> pd.Series:
     """
-    Normalize a value for comparison (handle type differences).
-    
+    Normalize a column for comparison (handle type differences).
+
+    Missing values become "" and everything else its stripped string form,
+    so 67 (JSON) and "67" (CSV) compare equal. Integral floats drop their
+    ".0", since a null makes pandas read an int column as float64. Only the
+    distinct values are converted, which keeps this cheap for low-cardinality
+    fields.
+
     Args:
-        value: Value to normalize
-        
+        values: Column to normalize
+
     Returns:
-        Normalized string representation
+        Column of strings
     """
-    if value is None:
-        return ""
-    if pd.isna(value):
-        return ""
-    # Convert to string and strip whitespace for comparison
-    return str(value).strip()
+    categorical = pd.Categorical(values.astype(object))
+    # Code -1 (missing) picks the trailing ""
+    labels = np.array([
+        str(int(value)) if isinstance(value, float) and value.is_integer() else str(value).strip()
+        for value in categorical.categories
+    ] + [""], dtype=object)
+    return pd.Series(labels[categorical.codes], index=values.index)
 
 
-def compare_personas(base: Dict, final: Dict, shared_fields: Set[str]) -> Dict:
+def read_columns(file_path: str) -> List[str]:
     """
-    Compare a base persona with its final version.
-    
+    Column names of a CSV, JSONL or Parquet persona file.
+
     Args:
-        base: Base persona dictionary
-        final: Final persona dictionary
-        shared_fields: Set of field names to compare
-        
+        file_path: Path to the file
+
     Returns:
-        Dictionary with comparison results
+        List of column names
+    """
+    suffix = Path(file_path).suffix
+    if suffix == ".csv":
+        return list(pd.read_csv(file_path, nrows=0, encoding="utf-8").columns)
+    if suffix == ".jsonl":
+        with open(file_path, "r", encoding="utf-8") as f:
+            first = f.readline()
+        return list(json.loads(first)) if first.strip() else []
+    if suffix == ".parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(file_path).schema_arrow.names
+    raise ValueError(f"Unsupported persona file type: {file_path}")
+
+
+def iter_persona_frames(
+    file_paths: Sequence[str],
+    columns: Sequence[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read persona files in chunks.
+
+    Args:
+        file_paths: Files to read, in order (e.g. the parts of one dataset)
+        columns: Columns to keep (missing ones are skipped)
+        chunk_size: Rows per chunk
+
+    Yields:
+        DataFrames with the requested columns as normalized strings and a
+        running `_position` column
     """
-    matches = {}
-    mismatches = {}
-    
-    for field in shared_fields:
-        base_value = normalize_value(base.get(field))
-        final_value = normalize_value(final.get(field))
-        
-        if base_value == final_value:
-            matches[field] = base_value
+    position = 0
+    for file_path in file_paths:
+        available = set(read_columns(file_path))
+        wanted = [column for column in columns if column in available]
+        suffix = Path(file_path).suffix
+        if suffix == ".csv":
+            chunks = pd.read_csv(
+                file_path, usecols=wanted, dtype=str, keep_default_na=False, encoding="utf-8", chunksize=chunk_size
+            )
+        elif suffix == ".jsonl":
+            chunks = (chunk[[c for c in wanted if c in chunk]] for chunk in pd.read_json(file_path, lines=True, dtype=False, chunksize=chunk_size))
         else:
-            mismatches[field] = {
-                "base": base_value,
-                "final": final_value
-            }
-    
-    return {
-        "matches": matches,
-        "mismatches": mismatches,
-        "match_count": len(matches),
-        "mismatch_count": len(mismatches),
-        "total_fields": len(shared_fields)
-    }
+            import pyarrow.parquet as pq
+            chunks = (batch.to_pandas() for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_size, columns=wanted))
 
+        for chunk in chunks:
+            frame = pd.DataFrame({
+                column: chunk[column].astype(str) if column == PERSONA_ID_FIELD else normalize_column(chunk[column])
+                for column in chunk.columns
+            })
+            frame[POSITION_KEY] = np.arange(position, position + len(chunk)).astype(str)
+            position += len(chunk)
+            yield frame
 
-def load_personas_csv(file_path: str) -> List[Dict]:
+
+class BasePersonaIndex:
+    """Base personas keyed by ID, with every field stored as categorical codes."""
+
+    def __init__(self, frame: pd.DataFrame, key: str, fields: Sequence[str]):
+        """
+        Args:
+            frame: Normalized base personas
+            key: Column to match on
+            fields: Fields to compare
+        """
+        duplicated = frame[key].duplicated()
+        self.duplicates = int(duplicated.sum())
+        frame = frame[~duplicated]
+        self.ids = pd.Index(frame[key])
+        self.codes: Dict[str, np.ndarray] = {}
+        self.categories: Dict[str, pd.Index] = {}
+        for field in fields:
+            categorical = pd.Categorical(frame[field])
+            self.codes[field] = categorical.codes
+            self.categories[field] = categorical.categories
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def find_persona_files(directory: str) -> Tuple[List[str], List[str]]:
     """
-    Load personas from CSV file.
-    
+    Find base and final persona files in a directory.
+
     Args:
-        file_path: Path to CSV file
-        
+        directory: Directory path to search
+
     Returns:
-        List of persona dictionaries
+        Tuple of (base_files, final_files); each is the most recent dataset
+        (all of its part files for JSONL/Parquet output)
     """
-    df = pd.read_csv(file_path, encoding="utf-8")
-    # Convert DataFrame to list of dictionaries
-    personas = df.to_dict("records")
-    
-    # Handle NaN values - convert to None
-    for persona in personas:
-        for key, value in persona.items():
-            if pd.isna(value):
-                persona[key] = None
-    
-    return personas
+    def latest_dataset(kind: str) -> List[str]:
+        files = [path for path in Path(directory).glob(f"{kind}_*") if path.suffix in PERSONA_FILE_SUFFIXES]
+        if not files:
+            raise FileNotFoundError(f"No {kind.replace('_', ' ')} files found in {directory}")
+        latest = max(files, key=lambda p: p.stat().st_mtime)
+        prefix = re.sub(r"_part\d+$", "", latest.stem)
+        return sorted(
+            str(path) for path in files
+            if path.suffix == latest.suffix and re.sub(r"_part\d+$", "", path.stem) == prefix
+        )
+
+    return latest_dataset("base_personas"), latest_dataset("final_personas")
 
 
 def validate_personas(
-    base_file: str,
-    final_file: str,
-    logger
+    base_file: Union[str, Sequence[str]],
+    final_file: Union[str, Sequence[str]],
+    logger,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_examples: int = DEFAULT_MAX_EXAMPLES,
 ) -> Dict:
     """
     Validate that base persona fields are preserved in final personas.
-    
+
     Args:
-        base_file: Path to base personas CSV file
-        final_file: Path to final personas CSV file
+        base_file: Path (or list of part paths) of the base personas
+        final_file: Path (or list of part paths) of the final personas
         logger: Logger instance
-        
+        chunk_size: Rows read per chunk
+        max_examples: Number of IDs and example mismatches kept in the report
+
     Returns:
         Dictionary with validation results
     """
-    logger.info(f"Loading base personas from: {base_file}")
-    base_personas = load_personas_csv(base_file)
-    logger.info(f"Loaded {len(base_personas)} base personas")
-    
-    logger.info(f"Loading final personas from: {final_file}")
-    final_personas = load_personas_csv(final_file)
-    logger.info(f"Loaded {len(final_personas)} final personas")
-    
-    if len(base_personas) != len(final_personas):
-        logger.warning(
-            f"Mismatch in persona counts: base={len(base_personas)}, "
-            f"final={len(final_personas)}"
-        )
-        min_count = min(len(base_personas), len(final_personas))
-        logger.warning(f"Will compare only the first {min_count} personas")
-        base_personas = base_personas[:min_count]
-        final_personas = final_personas[:min_count]
-    
-    # Find shared fields (fields that exist in both base and final)
-    if base_personas and final_personas:
-        base_fields = set(base_personas[0].keys())
-        final_fields = set(final_personas[0].keys())
-        shared_fields = BASE_PERSONA_FIELDS.intersection(base_fields).intersection(final_fields)
-        
-        logger.info(f"Base persona fields: {sorted(base_fields)}")
-        logger.info(f"Final persona fields: {sorted(final_fields)}")
-        logger.info(f"Shared fields to validate: {sorted(shared_fields)}")
-        
-        if not shared_fields:
-            logger.error("No shared fields found between base and final personas!")
-            return {
-                "total_personas": len(base_personas),
-                "shared_fields": [],
-                "results": []
-            }
+    base_files = [base_file] if isinstance(base_file, str) else list(base_file)
+    final_files = [final_file] if isinstance(final_file, str) else list(final_file)
+
+    base_columns = set(read_columns(base_files[0]))
+    final_columns = set(read_columns(final_files[0]))
+    shared_fields = sorted(BASE_PERSONA_FIELDS & base_columns & final_columns)
+    logger.info(f"Shared fields to validate: {shared_fields}")
+    if not shared_fields:
+        logger.error("No shared fields found between base and final personas!")
+        return {"total_personas": 0, "shared_fields": [], "total_mismatches": 0}
+
+    if PERSONA_ID_FIELD in base_columns and PERSONA_ID_FIELD in final_columns:
+        key = PERSONA_ID_FIELD
     else:
-        logger.error("No personas found in files!")
-        return {
-            "total_personas": 0,
-            "shared_fields": [],
-            "results": []
-        }
-    
-    # Compare each persona
-    results = []
-    total_matches = 0
-    total_mismatches = 0
+        key = POSITION_KEY
+        logger.warning(f"Persona files have no '{PERSONA_ID_FIELD}' column; matching personas by position")
+
+    logger.info(f"Loading base personas from: {', '.join(base_files)}")
+    base_frame = pd.concat(
+        list(iter_persona_frames(base_files, [PERSONA_ID_FIELD] + shared_fields, chunk_size)), ignore_index=True
+    )
+    base = BasePersonaIndex(base_frame, key, shared_fields)
+    del base_frame
+    logger.info(f"Loaded {len(base)} base personas")
+    if base.duplicates:
+        logger.warning(f"{base.duplicates} duplicate base persona ID(s); keeping the first of each")
+
+    seen = np.zeros(len(base), dtype=bool)
+    field_mismatches = {field: 0 for field in shared_fields}
+    final_count = 0
+    duplicate_count = 0
+    unexpected_count = 0
+    unexpected_ids: List[str] = []
     perfect_matches = 0
-    personas_with_mismatches = []
-    
-    logger.info(f"\nComparing {len(base_personas)} personas...")
-    
-    for idx, (base, final) in enumerate(zip(base_personas, final_personas), 1):
-        comparison = compare_personas(base, final, shared_fields)
-        results.append({
-            "persona_index": idx,
-            "comparison": comparison
-        })
-        
-        if comparison["mismatch_count"] == 0:
-            perfect_matches += 1
-            total_matches += comparison["match_count"]
-        else:
-            personas_with_mismatches.append(idx)
-            total_mismatches += comparison["mismatch_count"]
-            total_matches += comparison["match_count"]
-            
-            logger.warning(f"Persona {idx} has {comparison['mismatch_count']} mismatched field(s):")
-            for field, values in comparison["mismatches"].items():
-                logger.warning(
-                    f"  - {field}: base='{values['base']}' vs final='{values['final']}'"
-                )
-    
-    # Summary statistics
-    total_comparisons = len(base_personas) * len(shared_fields)
-    match_percentage = (total_matches / total_comparisons * 100) if total_comparisons > 0 else 0
-    
-    summary = {
-        "total_personas": len(base_personas),
-        "shared_fields": sorted(shared_fields),
+    mismatched_ids: List[str] = []
+    personas_with_mismatches = 0
+    examples: List[Dict] = []
+
+    logger.info(f"Comparing final personas from: {', '.join(final_files)}")
+    for chunk in iter_persona_frames(final_files, [PERSONA_ID_FIELD] + shared_fields, chunk_size):
+        final_count += len(chunk)
+        positions = base.ids.get_indexer(chunk[key])
+        known = positions >= 0
+        unexpected_count += int((~known).sum())
+        unexpected_ids.extend(chunk[key][~known].head(max_examples - len(unexpected_ids)).tolist())
+
+        chunk = chunk[known]
+        positions = positions[known]
+        # Repeated IDs (within this chunk or seen in an earlier one) are compared but counted
+        repeated = seen[positions] | pd.Index(positions).duplicated()
+        duplicate_count += int(repeated.sum())
+        seen[positions] = True
+
+        row_mismatch = np.zeros(len(chunk), dtype=bool)
+        for field in shared_fields:
+            final_codes = pd.Categorical(chunk[field], categories=base.categories[field]).codes
+            diff = final_codes != base.codes[field][positions]
+            field_mismatches[field] += int(diff.sum())
+            row_mismatch |= diff
+            for row in np.nonzero(diff)[0][:max(0, max_examples - len(examples))]:
+                examples.append({
+                    "id": chunk[key].iat[row],
+                    "field": field,
+                    "base": str(base.categories[field][base.codes[field][positions[row]]]),
+                    "final": chunk[field].iat[row],
+                })
+
+        personas_with_mismatches += int(row_mismatch.sum())
+        perfect_matches += int((~row_mismatch).sum())
+        mismatched_ids.extend(chunk[key][row_mismatch].head(max_examples - len(mismatched_ids)).tolist())
+
+    matched = int(seen.sum())
+    missing_ids = base.ids[~seen][:max_examples].tolist()
+    total_comparisons = (final_count - unexpected_count) * len(shared_fields)
+    total_mismatches = sum(field_mismatches.values())
+    match_percentage = ((total_comparisons - total_mismatches) / total_comparisons * 100) if total_comparisons > 0 else 0
+
+    return {
+        "key": "id" if key == PERSONA_ID_FIELD else "position",
+        "total_personas": len(base),
+        "final_personas": final_count,
+        "matched_personas": matched,
+        "missing_in_final": len(base) - matched,
+        "unexpected_in_final": unexpected_count,
+        "duplicates_in_final": duplicate_count,
+        "shared_fields": shared_fields,
         "total_field_comparisons": total_comparisons,
-        "total_matches": total_matches,
+        "total_matches": total_comparisons - total_mismatches,
         "total_mismatches": total_mismatches,
         "match_percentage": match_percentage,
         "perfect_matches": perfect_matches,
-        "personas_with_mismatches": len(personas_with_mismatches),
-        "persona_indices_with_mismatches": personas_with_mismatches,
-        "results": results
+        "personas_with_mismatches": personas_with_mismatches,
+        "field_mismatches": {field: count for field, count in field_mismatches.items() if count},
+        "persona_ids_with_mismatches": mismatched_ids,
+        "missing_ids": missing_ids,
+        "unexpected_ids": unexpected_ids,
+        "mismatch_examples": examples,
     }
-    
-    return summary
 
 
 def print_summary(summary: Dict, logger):
     """
     Print validation summary.
-    
+
     Args:
         summary: Validation summary dictionary
         logger: Logger instance
     """
     log_section(logger, "VALIDATION SUMMARY", "INFO")
-    
-    logger.info(f"Total personas compared: {summary['total_personas']}")
+
+    if not summary.get("shared_fields"):
+        logger.error("Nothing to compare")
+        return
+
+    logger.info(f"Matched by: {summary['key']}")
+    logger.info(f"Base personas: {summary['total_personas']}")
+    logger.info(f"Final personas: {summary['final_personas']}")
+    logger.info(f"Matched personas: {summary['matched_personas']}")
+    if summary['missing_in_final']:
+        logger.warning(f"⚠ Missing in final: {summary['missing_in_final']} (e.g. {summary['missing_ids']})")
+    if summary['unexpected_in_final']:
+        logger.warning(f"⚠ Not in base: {summary['unexpected_in_final']} (e.g. {summary['unexpected_ids']})")
+    if summary['duplicates_in_final']:
+        logger.warning(f"⚠ Duplicated in final: {summary['duplicates_in_final']}")
     logger.info(f"Shared fields validated: {len(summary['shared_fields'])}")
     logger.info(f"  Fields: {', '.join(summary['shared_fields'])}")
     logger.info("")
@@ -224,55 +330,23 @@ def print_summary(summary: Dict, logger):
     logger.info(f"Mismatches: {summary['total_mismatches']}")
     logger.info(f"Match percentage: {summary['match_percentage']:.2f}%")
     logger.info("")
-    logger.info(f"Perfect matches (all fields match): {summary['perfect_matches']}/{summary['total_personas']}")
+    logger.info(f"Perfect matches (all fields match): {summary['perfect_matches']}/{summary['matched_personas']}")
     logger.info(f"Personas with mismatches: {summary['personas_with_mismatches']}")
-    
-    if summary['persona_indices_with_mismatches']:
-        logger.warning(f"⚠ Persona indices with mismatches: {summary['persona_indices_with_mismatches']}")
+
+    if summary['persona_ids_with_mismatches']:
+        logger.warning(f"⚠ Persona IDs with mismatches (first {len(summary['persona_ids_with_mismatches'])}): {summary['persona_ids_with_mismatches']}")
     else:
         logger.info("✓ All personas match perfectly!")
-    
-    # Field-level statistics
-    if summary['results']:
-        logger.info("\nField-level mismatch analysis:")
-        field_mismatches = {}
-        for result in summary['results']:
-            for field, values in result['comparison']['mismatches'].items():
-                if field not in field_mismatches:
-                    field_mismatches[field] = 0
-                field_mismatches[field] += 1
-        
-        if field_mismatches:
-            for field, count in sorted(field_mismatches.items(), key=lambda x: x[1], reverse=True):
-                logger.warning(f"  - {field}: {count} mismatch(es)")
-        else:
-            logger.info("  ✓ No field-level mismatches found")
-
 
-def find_persona_files(directory: str) -> Tuple[str, str]:
-    """
-    Find base and final persona files in a directory.
-    
-    Args:
-        directory: Directory path to search
-        
-    Returns:
-        Tuple of (base_file, final_file) paths
-    """
-    dir_path = Path(directory)
-    base_files = list(dir_path.glob("base_personas_*.csv"))
-    final_files = list(dir_path.glob("final_personas_*.csv"))
-    
-    if not base_files:
-        raise FileNotFoundError(f"No base persona files found in {directory}")
-    if not final_files:
-        raise FileNotFoundError(f"No final persona files found in {directory}")
-    
-    # Use the most recent files if multiple exist
-    base_file = max(base_files, key=lambda p: p.stat().st_mtime)
-    final_file = max(final_files, key=lambda p: p.stat().st_mtime)
-    
-    return str(base_file), str(final_file)
+    # Field-level statistics
+    logger.info("\nField-level mismatch analysis:")
+    if summary['field_mismatches']:
+        for field, count in sorted(summary['field_mismatches'].items(), key=lambda x: x[1], reverse=True):
+            logger.warning(f"  - {field}: {count} mismatch(es)")
+        for example in summary['mismatch_examples']:
+            logger.warning(f"  - {example['id']} {example['field']}: base='{example['base']}' vs final='{example['final']}'")
+    else:
+        logger.info("  ✓ No field-level mismatches found")
 
 
 def main():
@@ -282,14 +356,16 @@ def main():
     parser.add_argument(
         "--base",
         type=str,
+        nargs="+",
         default=None,
-        help="Path to base personas CSV file (optional if --dir is provided)"
+        help="Base persona file(s): CSV, JSONL or Parquet parts (optional if --dir is provided)"
     )
     parser.add_argument(
         "--final",
         type=str,
+        nargs="+",
         default=None,
-        help="Path to final personas CSV file (optional if --dir is provided)"
+        help="Final persona file(s): CSV, JSONL or Parquet parts (optional if --dir is provided)"
     )
     parser.add_argument(
         "--dir",
@@ -303,6 +379,18 @@ def main():
         default=None,
         help="Path to save validation report JSON (optional)"
     )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="Rows read per chunk"
+    )
+    parser.add_argument(
+        "--max-examples",
+        type=int,
+        default=DEFAULT_MAX_EXAMPLES,
+        help="IDs and example mismatches listed in the report"
+    )
     parser.add_argument(
         "--log-level",
         type=str,
@@ -316,39 +404,41 @@ def main():
         default=None,
         help="Path to log file (optional)"
     )
-    
+
     args = parser.parse_args()
-    
+
     # Setup logging
     from datetime import datetime
     log_file = args.log_file or f"logs/validate_personas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
     logger = setup_logging(log_level=args.log_level, log_file=log_file, script_name="validate_personas")
-    
+
     log_section(logger, "PERSONA VALIDATION SCRIPT STARTED", "INFO")
-    
+
     # Determine file paths
     if args.dir:
         logger.info(f"Searching for persona files in directory: {args.dir}")
-        base_file, final_file = find_persona_files(args.dir)
-        logger.info(f"Found base personas file: {base_file}")
-        logger.info(f"Found final personas file: {final_file}")
+        base_files, final_files = find_persona_files(args.dir)
+        logger.info(f"Found base personas file(s): {base_files}")
+        logger.info(f"Found final personas file(s): {final_files}")
     elif args.base and args.final:
-        base_file = args.base
-        final_file = args.final
+        base_files = args.base
+        final_files = args.final
     else:
         logger.error("Either --dir or both --base and --final must be provided")
         parser.print_help()
         sys.exit(1)
-    
+
     logger.info(f"Log file: {log_file}")
-    
+
     # Validate
     try:
-        summary = validate_personas(base_file, final_file, logger)
-        
+        summary = validate_personas(
+            base_files, final_files, logger, chunk_size=args.chunk_size, max_examples=args.max_examples
+        )
+
         # Print summary
         print_summary(summary, logger)
-        
+
         # Save report if requested
         if args.output:
             output_path = Path(args.output)
@@ -356,7 +446,7 @@ def main():
             with open(output_path, "w", encoding="utf-8") as f:
                 json.dump(summary, f, indent=2, ensure_ascii=False)
             logger.info(f"\nValidation report saved to: {output_path}")
-        
+
         # Exit code based on results
         if summary['total_mismatches'] > 0:
             logger.warning("\n⚠ Validation found mismatches! LLM modified base persona fields.")
@@ -364,7 +454,7 @@ def main():
         else:
             logger.info("\n✓ Validation passed! All base persona fields are preserved.")
             sys.exit(0)
-            
+
     except Exception as e:
         logger.error(f"Validation failed: {e}", exc_info=True)
         sys.exit(1)
@@ -372,4 +462,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
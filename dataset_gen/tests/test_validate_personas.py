@@ -0,0 +1,36 @@
+"""Tests for scripts/validate_personas.py."""
+import json
+import logging
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.validate_personas import normalize_column, validate_personas
+
+
+def test_normalize_column_renders_integral_floats_as_ints():
+    values = pd.Series([72, None, 35.5, "67 "])
+    assert normalize_column(values).tolist() == ["72", "", "35.5", "67"]
+
+
+def test_null_in_int_column_is_not_a_mismatch(tmp_path):
+    base = pd.DataFrame({"id": ["a", "b", "c", "d"], "age": ["72", "", "40", "35"], "gender": ["f", "m", "f", "m"]})
+    base_file = tmp_path / "base_personas.csv"
+    base.to_csv(base_file, index=False)
+
+    # With a chunk size of 2 the first chunk reads `age` as float64 (null) and the second as int64
+    final_file = tmp_path / "final_personas.jsonl"
+    with open(final_file, "w", encoding="utf-8") as f:
+        for record in base.assign(age=[72, None, 40, 35]).to_dict("records"):
+            f.write(json.dumps(record) + "\n")
+
+    # Parquet stores the column as float64
+    parquet_file = tmp_path / "final_personas.parquet"
+    pd.read_json(final_file, lines=True).to_parquet(parquet_file, index=False)
+
+    for file in (final_file, parquet_file):
+        results = validate_personas(str(base_file), str(file), logging.getLogger(__name__), chunk_size=2)
+        assert results["total_mismatches"] == 0, results
@@ -1,29 +1,108 @@
 """
 Utility functions for dataset generation.
 """
-from .llm_client import LLMClient, create_openai_client
-from .batch_utils import BatchProcessor
+from .llm_client import (
+    LLMClient,
+    AsyncLLMClient,
+    CompletionStream,
+    UsageStats,
+    cached_prompt_tokens,
+    create_openai_client,
+    create_async_openai_client
+)
+from .batch_utils import BatchProcessor, ShardedBatch, batch_shards, iter_batch_output
+from .batch_registry import BatchRegistry, watch_batches
 from .token_utils import (
     num_tokens_from_messages,
     num_tokens_from_string,
     estimate_persona_tokens,
-    estimate_run_tokens
+    estimate_run_tokens,
+    compare_token_counts
 )
 from .csv_utils import save_to_csv, flatten_dict_for_csv
-from .model_params import build_generation_params, get_supported_params, add_model_capabilities
+from .model_params import (
+    build_generation_params,
+    get_supported_params,
+    add_model_capabilities,
+    get_rate_limit,
+    add_rate_limit,
+    get_output_token_budget,
+    add_output_token_budget
+)
+from .rate_limiter import RateLimiter, get_rate_limiter
+from .http_clients import HttpClientPool, get_http_client_pool
+from .retry import RetryPolicy, CircuitBreaker, CircuitOpenError, classify_error, get_circuit_breaker, retry_call, aretry_call
+from .provider_router import ProviderRouter, add_provider
+from .response_cache import ResponseCache, CacheMissError
+from .dataset_writer import (
+    DatasetWriter,
+    JsonlDatasetWriter,
+    ParquetDatasetWriter,
+    create_dataset_writer,
+    write_dataset
+)
+from .json_stream import JsonArrayStreamParser
+from .base_fields import BaseFieldEnforcer
+from .distributions import (
+    AliasTable,
+    ConditionalAliasTable,
+    DistributionTables,
+    load_distribution_tables
+)
 
 __all__ = [
     "LLMClient",
+    "AsyncLLMClient",
+    "CompletionStream",
+    "UsageStats",
+    "cached_prompt_tokens",
     "create_openai_client",
+    "create_async_openai_client",
     "BatchProcessor",
+    "ShardedBatch",
+    "batch_shards",
+    "iter_batch_output",
+    "BatchRegistry",
+    "watch_batches",
     "num_tokens_from_messages",
     "num_tokens_from_string",
     "estimate_persona_tokens",
     "estimate_run_tokens",
+    "compare_token_counts",
     "save_to_csv",
     "flatten_dict_for_csv",
     "build_generation_params",
     "get_supported_params",
     "add_model_capabilities",
+    "get_rate_limit",
+    "add_rate_limit",
+    "get_output_token_budget",
+    "add_output_token_budget",
+    "RateLimiter",
+    "get_rate_limiter",
+    "HttpClientPool",
+    "get_http_client_pool",
+    "RetryPolicy",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "classify_error",
+    "get_circuit_breaker",
+    "retry_call",
+    "aretry_call",
+    "ProviderRouter",
+    "add_provider",
+    "ResponseCache",
+    "CacheMissError",
+    "DatasetWriter",
+    "JsonlDatasetWriter",
+    "ParquetDatasetWriter",
+    "create_dataset_writer",
+    "write_dataset",
+    "JsonArrayStreamParser",
+    "BaseFieldEnforcer",
+    "AliasTable",
+    "ConditionalAliasTable",
+    "DistributionTables",
+    "load_distribution_tables",
 ]
 
@@ -0,0 +1,128 @@
+"""
+Inline enforcement of immutable base persona fields.
+
+Completed personas are checked against the base record they were generated
+from as soon as they come back from the model. Fields the model changed are
+overwritten with the base values on the spot and counted, so drift is both
+fixed and visible without a separate validation pass.
+"""
+import logging
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from constants import PERSONA_ID_FIELD
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+
+def _same(a: Any, b: Any) -> bool:
+    """Compare values the way validate_personas does (67 == "67", None == "")."""
+    return ("" if a is None else str(a).strip()) == ("" if b is None else str(b).strip())
+
+
+class BaseFieldEnforcer:
+    """
+    Restores base fields of completed personas and records drift.
+
+    Every key of the base record (the persona ID and the statistically drawn
+    demographics) is immutable. Thread-safe, so one enforcer can be shared by
+    concurrent completion workers.
+    """
+
+    def __init__(self):
+        self.personas = 0
+        self.drifted_personas = 0
+        self.field_drift: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def enforce(self, persona: Dict, base: Dict) -> Dict:
+        """
+        Merge a completed persona with its base record.
+
+        Args:
+            persona: Persona as returned by the model
+            base: Base record it was generated from
+
+        Returns:
+            New persona dictionary with all base values restored
+        """
+        drifted = [
+            field for field, value in base.items()
+            if field != PERSONA_ID_FIELD and field in persona and not _same(persona[field], value)
+        ]
+        with self._lock:
+            self.personas += 1
+            if drifted:
+                self.drifted_personas += 1
+                self.field_drift.update(drifted)
+        if drifted:
+            logger.debug(
+                f"Restored base field(s) of persona {base.get(PERSONA_ID_FIELD, '?')}: "
+                + ", ".join(f"{field} {persona[field]!r} -> {base[field]!r}" for field in drifted)
+            )
+        return {**persona, **base}
+
+    def match(
+        self,
+        replies: Sequence[Any],
+        bases: Sequence[Dict],
+        used: Optional[Set[int]] = None,
+        start: int = 0,
+    ) -> List[Optional[int]]:
+        """
+        Pair reply elements with base records.
+
+        An element is matched by persona ID when the model echoed a known
+        one, and by position otherwise; every base record is used at most once.
+
+        Args:
+            replies: Elements of the model's JSON array
+            bases: Base records of the request, in request order
+            used: Indices already taken (updated in place; pass the same set
+                when a reply is matched element by element)
+            start: Position of the first element in the whole reply
+
+        Returns:
+            Index into `bases` for every reply element (None if unmatched)
+        """
+        by_id = {str(base[PERSONA_ID_FIELD]): index for index, base in enumerate(bases) if PERSONA_ID_FIELD in base}
+        used = set() if used is None else used
+        slots: List[Optional[int]] = []
+        for index, reply in enumerate(replies, start):
+            reply_id = reply.get(PERSONA_ID_FIELD) if isinstance(reply, dict) else None
+            slot = by_id.get(str(reply_id)) if reply_id is not None else None
+            if slot is None or slot in used:
+                slot = index if index < len(bases) and index not in used else None
+            if slot is not None:
+                used.add(slot)
+            slots.append(slot)
+        return slots
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Drift statistics so far.
+
+        Returns:
+            Dictionary with "personas", "drifted_personas", "drift_rate" and
+            "field_drift" (field -> number of personas it was restored in)
+        """
+        with self._lock:
+            return {
+                "personas": self.personas,
+                "drifted_personas": self.drifted_personas,
+                "drift_rate": self.drifted_personas / self.personas if self.personas else 0.0,
+                "field_drift": dict(self.field_drift.most_common()),
+            }
+
+    def describe(self) -> str:
+        """One-line summary for logs."""
+        summary = self.summary()
+        if not summary["drifted_personas"]:
+            return f"no base-field drift in {summary['personas']} persona(s)"
+        fields = ", ".join(f"{field}: {count}" for field, count in summary["field_drift"].items())
+        return (
+            f"restored base fields of {summary['drifted_personas']}/{summary['personas']} "
+            f"persona(s) ({summary['drift_rate']:.1%}; {fields})"
+        )
@@ -0,0 +1,438 @@
+"""
+Persistent registry of submitted batch jobs and an auto-polling watcher.
+
+Every batch created through a `BatchProcessor` with a registry is recorded
+in SQLite together with its input file and metadata, so batch IDs survive
+the process that submitted them. `watch_batches` polls all unfinished jobs
+with per-job exponential backoff and downloads finished outputs; the polling
+schedule lives in the database, so a restarted watcher continues where the
+previous one stopped. The shards of a sharded personas batch are saved
+together, once all of them have finished.
+"""
+import json
+import time
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .batch_utils import TERMINAL_BATCH_STATUSES, ShardedBatch
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY_PATH = "cache/batches.sqlite"
+
+# Local status of a completed job whose output has been saved
+DOWNLOADED_STATUS = "downloaded"
+
+# Failed attempts to save a completed job's output before it is marked failed
+MAX_SAVE_ATTEMPTS = 5
+
+# Serializes saving sharded outputs so concurrent shard polls merge only once
+_merge_lock = threading.Lock()
+
+_COLUMNS = [
+    "batch_id", "kind", "status", "input_file", "output_dir", "output_format", "output_path",
+    "metadata", "request_counts", "error", "poll_count", "next_poll_at", "created_at", "updated_at",
+]
+
+
+class BatchRegistry:
+    """SQLite-backed registry of batch jobs (thread-safe)."""
+
+    def __init__(self, path: str = DEFAULT_REGISTRY_PATH):
+        """
+        Initialize batch registry.
+
+        Args:
+            path: Path to the SQLite database file
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS batch_jobs (
+                batch_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                input_file TEXT,
+                output_dir TEXT,
+                output_format TEXT,
+                output_path TEXT,
+                metadata TEXT NOT NULL,
+                request_counts TEXT,
+                error TEXT,
+                poll_count INTEGER NOT NULL DEFAULT 0,
+                next_poll_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_batch_jobs_status ON batch_jobs(status)")
+        self._conn.commit()
+
+    def register(
+        self,
+        batch_id: str,
+        kind: str = "chat",
+        status: str = "validating",
+        input_file: Optional[str] = None,
+        output_dir: Optional[str] = None,
+        output_format: str = "jsonl",
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Record a submitted batch.
+
+        Args:
+            batch_id: Provider batch ID
+            kind: Job kind ("personas" outputs are saved as personas, others as raw JSONL)
+            status: Provider status at submission
+            input_file: Local batch input file
+            output_dir: Directory the watcher saves the output to (None: not downloaded by the watcher)
+            output_format: "csv", "jsonl" or "parquet" (personas only)
+            metadata: Free-form JSON-serializable details (model, description, ...)
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO batch_jobs (batch_id, kind, status, input_file, output_dir, output_format, "
+                "metadata, poll_count, next_poll_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)",
+                (batch_id, kind, status, input_file, output_dir, output_format,
+                 json.dumps(metadata or {}, ensure_ascii=False), now, now, now),
+            )
+            self._conn.commit()
+        logger.debug(f"Registered {kind} batch {batch_id}")
+
+    def update(self, batch_id: str, metadata: Optional[Dict[str, Any]] = None, **fields) -> None:
+        """
+        Update a job.
+
+        Args:
+            batch_id: Provider batch ID
+            metadata: Keys merged into the stored metadata
+            **fields: Column values to set (kind, status, output_dir, output_path, ...)
+        """
+        unknown = set(fields) - set(_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown batch job field(s): {sorted(unknown)}")
+        with self._lock:
+            if metadata:
+                row = self._conn.execute("SELECT metadata FROM batch_jobs WHERE batch_id = ?", (batch_id,)).fetchone()
+                if row is None:
+                    raise KeyError(f"Unknown batch {batch_id}")
+                fields["metadata"] = json.dumps({**json.loads(row[0]), **metadata}, ensure_ascii=False)
+            if "request_counts" in fields and not isinstance(fields["request_counts"], (str, type(None))):
+                fields["request_counts"] = json.dumps(fields["request_counts"])
+            fields["updated_at"] = time.time()
+            assignments = ", ".join(f"{name} = ?" for name in fields)
+            self._conn.execute(
+                f"UPDATE batch_jobs SET {assignments} WHERE batch_id = ?", (*fields.values(), batch_id)
+            )
+            self._conn.commit()
+
+    def get(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a job.
+
+        Args:
+            batch_id: Provider batch ID
+
+        Returns:
+            Job dictionary, or None if unknown
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM batch_jobs WHERE batch_id = ?", (batch_id,)
+            ).fetchone()
+        return self._to_job(row) if row else None
+
+    def jobs(self, pending_only: bool = False) -> List[Dict[str, Any]]:
+        """
+        List jobs, oldest first.
+
+        Args:
+            pending_only: Only jobs the watcher still has to poll or download
+
+        Returns:
+            List of job dictionaries
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM batch_jobs ORDER BY created_at"
+            ).fetchall()
+        jobs = [self._to_job(row) for row in rows]
+        return [job for job in jobs if self.is_pending(job)] if pending_only else jobs
+
+    def group_jobs(self, job: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Jobs of the sharded batch a job belongs to.
+
+        Args:
+            job: Registry job dictionary
+
+        Returns:
+            All shard jobs in shard order (just `job` if it is not a shard)
+        """
+        group = job["metadata"].get("group")
+        if not group:
+            return [job]
+        shards = [other for other in self.jobs() if other["metadata"].get("group") == group]
+        return sorted(shards, key=lambda other: other["metadata"].get("shard", 0))
+
+    @staticmethod
+    def is_pending(job: Dict[str, Any]) -> bool:
+        """Whether a job is still running, or completed but not yet downloaded."""
+        if job["status"] not in TERMINAL_BATCH_STATUSES and job["status"] != DOWNLOADED_STATUS:
+            return True
+        return job["status"] == "completed" and bool(job["output_dir"]) and not job["output_path"]
+
+    @staticmethod
+    def _to_job(row) -> Dict[str, Any]:
+        job = dict(zip(_COLUMNS, row))
+        job["metadata"] = json.loads(job["metadata"])
+        job["request_counts"] = json.loads(job["request_counts"]) if job["request_counts"] else None
+        return job
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def download_batch(processor, job: Dict[str, Any], batch: Any, shards: Optional[List[Dict[str, Any]]] = None) -> str:
+    """
+    Save the output of a completed batch job.
+
+    "personas" jobs go through `BatchProcessor.save_batch_output` (restoring
+    base fields when the job's metadata names a base persona file); other
+    jobs are streamed to disk as the raw output (and error) JSONL.
+
+    Args:
+        processor: BatchProcessor
+        job: Registry job dictionary
+        batch: Batch object as retrieved from the provider
+        shards: All shard jobs when `job` is one shard of a personas batch;
+            their outputs are merged into one file
+
+    Returns:
+        Path of the saved output
+    """
+    output_dir = Path(job["output_dir"])
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if job["kind"] == "personas":
+        base_personas = None
+        base_path = job["metadata"].get("base_personas_path")
+        if base_path and Path(base_path).exists():
+            with open(base_path, "r", encoding="utf-8") as f:
+                base_personas = json.load(f)
+        if job.get("input_file"):
+            # Lets the output follow request order even for a single batch
+            processor.input_files.setdefault(job["batch_id"], job["input_file"])
+        if shards and len(shards) > 1:
+            batch = ShardedBatch(
+                job["metadata"]["group"],
+                [processor.client.batches.retrieve(shard["batch_id"]) for shard in shards],
+                [shard["input_file"] for shard in shards],
+            )
+        path = processor.save_batch_output(
+            batch,
+            output_dir=str(output_dir),
+            prefix=job["metadata"].get("output_prefix", f"batch_output_{batch.id}"),
+            output_format=job["output_format"] or "jsonl",
+            base_personas=base_personas,
+        )
+        if path is None:
+            raise ValueError("Batch output contained no personas")
+        return path
+
+    return str(processor.download_batch_files(batch, str(output_dir))[0])
+
+
+def poll_job(processor, registry: BatchRegistry, job: Dict[str, Any], download: bool = True,
+             initial_interval: float = 30.0, max_interval: float = 600.0, backoff: float = 2.0) -> Dict[str, Any]:
+    """
+    Check one job once and record the result.
+
+    Args:
+        processor: BatchProcessor
+        registry: Batch registry
+        job: Registry job dictionary
+        download: Save the output of completed jobs
+        initial_interval: Seconds before the second check of a job
+        max_interval: Upper bound on the seconds between checks
+        backoff: Growth factor of the interval per unfinished check
+
+    Returns:
+        Updated job dictionary
+    """
+    batch_id = job["batch_id"]
+    now = time.time()
+    try:
+        batch = processor.client.batches.retrieve(batch_id)
+    except Exception as e:
+        logger.warning(f"Could not check batch {batch_id}: {e}")
+        registry.update(batch_id, error=str(e), next_poll_at=now + initial_interval)
+        return registry.get(batch_id)
+
+    counts = getattr(batch, "request_counts", None)
+    fields: Dict[str, Any] = {
+        "status": batch.status,
+        "poll_count": job["poll_count"] + 1,
+        "request_counts": counts.model_dump() if hasattr(counts, "model_dump") else counts,
+        "error": None,
+    }
+    if batch.status not in TERMINAL_BATCH_STATUSES:
+        fields["next_poll_at"] = now + min(max_interval, initial_interval * backoff ** job["poll_count"])
+        registry.update(batch_id, **fields)
+        logger.debug(f"Batch {batch_id}: {batch.status}; next check in {fields['next_poll_at'] - now:.0f}s")
+        return registry.get(batch_id)
+
+    registry.update(batch_id, **fields)
+    if batch.status != "completed":
+        logger.warning(f"Batch {batch_id} ended with status: {batch.status}")
+    elif download and job["output_dir"] and batch.output_file_id:
+        try:
+            if job["kind"] == "personas" and len(registry.group_jobs(job)) > 1:
+                save_shards(processor, registry, job, batch,
+                            now + min(max_interval, initial_interval * backoff ** job["poll_count"]))
+            else:
+                path = download_batch(processor, job, batch)
+                registry.update(batch_id, status=DOWNLOADED_STATUS, output_path=path)
+                logger.info(f"✓ Batch {batch_id} saved to {path}")
+        except Exception as e:
+            record_save_failure(registry, job, e, now, initial_interval, max_interval, backoff)
+    elif job["output_dir"] and not batch.output_file_id:
+        registry.update(batch_id, status="failed", error="Completed without an output file")
+        logger.warning(f"Batch {batch_id} completed without an output file")
+    else:
+        logger.info(f"✓ Batch {batch_id} completed")
+    return registry.get(batch_id)
+
+
+def save_shards(processor, registry: BatchRegistry, job: Dict[str, Any], batch: Any, retry_at: float) -> None:
+    """
+    Save a sharded personas batch once its last shard has finished.
+
+    Until then the completed shard stays pending and is checked again at
+    `retry_at`. Whichever shard finishes last merges all of them and marks
+    every completed shard as downloaded; errors while saving are raised.
+
+    Args:
+        processor: BatchProcessor
+        registry: Batch registry
+        job: Registry job of a completed shard
+        batch: Its batch object as retrieved from the provider
+        retry_at: Time of the next check while other shards are running
+    """
+    batch_id = job["batch_id"]
+    with _merge_lock:
+        shards = registry.group_jobs(registry.get(batch_id))
+        if registry.get(batch_id)["output_path"]:
+            return
+        running = [shard for shard in shards if shard["status"] not in TERMINAL_BATCH_STATUSES | {DOWNLOADED_STATUS}]
+        if running:
+            registry.update(batch_id, next_poll_at=retry_at)
+            logger.info(f"Batch {batch_id} completed; waiting for {len(running)} more shard(s) of {job['metadata']['group']}")
+            return
+        path = download_batch(processor, job, batch, shards)
+        for shard in shards:
+            if shard["status"] == "completed":
+                registry.update(shard["batch_id"], status=DOWNLOADED_STATUS, output_path=path)
+    logger.info(f"✓ {len(shards)} shards of {job['metadata']['group']} saved to {path}")
+
+
+def record_save_failure(registry: BatchRegistry, job: Dict[str, Any], error: Exception, now: float,
+                        initial_interval: float = 30.0, max_interval: float = 600.0, backoff: float = 2.0) -> None:
+    """
+    Record that the output of a completed job could not be saved.
+
+    The save is retried with exponential backoff. A ValueError (e.g. an
+    output without any personas) or `MAX_SAVE_ATTEMPTS` failed attempts mark
+    the job failed, together with the other completed shards of its group,
+    so the watcher stops retrying it.
+
+    Args:
+        registry: Batch registry
+        job: Registry job whose output could not be saved
+        error: Exception raised while saving
+        now: Time of the attempt
+        initial_interval: Seconds before the first retry
+        max_interval: Upper bound on the seconds between retries
+        backoff: Growth factor of the interval per failed attempt
+    """
+    batch_id = job["batch_id"]
+    attempts = job["metadata"].get("save_attempts", 0) + 1
+    name = f"sharded batch {job['metadata']['group']}" if job["metadata"].get("group") else f"batch {batch_id}"
+    if isinstance(error, ValueError) or attempts >= MAX_SAVE_ATTEMPTS:
+        logger.error(f"Could not save output of {name} ({attempts} attempt(s)); marking it failed: {error}")
+        for other in registry.group_jobs(registry.get(batch_id)):
+            if other["batch_id"] == batch_id or (other["status"] == "completed" and not other["output_path"]):
+                registry.update(other["batch_id"], status="failed", error=f"Could not save output: {error}")
+        registry.update(batch_id, metadata={"save_attempts": attempts})
+        return
+    delay = min(max_interval, initial_interval * backoff ** (attempts - 1))
+    logger.error(f"Could not save output of {name} (attempt {attempts}/{MAX_SAVE_ATTEMPTS}); "
+                 f"retrying in {delay:.0f}s: {error}")
+    registry.update(batch_id, metadata={"save_attempts": attempts}, error=str(error), next_poll_at=now + delay)
+
+
+def watch_batches(
+    processor,
+    registry: BatchRegistry,
+    download: bool = True,
+    initial_interval: float = 30.0,
+    max_interval: float = 600.0,
+    backoff: float = 2.0,
+    max_workers: int = 8,
+    once: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Poll registered jobs until none is pending.
+
+    Jobs that are due are checked concurrently; each job waits
+    `initial_interval * backoff**n` seconds (capped at `max_interval`) after
+    its n-th unfinished check.
+
+    Args:
+        processor: BatchProcessor (its client is used for polling and downloads)
+        registry: Batch registry
+        download: Save the output of completed jobs
+        initial_interval: Seconds before the second check of a job
+        max_interval: Upper bound on the seconds between checks
+        backoff: Growth factor of the interval per unfinished check
+        max_workers: Jobs checked concurrently
+        once: Check every pending job once and return
+
+    Returns:
+        All jobs after watching
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            pending = registry.jobs(pending_only=True)
+            if not download:
+                pending = [job for job in pending if job["status"] not in TERMINAL_BATCH_STATUSES]
+            if not pending:
+                logger.info("No pending batches")
+                break
+
+            now = time.time()
+            due = pending if once else [job for job in pending if job["next_poll_at"] <= now]
+            if due:
+                logger.info(f"Checking {len(due)} of {len(pending)} pending batch(es)")
+                list(executor.map(
+                    lambda job: poll_job(processor, registry, job, download, initial_interval, max_interval, backoff),
+                    due,
+                ))
+            if once:
+                break
+            if not due:
+                time.sleep(max(0.0, min(job["next_poll_at"] for job in pending) - now))
+    return registry.jobs()
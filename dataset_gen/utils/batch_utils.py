@@ -1,50 +1,272 @@
 """
 Utilities for batch processing with OpenAI Batch API.
 """
+import os
 import json
 import time
-from typing import List, Dict, Any, Optional
+import uuid
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, Union
 from pathlib import Path
 from openai import OpenAI
 from openai.types import Batch
 
 from config import DEFAULT_MODEL, TEMPERATURE, TOP_P, PRESENCE_PENALTY, FREQUENCY_PENALTY
 from .csv_utils import save_to_csv
+from .dataset_writer import create_dataset_writer
 from .model_params import build_generation_params
+from .base_fields import BaseFieldEnforcer
+
+
+# Batch statuses after which no further progress happens
+TERMINAL_BATCH_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# Bytes read per chunk when downloading batch files
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# Personas handed to the dataset writer at a time by save_batch_output
+SAVE_CHUNK_SIZE = 1000
+
+# Provider limits per batch input file (OpenAI: 50,000 requests, 200 MB)
+MAX_BATCH_REQUESTS = 50_000
+MAX_BATCH_FILE_BYTES = 200 * 1024 * 1024
+
+# Parent directory of the per-run batch input directories
+BATCH_RUN_DIR = "cache/batches"
+
+
+def new_batch_run_dir(name: str = "batch") -> Path:
+    """
+    Create a fresh directory for the input files of one batch run.
+    
+    Args:
+        name: Name prefix of the directory
+    
+    Returns:
+        Path of the created directory (unique per call)
+    """
+    run_dir = Path(BATCH_RUN_DIR) / f"{name}_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    run_dir.mkdir(parents=True, exist_ok=True)
+    return run_dir
+
+
+class ShardedBatch:
+    """
+    A batch job split into several provider batches ("shards").
+    
+    Shards hold consecutive slices of the requests, so merging their results
+    shard by shard, each in its input file's order, restores the request
+    order. BatchProcessor methods accept a ShardedBatch wherever they take a
+    Batch.
+    """
+    
+    def __init__(self, id: str, batches: List[Batch], input_files: List[str]):
+        """
+        Initialize sharded batch.
+        
+        Args:
+            id: Group ID shared by the shards (also stored in their metadata)
+            batches: Provider batch of every shard, in request order
+            input_files: Input file of every shard
+        """
+        self.id = id
+        self.batches = batches
+        self.input_files = input_files
+    
+    @property
+    def status(self) -> str:
+        """Common status of the shards ("in_progress" while they differ)."""
+        statuses = {batch.status for batch in self.batches}
+        return statuses.pop() if len(statuses) == 1 else "in_progress"
+    
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return {**(self.batches[0].metadata or {}), "shards": len(self.batches)}
+    
+    def __repr__(self) -> str:
+        return f"ShardedBatch(id={self.id!r}, shards={[batch.id for batch in self.batches]})"
+
+
+def batch_shards(batch: Union[Batch, ShardedBatch]) -> List[Batch]:
+    """Provider batches behind a batch returned by `BatchProcessor.create_batch`."""
+    return list(batch.batches) if isinstance(batch, ShardedBatch) else [batch]
+
+
+def parse_batch_line(line: str, line_number: int = 0) -> Optional[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Parse one line of a batch output or error file.
+    
+    Args:
+        line: JSONL line
+        line_number: Line number, used as ID for lines without a custom_id
+    
+    Returns:
+        (custom_id, content, error) with exactly one of content/error set,
+        or None for a blank line
+    """
+    if not line.strip():
+        return None
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return f"line-{line_number}", None, "Invalid JSON line"
+    custom_id = record.get("custom_id") or f"line-{line_number}"
+    response = record.get("response") or {}
+    error = record.get("error") or (response.get("body") or {}).get("error")
+    if error or response.get("status_code") != 200:
+        message = (error.get("message", error) if isinstance(error, dict) else error) or "no response"
+        status_code = response.get("status_code")
+        return custom_id, None, f"HTTP {status_code}: {message}" if status_code else str(message)
+    try:
+        return custom_id, response["body"]["choices"][0]["message"]["content"], None
+    except (KeyError, IndexError, TypeError):
+        return custom_id, None, "Response has no message content"
+
+
+def iter_batch_output(lines: Iterable[str]) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Parse batch output lines one at a time.
+    
+    Args:
+        lines: Lines of a batch output or error file (e.g. an open file)
+    
+    Yields:
+        (custom_id, content, error) per request, in file order
+    """
+    for line_number, line in enumerate(lines, 1):
+        parsed = parse_batch_line(line, line_number)
+        if parsed is not None:
+            yield parsed
+
+
+def iter_in_request_order(
+    paths: List[Path], input_file: str
+) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Parse downloaded batch files in the request order of their input file.
+    
+    A first pass indexes the byte offset of every request's line (a success
+    wins over an error line for the same request); the second pass follows
+    the input file and reads one line at a time from those offsets, so only
+    the index, not the responses, is held in memory.
+    
+    Args:
+        paths: Downloaded output/error files of one batch
+        input_file: Batch input JSONL file
+    
+    Yields:
+        (custom_id, content, error) per request in request order; requests
+        missing from the input file come last, in file order
+    """
+    index: Dict[str, Tuple[int, int, int]] = {}
+    for file_index, path in enumerate(paths):
+        with open(path, "rb") as f:
+            offset = 0
+            for line_number, line in enumerate(f, 1):
+                parsed = parse_batch_line(line.decode("utf-8"), line_number)
+                if parsed is not None:
+                    custom_id, content, _ = parsed
+                    if custom_id not in index or content is not None:
+                        index[custom_id] = (file_index, offset, line_number)
+                offset += len(line)
+    
+    files = [open(path, "rb") for path in paths]
+    try:
+        def read(entry: Tuple[int, int, int]) -> Tuple[str, Optional[str], Optional[str]]:
+            file_index, offset, line_number = entry
+            f = files[file_index]
+            f.seek(offset)
+            return parse_batch_line(f.readline().decode("utf-8"), line_number)
+        
+        with open(input_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = index.pop(json.loads(line)["custom_id"], None)
+                    if entry is not None:
+                        yield read(entry)
+        for entry in sorted(index.values()):
+            yield read(entry)
+    finally:
+        for f in files:
+            f.close()
+
+
+def iter_input_custom_ids(input_file: str) -> Iterator[str]:
+    """
+    Custom IDs of the requests in a batch input file, in request order.
+    
+    Args:
+        input_file: Batch input JSONL file
+    
+    Yields:
+        custom_id per request
+    """
+    with open(input_file, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)["custom_id"]
 
 
 class BatchProcessor:
     """Handler for OpenAI Batch API operations."""
     
-    def __init__(self, client: OpenAI):
+    def __init__(
+        self,
+        client: OpenAI,
+        registry: Optional[Any] = None,
+        max_requests: int = MAX_BATCH_REQUESTS,
+        max_file_bytes: int = MAX_BATCH_FILE_BYTES,
+        upload_workers: int = 4
+    ):
         """
         Initialize batch processor.
         
         Args:
             client: OpenAI client instance
+            registry: BatchRegistry that records every created batch (optional)
+            max_requests: Most requests per batch input file
+            max_file_bytes: Largest batch input file in bytes
+            upload_workers: Shards uploaded and submitted concurrently
         """
         self.client = client
+        self.registry = registry
+        self.max_requests = max_requests
+        self.max_file_bytes = max_file_bytes
+        self.upload_workers = upload_workers
+        self.drift_stats: Dict[str, Any] = {}
+        self.batch_errors: Dict[str, str] = {}
+        # Local input file of every batch submitted (or registered) by ID
+        self.input_files: Dict[str, str] = {}
     
     def create_batch(
         self,
         messages_list: List[List[Dict[str, str]]],
         model: str = DEFAULT_MODEL,
-        batch_file_path: str = "batch_input.jsonl",
-        description: str = "Batch processing"
-    ) -> Batch:
+        batch_file_path: Optional[str] = None,
+        description: str = "Batch processing",
+        custom_ids: Optional[List[str]] = None
+    ) -> Union[Batch, ShardedBatch]:
         """
         Create a batch job from a list of message sets.
         
+        Requests that exceed `max_requests` or `max_file_bytes` are split
+        into several input files (`<name>_shard0001.jsonl`, ...) that are
+        uploaded and submitted concurrently.
+        
         Args:
             messages_list: List of message sets (each is a list of message dicts)
             model: Model to use
-            batch_file_path: Path to save batch input file
+            batch_file_path: Path to save batch input file (default: a fresh
+                directory under BATCH_RUN_DIR, so concurrent runs never share files)
             description: Description for the batch
+            custom_ids: Custom ID for each message set (default: request-1, request-2, ...)
         
         Returns:
-            Batch object with job information
+            Batch object with job information, or a ShardedBatch if the
+            requests were split
         """
-        # Step 1: Prepare the batch input file
+        # Step 1: Prepare the batch input file(s)
         # Build parameters once for all requests (same model)
         generation_params = build_generation_params(
             model=model,
@@ -54,36 +276,122 @@ class BatchProcessor:
             frequency_penalty=FREQUENCY_PENALTY
         )
         
-        with open(batch_file_path, "w", encoding="utf-8") as f:
-            for i, messages in enumerate(messages_list):
-                body = {
+        if custom_ids is None:
+            custom_ids = [f"request-{i+1}" for i in range(len(messages_list))]
+        elif len(custom_ids) != len(messages_list):
+            raise ValueError("custom_ids must have one entry per message set")
+        
+        if batch_file_path is None:
+            batch_file_path = str(new_batch_run_dir() / "batch_input.jsonl")
+        
+        batch_requests = (
+            {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
                     "model": model,
                     "messages": messages,
                     **generation_params
                 }
-                
-                batch_request = {
-                    "custom_id": f"request-{i+1}",
-                    "method": "POST",
-                    "url": "/v1/chat/completions",
-                    "body": body
-                }
-                f.write(json.dumps(batch_request, ensure_ascii=False) + "\n")
+            }
+            for custom_id, messages in zip(custom_ids, messages_list)
+        )
+        shards = self._write_shards(Path(batch_file_path), batch_requests)
+        
+        # Step 2: Upload the batch input file(s) and create the batch(es)
+        if len(shards) == 1:
+            path, count = shards[0]
+            return self._submit_shard(path, count, model, description)
+        
+        group = f"{Path(batch_file_path).stem}_{uuid.uuid4().hex[:8]}"
+        
+        def submit(item):
+            index, (path, count) = item
+            return self._submit_shard(
+                path, count, model, f"{description} (shard {index}/{len(shards)})",
+                {"group": group, "shard": index, "shards": len(shards)},
+            )
         
-        # Step 2: Upload the batch input file
-        with open(batch_file_path, "rb") as f:
+        with ThreadPoolExecutor(max_workers=max(1, min(self.upload_workers, len(shards)))) as executor:
+            batches = list(executor.map(submit, enumerate(shards, 1)))
+        print(f"Submitted {len(messages_list)} requests as {len(batches)} batch shards ({group})")
+        return ShardedBatch(group, batches, [str(path) for path, _ in shards])
+    
+    def _write_shards(self, path: Path, batch_requests: Iterable[Dict[str, Any]]) -> List[Tuple[Path, int]]:
+        """
+        Write batch requests to input files within the request and size limits.
+        
+        A single file is written to `path`; once a second one is needed the
+        first is renamed to `<stem>_shard0001<suffix>`.
+        
+        Args:
+            path: Batch input file path
+            batch_requests: Batch request dictionaries
+        
+        Returns:
+            (path, request count) of every input file
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        shard_path = lambda index: path.with_name(f"{path.stem}_shard{index:04d}{path.suffix}")
+        shards: List[Tuple[Path, int]] = []
+        current, count, size = path, 0, 0
+        f = open(current, "wb")
+        try:
+            for batch_request in batch_requests:
+                line = (json.dumps(batch_request, ensure_ascii=False) + "\n").encode("utf-8")
+                if len(line) > self.max_file_bytes:
+                    raise ValueError(
+                        f"Request {batch_request['custom_id']} is {len(line)} bytes, "
+                        f"over the batch file limit of {self.max_file_bytes}"
+                    )
+                if count and (count >= self.max_requests or size + len(line) > self.max_file_bytes):
+                    f.close()
+                    if not shards:
+                        current = shard_path(1)
+                        os.replace(path, current)
+                    shards.append((current, count))
+                    current, count, size = shard_path(len(shards) + 1), 0, 0
+                    f = open(current, "wb")
+                f.write(line)
+                count += 1
+                size += len(line)
+        finally:
+            f.close()
+        shards.append((current, count))
+        return shards
+    
+    def _submit_shard(
+        self, path: Path, count: int, model: str, description: str, metadata: Optional[Dict[str, Any]] = None
+    ) -> Batch:
+        """Upload one input file, create its batch and register it."""
+        with open(path, "rb") as f:
             batch_input_file = self.client.files.create(
                 file=f,
                 purpose="batch"
             )
         
-        # Step 3: Create the batch
         batch = self.client.batches.create(
             input_file_id=batch_input_file.id,
             endpoint="/v1/chat/completions",
             completion_window="24h",
             metadata={"description": description}
         )
+        self.input_files[batch.id] = str(path)
+        
+        if self.registry is not None:
+            self.registry.register(
+                batch.id,
+                status=batch.status,
+                input_file=str(path),
+                metadata={
+                    "description": description,
+                    "model": model,
+                    "requests": count,
+                    "input_file_id": batch_input_file.id,
+                    **(metadata or {}),
+                },
+            )
         
         return batch
     
@@ -91,6 +399,9 @@ class BatchProcessor:
         """
         Poll batch status and return results if completed.
         
+        The whole file is loaded into memory; prefer `iter_batch_results`
+        for large batches.
+        
         Args:
             batch: Batch object
         
@@ -121,33 +432,245 @@ class BatchProcessor:
         Returns:
             List of response content strings
         """
-        contents = []
+        return list(self.parse_response_by_id(resp).values())
+    
+    def parse_response_by_id(self, resp: Any) -> Dict[str, str]:
+        """
+        Parse batch response into content strings keyed by custom ID.
+        
+        Failed requests are skipped.
+        
+        Args:
+            resp: Response from batch API
+        
+        Returns:
+            Dictionary mapping custom_id to response content (in file order)
+        """
+        contents = {}
         if resp:
-            answers = resp.text.split("\n")[:-1]
-            
-            for batch_answer in answers:
-                single_batch_resp = json.loads(batch_answer)
-                answer = single_batch_resp['response']['body']['choices'][0]['message']['content']
-                contents.append(answer)
+            lines = resp.iter_lines() if hasattr(resp, "iter_lines") else resp.text.splitlines()
+            for custom_id, content, _ in iter_batch_output(lines):
+                if content is not None:
+                    contents[custom_id] = content
         
         return contents
     
+    def download_file(self, file_id: str, path: str) -> Path:
+        """
+        Stream a file from the provider to disk.
+        
+        The file is read in DOWNLOAD_CHUNK_SIZE chunks and written to a
+        temporary name that is renamed once complete, so memory use does not
+        grow with the file size and a partial download is never mistaken for
+        a finished one.
+        
+        Args:
+            file_id: Provider file ID
+            path: Destination path
+        
+        Returns:
+            Path of the downloaded file
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        part_path = path.with_name(path.name + ".part")
+        with self.client.files.with_streaming_response.content(file_id) as response:
+            with open(part_path, "wb") as f:
+                for chunk in response.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+        os.replace(part_path, path)
+        return path
+    
+    def download_batch_files(self, batch: Batch, download_dir: str) -> List[Path]:
+        """
+        Download the output and error files of a finished batch.
+        
+        Args:
+            batch: Batch object as retrieved from the provider
+            download_dir: Directory for `<batch id>_output.jsonl` / `<batch id>_errors.jsonl`
+        
+        Returns:
+            Paths of the downloaded files (output first)
+        """
+        paths = []
+        for file_id, suffix in ((batch.output_file_id, "output"), (getattr(batch, "error_file_id", None), "errors")):
+            if file_id:
+                paths.append(self.download_file(file_id, str(Path(download_dir) / f"{batch.id}_{suffix}.jsonl")))
+        return paths
+    
+    def iter_batch_results(
+        self, batch: Batch, download_dir: Optional[str] = None, input_file: Optional[str] = None
+    ) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+        """
+        Download a finished batch and parse it line by line.
+        
+        Args:
+            batch: Batch object as retrieved from the provider
+            download_dir: Where to keep the downloaded files (default: a
+                temporary directory removed once iteration ends)
+            input_file: Batch input file; when given, results follow its
+                request order (see `iter_in_request_order`)
+        
+        Yields:
+            (custom_id, content, error) per request; without `input_file`,
+            output file first, then error file
+        """
+        if download_dir is None:
+            with tempfile.TemporaryDirectory(prefix=f"{batch.id}_") as tmp_dir:
+                yield from self.iter_batch_results(batch, tmp_dir, input_file)
+            return
+        paths = self.download_batch_files(batch, download_dir)
+        if input_file:
+            yield from iter_in_request_order(paths, input_file)
+            return
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                yield from iter_batch_output(f)
+    
+    def input_file(self, batch_id: str) -> Optional[str]:
+        """
+        Local input file of a batch, if it is known and still on disk.
+        
+        Args:
+            batch_id: Provider batch ID
+        
+        Returns:
+            Path of the input file (from this processor or its registry), or None
+        """
+        path = self.input_files.get(batch_id)
+        if path is None and self.registry is not None:
+            job = self.registry.get(batch_id)
+            path = job.get("input_file") if job else None
+        return path if path and Path(path).exists() else None
+    
+    def retrieve_shards(self, batch: Union[Batch, ShardedBatch]) -> List[Tuple[Batch, Optional[str]]]:
+        """
+        Retrieve the current state of every shard of a batch.
+        
+        Args:
+            batch: Batch or ShardedBatch
+        
+        Returns:
+            (retrieved batch, input file or None) per shard, in request order
+        """
+        input_files = batch.input_files if isinstance(batch, ShardedBatch) else [self.input_file(batch.id)]
+        return [
+            (self.client.batches.retrieve(shard.id), input_file)
+            for shard, input_file in zip(batch_shards(batch), input_files)
+        ]
+    
+    def _record_unfinished_shard(self, resp: Batch, input_file: Optional[str], done: Iterable[str]) -> None:
+        """
+        Record the requests a failed, expired or cancelled shard did not answer.
+        
+        Every request of the shard's input file that is not in `done` goes
+        into `self.batch_errors` with the shard status, so it is written to
+        the errors file and can be resubmitted.
+        
+        Args:
+            resp: Shard that ended with a status other than "completed"
+            input_file: Its batch input file, if known
+            done: Custom IDs that were answered
+        """
+        error = f"Batch {resp.id} ended with status {resp.status}"
+        if input_file is None:
+            # Without the input file the request IDs are unknown; keep the shard itself on record
+            print(f"Warning: {error} and its input file is not available; its requests cannot be listed")
+            self.batch_errors[resp.id] = error
+            return
+        done = set(done)
+        for custom_id in iter_input_custom_ids(input_file):
+            if custom_id not in done:
+                # Keep a more specific error from the shard's error file
+                self.batch_errors.setdefault(custom_id, error)
+    
+    def _write_batch_errors(self, output_dir: str, prefix: str) -> None:
+        """Write `self.batch_errors` to `<prefix>_errors.jsonl`, if there are any."""
+        if not self.batch_errors:
+            return
+        errors_path = Path(output_dir) / f"{prefix}_errors.jsonl"
+        with open(errors_path, "w", encoding="utf-8") as f:
+            for custom_id, error in self.batch_errors.items():
+                f.write(json.dumps({"custom_id": custom_id, "error": error}, ensure_ascii=False) + "\n")
+        print(f"Warning: {len(self.batch_errors)} request(s) failed; see {errors_path}")
+    
+    def fetch_batch_results(
+        self, batch: Union[Batch, ShardedBatch], download_dir: Optional[str] = None
+    ) -> Optional[Dict[str, str]]:
+        """
+        Fetch the answers of a finished batch keyed by custom ID.
+        
+        Requests that failed (non-200 status, listed only in the error file,
+        or left unanswered by a failed, expired or cancelled shard) are
+        missing from the result so the caller can resubmit them; their
+        errors are kept in `self.batch_errors`. A ShardedBatch is
+        finished once all its shards are; the answers are merged in request
+        order.
+        
+        Args:
+            batch: Batch or ShardedBatch object
+            download_dir: Where to keep the downloaded files (default: temporary)
+        
+        Returns:
+            Dictionary mapping custom_id to response content, or None while the batch is still running
+        """
+        shards = self.retrieve_shards(batch)
+        if any(resp.status not in TERMINAL_BATCH_STATUSES for resp, _ in shards):
+            return None
+        
+        results = {}
+        self.batch_errors = {}
+        for resp, input_file in shards:
+            if resp.status != "completed":
+                print(f"Batch {resp.id} ended with status: {resp.status}")
+            for custom_id, content, error in self.iter_batch_results(resp, download_dir, input_file):
+                if content is not None:
+                    results[custom_id] = content
+                    self.batch_errors.pop(custom_id, None)
+                elif custom_id not in results:
+                    self.batch_errors[custom_id] = error
+            if resp.status != "completed":
+                self._record_unfinished_shard(resp, input_file, results)
+        if self.batch_errors:
+            print(f"Batch {batch.id}: {len(self.batch_errors)} request(s) failed")
+        return results
+    
     def save_batch_output(
         self,
-        batch: Batch,
+        batch: Union[Batch, ShardedBatch],
         output_dir: str = "output",
-        prefix: str = "batch_output"
+        prefix: str = "batch_output",
+        output_format: str = "csv",
+        base_personas: Optional[Dict[str, List[Dict]]] = None
     ) -> Optional[str]:
         """
-        Save batch output to CSV file.
+        Save batch output to a CSV file (or JSONL/Parquet part files).
+        
+        The output is streamed to disk and parsed one request at a time;
+        JSONL/Parquet personas are written as they are parsed, so memory use
+        stays flat however large the batch is (CSV needs every row for its
+        header and is written at the end). Failed requests, including every
+        request of a shard that ended failed, expired or cancelled, are
+        written to `<prefix>_<timestamp>_errors.jsonl` and kept in
+        `self.batch_errors`.
+        The shards of a ShardedBatch are saved into one output, in request
+        order.
+        
+        With `base_personas`, every returned persona is paired with its base
+        record (by echoed persona ID, else by position within its request)
+        and the base fields are restored as it is parsed; drift counts are
+        kept in `self.drift_stats`.
         
         Args:
-            batch: Batch object
+            batch: Batch or ShardedBatch object
             output_dir: Directory to save output
             prefix: Prefix for output filename
+            output_format: "csv", "jsonl" or "parquet"
+            base_personas: Base records of each request keyed by custom_id
+                (see `PersonaGenerator.generate_batch_with_stats`)
         
         Returns:
-            Path to saved file, or None if not completed
+            Path to saved file (first part file for JSONL/Parquet), or None if not completed
         """
         timestamp = time.time()
         output_path = Path(output_dir) / f"{prefix}_{timestamp}.csv"
@@ -155,32 +678,76 @@ class BatchProcessor:
         # Ensure output directory exists
         Path(output_dir).mkdir(parents=True, exist_ok=True)
         
-        result = self.poll_batch_status(batch)
-        if not result:
-            print("Batch not completed yet or no output available.")
+        shards = self.retrieve_shards(batch)
+        if any(resp.status not in TERMINAL_BATCH_STATUSES for resp, _ in shards):
+            print("Batch not completed yet.")
+            return None
+        self.batch_errors = {}
+        for resp, input_file in shards:
+            if resp.status != "completed":
+                print(f"Warning: Batch {resp.id} ended with status {resp.status}; its requests are recorded as failed")
+                self._record_unfinished_shard(resp, input_file, ())
+        shards = [(resp, input_file) for resp, input_file in shards
+                  if resp.status == "completed" and (resp.output_file_id or resp.error_file_id)]
+        if not shards:
+            self._write_batch_errors(output_dir, f"{prefix}_{timestamp}")
+            print("Batch not completed or no output available.")
             return None
         
-        parsed = self.parse_response(result)
-        
-        # Parse JSON responses and collect all personas
+        enforcer = BaseFieldEnforcer()
+        writer = create_dataset_writer(output_format, output_dir, f"{prefix}_{timestamp}") if output_format != "csv" else None
         all_personas = []
-        for p in parsed:
-            try:
-                personas = json.loads(p)
-                # Handle both single persona dict and list of personas
-                if isinstance(personas, list):
+        saved = set()
+        
+        # Download each shard next to the output (cleaned up afterwards) and parse one request at a time
+        for resp, input_file in shards:
+            with tempfile.TemporaryDirectory(dir=output_dir, prefix=".batch_download_") as download_dir:
+                for custom_id, p, error in self.iter_batch_results(resp, download_dir, input_file):
+                    if p is None:
+                        # An error never overrides a request already saved
+                        if custom_id not in saved:
+                            self.batch_errors[custom_id] = error
+                        continue
+                    try:
+                        personas = json.loads(p)
+                    except json.JSONDecodeError:
+                        print(f"Warning: Failed to parse response: {p[:100]}...")
+                        self.batch_errors[custom_id] = "Response is not valid JSON"
+                        continue
+                    # A later success replaces an error recorded for the same request
+                    self.batch_errors.pop(custom_id, None)
+                    saved.add(custom_id)
+                    # Handle both single persona dict and list of personas
+                    if not isinstance(personas, list):
+                        personas = [personas]
+                    bases = (base_personas or {}).get(custom_id)
+                    if bases:
+                        matched = []
+                        for persona, slot in zip(personas, enforcer.match(personas, bases)):
+                            if slot is None or not isinstance(persona, dict):
+                                print(f"Warning: Extra element in response {custom_id} has no base persona")
+                                continue
+                            matched.append(enforcer.enforce(persona, bases[slot]))
+                        personas = matched
                     all_personas.extend(personas)
-                else:
-                    all_personas.append(personas)
-            except json.JSONDecodeError:
-                print(f"Warning: Failed to parse response: {p[:100]}...")
-                continue
+                    if writer is not None and len(all_personas) >= SAVE_CHUNK_SIZE:
+                        writer.write_rows(all_personas)
+                        all_personas = []
+        
+        if base_personas:
+            self.drift_stats = enforcer.summary()
+            print(f"Base fields: {enforcer.describe()}")
         
-        if all_personas:
+        self._write_batch_errors(output_dir, f"{prefix}_{timestamp}")
+        
+        if writer is not None:
+            writer.write_rows(all_personas)
+            writer.close()
+            if writer.paths:
+                return str(writer.paths[0])
+        elif all_personas:
             save_to_csv(all_personas, str(output_path))
-        else:
-            print("No valid personas found in batch output.")
-            return None
+            return str(output_path)
         
-        return str(output_path)
-
+        print("No valid personas found in batch output.")
+        return None
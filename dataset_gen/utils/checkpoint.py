@@ -0,0 +1,283 @@
+"""
+Crash-safe run checkpointing for interview dataset generation.
+
+A run directory holds a manifest (run configuration and finished combos)
+and an append-only journal with one line per completed interview turn.
+Resuming a run skips finished combos and continues partial interviews from
+their last journaled turn.
+"""
+import os
+import json
+import math
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+
+def _missing(value) -> bool:
+    """Check whether a persona ID value is absent (None, NaN from CSV/Parquet, or blank)."""
+    if value is None:
+        return True
+    if isinstance(value, float) and math.isnan(value):
+        return True
+    return not str(value).strip()
+
+
+def assign_persona_ids(personas: List[Dict]) -> str:
+    """
+    Make sure every persona has a unique ID to key its combos by.
+
+    Persona files written without IDs (e.g. by `generate_full_personas`) get
+    their row position as ID, which is stable as long as the personas file
+    of the run is not edited. Files where only some personas have an ID, or
+    where IDs repeat, are rejected: their combos cannot be told apart.
+
+    Args:
+        personas: List of persona dictionaries (updated in place)
+
+    Returns:
+        "field" if the personas carry their own IDs, "position" if IDs were assigned
+
+    Raises:
+        ValueError: If some personas lack an ID or IDs are duplicated
+    """
+    missing = [index for index, persona in enumerate(personas) if _missing(persona.get("id"))]
+    if missing and len(missing) < len(personas):
+        raise ValueError(
+            f"{len(missing)} of {len(personas)} personas have no 'id' (first at row {missing[0]}); "
+            f"give every persona an ID or none of them"
+        )
+    if missing:
+        for index, persona in enumerate(personas):
+            persona["id"] = f"row-{index}"
+        logger.info(f"Personas have no 'id' field; keyed by row position (row-0 .. row-{len(personas) - 1})")
+        return "position"
+
+    seen = set()
+    duplicates = []
+    for persona in personas:
+        persona_id = str(persona["id"])
+        if persona_id in seen:
+            duplicates.append(persona_id)
+        seen.add(persona_id)
+    if duplicates:
+        raise ValueError(f"Duplicate persona IDs: {sorted(set(duplicates))[:10]}")
+    return "field"
+
+
+class RunCheckpoint:
+    """Run manifest plus append-only turn journal."""
+
+    MANIFEST_FILE = "manifest.json"
+    JOURNAL_FILE = "journal.jsonl"
+
+    def __init__(self, run_dir: str, manifest: Dict):
+        """
+        Initialize checkpoint (use `create` or `load` instead of calling directly).
+
+        Args:
+            run_dir: Run directory
+            manifest: Manifest dictionary
+        """
+        self.run_dir = Path(run_dir)
+        self.manifest = manifest
+        self._completed = set(manifest.get("completed", []))
+        self._lock = threading.Lock()
+
+    @property
+    def session_prefix(self) -> str:
+        """Session prefix used in the run's output file names."""
+        return self.manifest["session_prefix"]
+
+    @property
+    def config(self) -> Dict:
+        """Run configuration recorded when the run was created."""
+        return self.manifest.get("config", {})
+
+    @classmethod
+    def create(cls, output_dir: str, session_prefix: str, config: Optional[Dict] = None) -> "RunCheckpoint":
+        """
+        Create a new run directory under `output_dir/runs/<session_prefix>`.
+
+        Args:
+            output_dir: Dataset output directory
+            session_prefix: Session prefix of the run
+            config: Run configuration to record (personas path, models, ...)
+
+        Returns:
+            RunCheckpoint instance
+        """
+        run_dir = Path(output_dir) / "runs" / session_prefix
+        run_dir.mkdir(parents=True, exist_ok=True)
+        manifest = {
+            "session_prefix": session_prefix,
+            "created_at": datetime.now().isoformat(),
+            "config": config or {},
+            "completed": [],
+        }
+        checkpoint = cls(str(run_dir), manifest)
+        checkpoint._write_manifest()
+        logger.info(f"Run checkpoint directory: {run_dir}")
+        return checkpoint
+
+    @classmethod
+    def load(cls, run_dir: str) -> "RunCheckpoint":
+        """
+        Load an existing run directory for resuming.
+
+        Args:
+            run_dir: Run directory created by `create`
+
+        Returns:
+            RunCheckpoint instance
+        """
+        manifest_path = Path(run_dir) / cls.MANIFEST_FILE
+        if not manifest_path.exists():
+            raise FileNotFoundError(f"No run manifest found in {run_dir}")
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        logger.info(
+            f"Loaded run {manifest['session_prefix']} from {run_dir}: "
+            f"{len(manifest.get('completed', []))} completed combo(s)"
+        )
+        return cls(run_dir, manifest)
+
+    @staticmethod
+    def combo_key(persona_id: str, model: str) -> str:
+        """Key identifying a persona × model combo."""
+        return f"{model}|{persona_id}"
+
+    def check_personas(self, id_source: str, count: int) -> None:
+        """
+        Record how the run's personas are keyed, or verify it on resume.
+
+        A resumed run must key its personas the same way, or its journaled
+        turns and finished combos would be matched to the wrong personas.
+
+        Args:
+            id_source: "field" or "position", as returned by `assign_persona_ids`
+            count: Number of personas
+
+        Raises:
+            ValueError: If the personas differ from those the run started with
+        """
+        current = {"id_source": id_source, "count": count}
+        with self._lock:
+            recorded = self.manifest.get("personas")
+            if recorded is None:
+                self.manifest["personas"] = current
+                self._write_manifest()
+            elif recorded != current:
+                raise ValueError(
+                    f"Personas do not match the run being resumed (run: {recorded}, now: {current})"
+                )
+
+    def _write_manifest(self) -> None:
+        """Atomically rewrite the manifest (lock must be held or not needed)."""
+        self.manifest["completed"] = sorted(self._completed)
+        self.manifest["updated_at"] = datetime.now().isoformat()
+        tmp_path = self.run_dir / (self.MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.run_dir / self.MANIFEST_FILE)
+
+    def is_completed(self, persona_id: str, model: str) -> bool:
+        """Check whether a combo was fully generated and written."""
+        return self.combo_key(persona_id, model) in self._completed
+
+    def mark_completed(self, persona_id: str, model: str) -> None:
+        """
+        Record that a combo was fully generated and written.
+
+        Args:
+            persona_id: Persona identifier
+            model: Model name
+        """
+        with self._lock:
+            self._completed.add(self.combo_key(persona_id, model))
+            self._write_manifest()
+
+    @property
+    def dataset_position(self) -> Optional[Dict]:
+        """Dataset writer position up to which rows of completed combos were written."""
+        return self.manifest.get("dataset_position")
+
+    def commit(self, tags: List, dataset_position: Optional[Dict] = None) -> None:
+        """
+        Record combos whose rows the dataset writer made durable.
+
+        Args:
+            tags: (persona_id, model) pairs of the committed combos
+            dataset_position: Writer position after their rows (see
+                `DatasetWriter.committed_position`), stored in the same
+                manifest write so a resumed run can drop rows written later
+        """
+        with self._lock:
+            for persona_id, model in tags:
+                self._completed.add(self.combo_key(persona_id, model))
+            if dataset_position is not None:
+                self.manifest["dataset_position"] = dataset_position
+            self._write_manifest()
+
+    def record_turn(self, persona_id: str, model: str, turn_index: int, interaction: Dict) -> None:
+        """
+        Append a completed turn to the journal and flush it to disk.
+
+        Args:
+            persona_id: Persona identifier
+            model: Model name
+            turn_index: Zero-based turn index within the interview
+            interaction: Interaction dictionary for the turn
+        """
+        record = {
+            "combo": self.combo_key(persona_id, model),
+            "turn_index": turn_index,
+            "interaction": interaction,
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.run_dir / self.JOURNAL_FILE, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def load_turns(self) -> Dict[str, List[Dict]]:
+        """
+        Read journaled turns of unfinished combos.
+
+        A truncated last line (crash during a write) is ignored. Only the
+        contiguous prefix of turns is returned for each combo.
+
+        Returns:
+            Dictionary mapping combo key to interactions in turn order
+        """
+        journal_path = self.run_dir / self.JOURNAL_FILE
+        if not journal_path.exists():
+            return {}
+
+        turns: Dict[str, Dict[int, Dict]] = {}
+        with open(journal_path, "r", encoding="utf-8") as f:
+            for line_num, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Ignoring unreadable journal line {line_num}")
+                    continue
+                if record["combo"] in self._completed:
+                    continue
+                turns.setdefault(record["combo"], {})[record["turn_index"]] = record["interaction"]
+
+        resumable = {}
+        for combo, by_index in turns.items():
+            interactions = []
+            while len(interactions) in by_index:
+                interactions.append(by_index[len(interactions)])
+            resumable[combo] = interactions
+        return resumable
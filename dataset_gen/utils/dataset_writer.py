@@ -0,0 +1,495 @@
+"""
+Streaming dataset writers.
+
+Rows are appended incrementally to size-bounded part files instead of being
+collected in memory and written one small CSV at a time. Two formats are
+supported: append-only JSONL and Parquet written in row groups (requires
+pyarrow).
+"""
+import os
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .csv_utils import flatten_dict_for_csv
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_FILE_BYTES = 256 * 1024 * 1024
+DEFAULT_ROW_GROUP_SIZE = 5000
+
+OUTPUT_FORMATS = ["jsonl", "parquet"]
+
+
+class DatasetWriter:
+    """
+    Base class for streaming, size-rolled dataset writers.
+
+    Rows go to `<prefix>_part<NNNNN><ext>` files in `output_dir`; a new part
+    is started once the current one reaches `max_file_bytes`. Rows passed to
+    `write_rows` can carry a commit tag (for example a persona × model combo);
+    `on_commit` is called with the tags once their rows are durable on disk.
+    """
+
+    extension = ""
+
+    def __init__(
+        self,
+        output_dir: str,
+        prefix: str,
+        max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+        flatten: bool = False,
+        on_commit: Optional[Callable[[List[Any]], None]] = None,
+        resume_position: Optional[Dict] = None,
+    ):
+        """
+        Initialize dataset writer.
+
+        Args:
+            output_dir: Directory for the part files
+            prefix: File name prefix shared by all parts
+            max_file_bytes: Roll over to a new part beyond this size
+            flatten: Flatten nested structures like `save_to_csv` does
+            on_commit: Called with the commit tags of rows once they are durable
+            resume_position: `committed_position` recorded by an interrupted
+                run; rows written after it are removed before writing resumes
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.max_file_bytes = max_file_bytes
+        self.flatten = flatten
+        self.on_commit = on_commit
+
+        self.paths: List[Path] = []
+        self.rows_written = 0
+        # Part file name and byte offset up to which rows are committed
+        self.committed_position: Optional[Dict] = None
+        self._recover(resume_position)
+        self._part_index = self._next_part_index()
+        self._pending_tags: List[Any] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _existing_parts(self) -> Dict[int, Path]:
+        """Part files left by an earlier (resumed) run, by part index."""
+        parts = {}
+        for path in self.output_dir.glob(f"{self.prefix}_part*{self.extension}"):
+            index = path.name[len(self.prefix) + len("_part"):-len(self.extension)]
+            if index.isdigit():
+                parts[int(index)] = path
+        return parts
+
+    def _next_part_index(self) -> int:
+        """Continue numbering after parts left by an earlier (resumed) run."""
+        return max(self._existing_parts(), default=0) + 1
+
+    def _recover(self, resume_position: Optional[Dict]) -> None:
+        """Remove rows an interrupted run wrote but did not commit (no-op by default)."""
+
+    def _part_path(self) -> Path:
+        """Path of the current part file."""
+        return self.output_dir / f"{self.prefix}_part{self._part_index:05d}{self.extension}"
+
+    def _prepare(self, rows: List[Dict]) -> List[Dict]:
+        """Apply flattening to a batch of rows if enabled."""
+        if self.flatten:
+            return [flatten_dict_for_csv(row) for row in rows]
+        return rows
+
+    def _commit(self, tags: List[Any]) -> None:
+        """Report durable tags to the `on_commit` callback (lock must be held)."""
+        if tags and self.on_commit is not None:
+            self.on_commit(tags)
+
+    def write_rows(self, rows: List[Dict], tag: Any = None) -> None:
+        """
+        Append rows to the dataset.
+
+        Args:
+            rows: Row dictionaries to append
+            tag: Optional commit tag reported through `on_commit`
+        """
+        if self._closed:
+            raise ValueError("Cannot write to a closed dataset writer")
+        with self._lock:
+            if rows:
+                self._write(self._prepare(rows))
+                self.rows_written += len(rows)
+            if tag is not None:
+                self._pending_tags.append(tag)
+            self._after_write()
+
+    def close(self) -> None:
+        """Flush buffered rows, finish the current part and commit pending tags."""
+        with self._lock:
+            if self._closed:
+                return
+            self._finish_part()
+            self._commit(self._pending_tags)
+            self._pending_tags = []
+            self._closed = True
+        logger.info(f"Wrote {self.rows_written} rows to {len(self.paths)} file(s) with prefix {self.prefix}")
+
+    def __enter__(self) -> "DatasetWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _write(self, rows: List[Dict]) -> None:
+        """Write prepared rows (lock held)."""
+        raise NotImplementedError
+
+    def _after_write(self) -> None:
+        """Make rows durable and roll over if needed (lock held)."""
+        raise NotImplementedError
+
+    def _finish_part(self) -> None:
+        """Finish the current part file (lock held)."""
+        raise NotImplementedError
+
+
+class JsonlDatasetWriter(DatasetWriter):
+    """
+    Append-only JSONL writer.
+
+    Every `write_rows` call is flushed and fsynced before its tag is
+    committed, so a crash loses at most the batch being written.
+    """
+
+    extension = ".jsonl"
+
+    def __init__(self, output_dir: str, prefix: str, **kwargs):
+        """
+        Initialize JSONL writer.
+
+        Args:
+            output_dir: Directory for the part files
+            prefix: File name prefix shared by all parts
+            **kwargs: Options passed to DatasetWriter
+        """
+        super().__init__(output_dir, prefix, **kwargs)
+        self._file = None
+
+    def _recover(self, resume_position: Optional[Dict]) -> None:
+        """
+        Cut the parts of an interrupted run back to their committed rows.
+
+        With a recorded position, the part it names is truncated to the
+        committed offset and later parts (uncommitted rows only) are removed,
+        so rows that were flushed but not committed are not written twice.
+        Without one, only a torn last line is cut off the last part.
+        """
+        parts = self._existing_parts()
+        if not parts:
+            return
+        committed_index = None
+        if resume_position is not None:
+            committed_index = next(
+                (index for index, path in parts.items() if path.name == resume_position["part"]), None
+            )
+            if committed_index is None:
+                logger.warning(f"Committed part {resume_position['part']} not found; only repairing the last part")
+        if committed_index is None:
+            path = parts[max(parts)]
+            self._truncate(path, self._last_line_end(path))
+            return
+        for index, path in sorted(parts.items()):
+            if index > committed_index:
+                logger.warning(f"Removing {path.name}: it holds only uncommitted rows")
+                path.unlink()
+        self._truncate(parts[committed_index], resume_position["offset"])
+
+    @staticmethod
+    def _last_line_end(path: Path, block_size: int = 1024 * 1024) -> int:
+        """Byte offset just past the last complete line of a file."""
+        with open(path, "rb") as f:
+            end = f.seek(0, os.SEEK_END)
+            while end > 0:
+                start = max(0, end - block_size)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline >= 0:
+                    return start + newline + 1
+                end = start
+        return 0
+
+    @staticmethod
+    def _truncate(path: Path, size: int) -> None:
+        """Truncate a part file to `size` bytes if it is longer (removing it if nothing is left)."""
+        if path.stat().st_size <= size:
+            return
+        if size == 0:
+            logger.warning(f"Removing {path.name}: it holds no complete committed row")
+            path.unlink()
+            return
+        logger.warning(f"Truncating {path.name} to {size} bytes (dropping rows written after the last commit)")
+        with open(path, "r+b") as f:
+            f.truncate(size)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _write(self, rows: List[Dict]) -> None:
+        if self._file is None:
+            path = self._part_path()
+            self._file = open(path, "a", encoding="utf-8")
+            self.paths.append(path)
+            logger.debug(f"Opened dataset part {path.name}")
+        self._file.write("".join(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in rows))
+
+    def _after_write(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.committed_position = {"part": Path(self._file.name).name, "offset": self._file.tell()}
+        self._commit(self._pending_tags)
+        self._pending_tags = []
+        if self._file is not None and self._file.tell() >= self.max_file_bytes:
+            self._finish_part()
+
+    def _finish_part(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._part_index += 1
+
+
+class ParquetDatasetWriter(DatasetWriter):
+    """
+    Parquet writer that buffers rows and writes them in row groups.
+
+    A Parquet file is only readable once its footer is written, so parts are
+    written under a `.tmp` name and renamed when finished; tags are committed
+    only then, with the last finished part as `committed_position`. Rows are
+    flattened by default so nested values fit a flat schema.
+
+    Each part's schema is inferred from its first row group: columns that
+    are all None there become strings, and values of string columns are
+    stringified. A later row group that brings new columns, or values that
+    do not fit the schema, finishes the part and starts a new one whose
+    schema covers both, so no column is ever dropped (parts may therefore
+    differ in their columns).
+    """
+
+    extension = ".parquet"
+
+    def __init__(
+        self,
+        output_dir: str,
+        prefix: str,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        flatten: bool = True,
+        **kwargs,
+    ):
+        """
+        Initialize Parquet writer.
+
+        Args:
+            output_dir: Directory for the part files
+            prefix: File name prefix shared by all parts
+            row_group_size: Rows buffered before a row group is written
+            flatten: Flatten nested structures (default: True)
+            **kwargs: Options passed to DatasetWriter
+        """
+        if pa is None:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+        super().__init__(output_dir, prefix, flatten=flatten, **kwargs)
+        self.row_group_size = row_group_size
+        self._buffer: List[Dict] = []
+        self._writer = None
+        self._schema = None
+        self._part_bytes = 0
+
+    def _tmp_path(self) -> Path:
+        return self._part_path().with_name(self._part_path().name + ".tmp")
+
+    def _recover(self, resume_position: Optional[Dict]) -> None:
+        """
+        Drop the parts of an interrupted run that hold uncommitted rows.
+
+        Unfinished `.tmp` parts are always removed. Finished parts after the
+        recorded committed part were renamed after the last commit (e.g. a
+        crash between the rename and the manifest write), so their combos
+        are regenerated and the parts are removed; without a recorded
+        position no commit happened and every leftover part is removed.
+        """
+        for path in self.output_dir.glob(f"{self.prefix}_part*{self.extension}.tmp"):
+            logger.warning(f"Removing {path.name}: unfinished part of an interrupted run")
+            path.unlink()
+        parts = self._existing_parts()
+        committed_index = 0
+        if resume_position is not None:
+            committed_index = next(
+                (index for index, path in parts.items() if path.name == resume_position["part"]), None
+            )
+            if committed_index is None:
+                logger.warning(f"Committed part {resume_position['part']} not found; keeping existing parts")
+                return
+        for index, path in sorted(parts.items()):
+            if index > committed_index:
+                logger.warning(f"Removing {path.name}: it holds only uncommitted rows")
+                path.unlink()
+
+    def _write(self, rows: List[Dict]) -> None:
+        self._buffer.extend(rows)
+        while len(self._buffer) >= self.row_group_size:
+            self._write_row_group(self._buffer[:self.row_group_size])
+            self._buffer = self._buffer[self.row_group_size:]
+
+    @staticmethod
+    def _column_type(values: List[Any]) -> Optional["pa.DataType"]:
+        """Arrow type of a column's values (string if mixed, None if all None)."""
+        try:
+            column_type = pa.array(values).type
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return pa.string()
+        return None if pa.types.is_null(column_type) else column_type
+
+    @classmethod
+    def _infer_schema(cls, rows: List[Dict], base: Optional["pa.Schema"] = None) -> "pa.Schema":
+        """
+        Schema covering `rows` (and the columns of `base`, if given).
+
+        All-None and mixed-type columns become strings; a column whose type
+        differs from `base` becomes float64 if both are numeric, else string.
+        """
+        fields = {field.name: field.type for field in base} if base is not None else {}
+        columns = dict.fromkeys(key for row in rows for key in row)
+        for name in columns:
+            column_type = cls._column_type([row.get(name) for row in rows])
+            previous = fields.get(name)
+            if column_type is None:
+                column_type = previous or pa.string()
+            elif previous is not None and previous != column_type:
+                numeric = all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in (previous, column_type))
+                column_type = pa.float64() if numeric else pa.string()
+            fields[name] = column_type
+        return pa.schema(list(fields.items()))
+
+    def _fits(self, rows: List[Dict]) -> bool:
+        """Whether `rows` convert losslessly to the current part's schema (no new columns, no narrowing)."""
+        for name in dict.fromkeys(key for row in rows for key in row):
+            if name not in self._schema.names:
+                return False
+            column_type = self._column_type([row.get(name) for row in rows])
+            target = self._schema.field(name).type
+            lossless = (
+                column_type is None
+                or column_type == target
+                or pa.types.is_string(target)
+                or (pa.types.is_floating(target) and pa.types.is_integer(column_type))
+            )
+            if not lossless:
+                return False
+        return True
+
+    @staticmethod
+    def _to_table(rows: List[Dict], schema: "pa.Schema") -> "pa.Table":
+        """Build a table with `schema`, stringifying values of string columns."""
+        text_columns = [field.name for field in schema if pa.types.is_string(field.type)]
+        rows = [
+            {**row, **{
+                name: str(row[name]) for name in text_columns
+                if row.get(name) is not None and not isinstance(row[name], str)
+            }}
+            for row in rows
+        ]
+        return pa.Table.from_pylist(rows, schema=schema)
+
+    def _open_part(self, schema: "pa.Schema") -> None:
+        self._schema = schema
+        self._writer = pq.ParquetWriter(str(self._tmp_path()), self._schema)
+        self._part_bytes = 0
+        logger.debug(f"Opened dataset part {self._part_path().name}")
+
+    def _write_row_group(self, rows: List[Dict]) -> None:
+        if self._writer is None:
+            self._open_part(self._infer_schema(rows))
+        if not self._fits(rows):
+            unknown = set().union(*(row.keys() for row in rows)) - set(self._schema.names)
+            # Roll over to a part whose schema also covers these rows
+            schema = self._infer_schema(rows, base=self._schema)
+            logger.info(
+                f"Row group does not fit the schema of {self._part_path().name}"
+                + (f" (new columns: {sorted(unknown)})" if unknown else "")
+                + "; starting a new part"
+            )
+            self._close_part()
+            self._open_part(schema)
+        table = self._to_table(rows, self._schema)
+        self._writer.write_table(table)
+        self._part_bytes += table.nbytes
+
+    def _after_write(self) -> None:
+        if self._part_bytes >= self.max_file_bytes:
+            self._finish_part()
+            self._commit(self._pending_tags)
+            self._pending_tags = []
+
+    def _finish_part(self) -> None:
+        if self._buffer:
+            self._write_row_group(self._buffer)
+            self._buffer = []
+        self._close_part()
+
+    def _close_part(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            with open(self._tmp_path(), "rb") as f:
+                os.fsync(f.fileno())
+            os.replace(self._tmp_path(), self._part_path())
+            self.paths.append(self._part_path())
+            # Rows of finished parts are durable; tags are committed right after
+            self.committed_position = {"part": self._part_path().name}
+            self._part_index += 1
+
+
+def create_dataset_writer(output_format: str, output_dir: str, prefix: str, **kwargs) -> DatasetWriter:
+    """
+    Create a dataset writer for an output format.
+
+    Args:
+        output_format: One of OUTPUT_FORMATS ("jsonl" or "parquet")
+        output_dir: Directory for the part files
+        prefix: File name prefix shared by all parts
+        **kwargs: Options passed to the writer
+
+    Returns:
+        DatasetWriter instance
+    """
+    if output_format == "jsonl":
+        return JsonlDatasetWriter(output_dir, prefix, **kwargs)
+    if output_format == "parquet":
+        return ParquetDatasetWriter(output_dir, prefix, **kwargs)
+    raise ValueError(f"Unknown output format '{output_format}' (expected one of {OUTPUT_FORMATS})")
+
+
+def write_dataset(rows: List[Dict], output_format: str, output_dir: str, prefix: str, **kwargs) -> List[Path]:
+    """
+    Write a list of rows in one go through a dataset writer.
+
+    Args:
+        rows: Row dictionaries to write
+        output_format: One of OUTPUT_FORMATS ("jsonl" or "parquet")
+        output_dir: Directory for the part files
+        prefix: File name prefix shared by all parts
+        **kwargs: Options passed to the writer
+
+    Returns:
+        Paths of the written part files
+    """
+    with create_dataset_writer(output_format, output_dir, prefix, **kwargs) as writer:
+        writer.write_rows(rows)
+    return writer.paths
@@ -0,0 +1,246 @@
+"""
+Declarative categorical distributions with alias-method sampling.
+
+Distribution tables are read from a versioned JSON (or YAML) file and
+compiled once into Walker/Vose alias tables, so every draw costs O(1)
+regardless of the number of categories. Three kinds of fields are
+supported:
+
+- independent: `{"values": [...], "weights": [...]}`
+- conditional: `{"given": "<field>", "tables": [{"when": [...], "values": [...],
+  "weights": [...]}], "default": {"values": [...], "weights": [...]}}`
+- mapped: `{"given": "<field>", "map": {...}, "default": "<value>"}`
+"""
+import json
+import logging
+from pathlib import Path
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+DEFAULT_DISTRIBUTIONS_PATH = Path(__file__).parent.parent / "knowledge_base" / "demographic_distributions.json"
+
+
+def build_alias_table(weights: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build a Vose alias table.
+
+    Args:
+        weights: Non-negative relative weights (at least one positive)
+
+    Returns:
+        (prob, alias) arrays: column i is kept with probability prob[i],
+        otherwise alias[i] is returned
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    if weights.ndim != 1 or len(weights) == 0:
+        raise ValueError("Weights must be a non-empty list")
+    if (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError("Weights must be non-negative and sum to a positive number")
+
+    n = len(weights)
+    scaled = weights * n / weights.sum()
+    prob = np.ones(n)
+    alias = np.arange(n)
+    small = [i for i in range(n) if scaled[i] < 1.0]
+    large = [i for i in range(n) if scaled[i] >= 1.0]
+    while small and large:
+        s, l = small.pop(), large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] -= 1.0 - scaled[s]
+        (small if scaled[l] < 1.0 else large).append(l)
+    # Leftovers are 1.0 up to floating point error
+    for i in small + large:
+        prob[i] = 1.0
+    return prob, alias
+
+
+class AliasTable:
+    """Independent categorical field."""
+
+    given: Optional[str] = None
+
+    def __init__(self, values: Sequence, weights: Sequence[float]):
+        """
+        Args:
+            values: Category values
+            weights: Relative weights, one per value
+        """
+        if len(values) != len(weights):
+            raise ValueError(f"Got {len(values)} values but {len(weights)} weights")
+        self.values = list(values)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.prob, self.alias = build_alias_table(weights)
+
+    def probabilities(self) -> np.ndarray:
+        """Normalized target probabilities."""
+        return self.weights / self.weights.sum()
+
+    def sample_codes(self, rng: np.random.Generator, size: int, parent_codes: Optional[np.ndarray] = None) -> np.ndarray:
+        """Draw `size` category codes (indices into `values`)."""
+        column = rng.integers(0, len(self.values), size)
+        return np.where(rng.random(size) < self.prob[column], column, self.alias[column])
+
+    def sample_value(self, rnd, parent_value: Any = None) -> Any:
+        """Draw one value with a `random.Random`-like source."""
+        column = min(int(rnd.random() * len(self.values)), len(self.values) - 1)
+        return self.values[column if rnd.random() < self.prob[column] else self.alias[column]]
+
+
+class ConditionalAliasTable:
+    """Categorical field whose weights depend on an earlier field."""
+
+    def __init__(self, given: str, parent_values: Sequence, rows: Dict[Any, Tuple[Sequence, Sequence[float]]], default):
+        """
+        Args:
+            given: Name of the parent field
+            parent_values: Values of the parent field, in code order
+            rows: Parent value -> (values, weights)
+            default: (values, weights) for parent values without a row
+        """
+        self.given = given
+        self.parent_values = list(parent_values)
+        tables = [rows.get(parent, default) for parent in self.parent_values]
+        if any(table is None for table in tables):
+            missing = [p for p, t in zip(self.parent_values, tables) if t is None]
+            raise ValueError(f"No table or default for {given} value(s) {missing}")
+
+        # One shared value list; each parent row is a full-width alias table
+        self.values: List[Any] = []
+        for values, _ in tables:
+            self.values.extend(v for v in values if v not in self.values)
+        self.weights = np.zeros((len(tables), len(self.values)))
+        for row, (values, weights) in enumerate(tables):
+            if len(values) != len(weights):
+                raise ValueError(f"Got {len(values)} values but {len(weights)} weights for {given}={self.parent_values[row]}")
+            for value, weight in zip(values, weights):
+                self.weights[row, self.values.index(value)] = weight
+        compiled = [build_alias_table(row) for row in self.weights]
+        self.prob = np.stack([prob for prob, _ in compiled])
+        self.alias = np.stack([alias for _, alias in compiled])
+
+    def probabilities(self) -> np.ndarray:
+        """Normalized target probabilities, one row per parent value."""
+        return self.weights / self.weights.sum(axis=1, keepdims=True)
+
+    def sample_codes(self, rng: np.random.Generator, size: int, parent_codes: Optional[np.ndarray] = None) -> np.ndarray:
+        """Draw `size` category codes given the parent field's codes."""
+        column = rng.integers(0, len(self.values), size)
+        keep = rng.random(size) < self.prob[parent_codes, column]
+        return np.where(keep, column, self.alias[parent_codes, column])
+
+    def sample_value(self, rnd, parent_value: Any = None) -> Any:
+        """Draw one value given the parent value."""
+        row = self.parent_values.index(parent_value)
+        column = min(int(rnd.random() * len(self.values)), len(self.values) - 1)
+        return self.values[column if rnd.random() < self.prob[row, column] else self.alias[row, column]]
+
+
+class MappedField:
+    """Field determined by an earlier field through a lookup table."""
+
+    def __init__(self, given: str, parent_values: Sequence, mapping: Dict[Any, Any], default: Any = None):
+        """
+        Args:
+            given: Name of the parent field
+            parent_values: Values of the parent field, in code order
+            mapping: Parent value -> value
+            default: Value for parent values missing from `mapping`
+        """
+        self.given = given
+        self.mapping = dict(mapping)
+        self.default = default
+        mapped = [self.mapping.get(parent, default) for parent in parent_values]
+        self.values = list(dict.fromkeys(mapped))
+        self.lookup = np.array([self.values.index(value) for value in mapped])
+
+    def sample_codes(self, rng: np.random.Generator, size: int, parent_codes: Optional[np.ndarray] = None) -> np.ndarray:
+        return self.lookup[parent_codes]
+
+    def sample_value(self, rnd, parent_value: Any = None) -> Any:
+        return self.mapping.get(parent_value, self.default)
+
+
+class DistributionTables:
+    """Compiled distribution tables in sampling order."""
+
+    def __init__(self, fields: Dict[str, Any], version: str, source: Optional[str] = None):
+        """
+        Args:
+            fields: Field name -> compiled table, in sampling order
+            version: Version string of the data file
+            source: Path the tables were loaded from
+        """
+        self.fields = fields
+        self.version = version
+        self.source = source
+
+    @classmethod
+    def from_dict(cls, data: Dict, source: Optional[str] = None) -> "DistributionTables":
+        """
+        Compile a parsed distribution file.
+
+        Args:
+            data: Dictionary with "version" and "fields"
+            source: Path of the file (for messages)
+
+        Returns:
+            DistributionTables instance
+        """
+        fields: Dict[str, Any] = {}
+        for name, spec in data["fields"].items():
+            given = spec.get("given")
+            if given is not None and given not in fields:
+                raise ValueError(f"Field '{name}' depends on '{given}', which must be listed before it")
+            try:
+                if given is None:
+                    fields[name] = AliasTable(spec["values"], spec["weights"])
+                elif "map" in spec:
+                    fields[name] = MappedField(given, fields[given].values, spec["map"], spec.get("default"))
+                else:
+                    rows = {
+                        parent: (table["values"], table["weights"])
+                        for table in spec["tables"]
+                        for parent in table["when"]
+                    }
+                    default = spec.get("default")
+                    fields[name] = ConditionalAliasTable(
+                        given,
+                        fields[given].values,
+                        rows,
+                        (default["values"], default["weights"]) if default else None,
+                    )
+            except (KeyError, ValueError) as e:
+                raise ValueError(f"Invalid distribution for field '{name}' in {source or 'tables'}: {e}") from e
+        return cls(fields, str(data.get("version", "unversioned")), source)
+
+
+@lru_cache(maxsize=None)
+def _load_distribution_tables(path: str) -> DistributionTables:
+    with open(path, "r", encoding="utf-8") as f:
+        if Path(path).suffix in (".yaml", ".yml"):
+            import yaml
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    tables = DistributionTables.from_dict(data, source=path)
+    logger.info(f"Loaded {len(tables.fields)} distribution table(s) version {tables.version} from {path}")
+    return tables
+
+
+def load_distribution_tables(path: Optional[str] = None) -> DistributionTables:
+    """
+    Load and compile distribution tables (cached per path).
+
+    Args:
+        path: JSON or YAML file (defaults to knowledge_base/demographic_distributions.json)
+
+    Returns:
+        DistributionTables instance
+    """
+    return _load_distribution_tables(str(Path(path or DEFAULT_DISTRIBUTIONS_PATH).resolve()))
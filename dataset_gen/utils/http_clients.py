@@ -0,0 +1,161 @@
+"""
+Shared, connection-pooled HTTP clients for OpenAI-compatible APIs.
+
+Every OpenAI client created through `create_openai_client` talks to its
+provider over one httpx client per base URL, so concurrent workers reuse
+kept-alive connections (and TLS sessions) instead of opening new sockets
+per client. HTTP/2 is negotiated when the `h2` package (`httpx[http2]`)
+is installed; otherwise HTTP/1.1 keep-alive is used and a warning says so.
+"""
+import atexit
+import asyncio
+import logging
+import threading
+import importlib.util
+import weakref
+from typing import Dict, Optional
+
+import httpx
+from openai import DefaultAsyncHttpxClient, DefaultHttpxClient
+
+from .model_params import normalize_base_url
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+# Connection pool limits per base URL
+MAX_CONNECTIONS = 256
+MAX_KEEPALIVE_CONNECTIONS = 64
+KEEPALIVE_EXPIRY = 90.0
+
+# Timeouts in seconds; reads are long because completions of reasoning
+# models can take minutes before the first byte
+CONNECT_TIMEOUT = 10.0
+READ_TIMEOUT = 600.0
+WRITE_TIMEOUT = 60.0
+POOL_TIMEOUT = 30.0
+
+
+def http2_available() -> bool:
+    """Whether httpx can speak HTTP/2 (the optional `h2` package is installed)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def client_options(http2: Optional[bool] = None) -> Dict:
+    """
+    Keyword arguments for a pooled httpx client.
+
+    Args:
+        http2: Enable HTTP/2 (default: when available)
+
+    Returns:
+        Dictionary with "limits", "timeout" and "http2"
+    """
+    return {
+        "limits": httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT, write=WRITE_TIMEOUT, pool=POOL_TIMEOUT),
+        "http2": http2_available() if http2 is None else http2,
+    }
+
+
+class HttpClientPool:
+    """
+    One sync httpx client per base URL, and one async client per base URL
+    and event loop (async connections cannot move between loops).
+
+    Clients handed out are shared: close them through the pool, not
+    directly or through the OpenAI client wrapping them.
+    """
+
+    def __init__(self, http2: Optional[bool] = None):
+        """
+        Initialize client pool.
+
+        Args:
+            http2: Enable HTTP/2 (default: when the `h2` package is installed)
+        """
+        self.http2 = http2_available() if http2 is None else http2
+        if http2 is None and not self.http2:
+            logger.warning("HTTP/2 is off: the h2 package is not installed (pip install 'httpx[http2]'); using HTTP/1.1 keep-alive")
+        self._clients: Dict[str, httpx.Client] = {}
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, base_url: str) -> httpx.Client:
+        """
+        Get the shared sync client of a base URL.
+
+        Args:
+            base_url: Provider base URL
+
+        Returns:
+            httpx client (created on first use)
+        """
+        key = normalize_base_url(base_url)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None or client.is_closed:
+                client = DefaultHttpxClient(**client_options(self.http2))
+                self._clients[key] = client
+                logger.debug(f"Opened connection pool for {key} (HTTP/2: {self.http2})")
+            return client
+
+    def get_async(self, base_url: str) -> httpx.AsyncClient:
+        """
+        Get the async client of a base URL for the running event loop.
+
+        Called outside an event loop, a new pooled client is returned that
+        is not shared (it may end up in whichever loop the caller starts).
+
+        Args:
+            base_url: Provider base URL
+
+        Returns:
+            httpx async client
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return DefaultAsyncHttpxClient(**client_options(self.http2))
+        key = normalize_base_url(base_url)
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            client = clients.get(key)
+            if client is None or client.is_closed:
+                client = DefaultAsyncHttpxClient(**client_options(self.http2))
+                clients[key] = client
+                logger.debug(f"Opened async connection pool for {key} (HTTP/2: {self.http2})")
+            return client
+
+    def close(self) -> None:
+        """Close all sync clients (async clients are released with their event loop)."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+
+_shared_pool: Optional[HttpClientPool] = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_http_client_pool() -> HttpClientPool:
+    """
+    Get the process-wide HTTP client pool.
+
+    Returns:
+        Shared HttpClientPool instance
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = HttpClientPool()
+            atexit.register(_shared_pool.close)
+        return _shared_pool
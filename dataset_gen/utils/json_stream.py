@@ -0,0 +1,102 @@
+"""
+Incremental parser for JSON arrays arriving in pieces.
+
+Streamed completions deliver a JSON array a few characters at a time. The
+parser tracks bracket depth and string state so that every top-level array
+element is decoded as soon as its closing character arrives. An element that
+fails to decode is reported on its own instead of invalidating the whole
+reply.
+"""
+import json
+import logging
+from typing import Any, Iterator, List, Optional, Tuple
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+
+class JsonArrayStreamParser:
+    """
+    Splits a streamed top-level JSON array into its elements.
+
+    Text before the opening bracket (e.g. a markdown fence) is ignored.
+    `feed()` yields `(index, value, error)` tuples: `value` is the decoded
+    element and `error` is None, or `value` is None and `error` describes why
+    the element could not be decoded.
+    """
+
+    def __init__(self):
+        self.index = 0
+        self.started = False
+        self.finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._element: List[str] = []
+
+    def feed(self, text: str) -> Iterator[Tuple[int, Optional[Any], Optional[str]]]:
+        """
+        Consume the next piece of the reply.
+
+        Args:
+            text: Next piece of the streamed text
+
+        Yields:
+            (index, value, error) for every element completed by this piece
+        """
+        for char in text:
+            if self.finished:
+                return
+            if not self.started:
+                if char == "[":
+                    self.started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                self._element.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "[{":
+                self._depth += 1
+            elif char in "]}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.finished = True
+                    element = self._take()
+                    if element is not None:
+                        yield element
+                    return
+            elif char == "," and self._depth == 1:
+                element = self._take()
+                if element is not None:
+                    yield element
+                continue
+            self._element.append(char)
+
+    def _take(self) -> Optional[Tuple[int, Optional[Any], Optional[str]]]:
+        """Decode the buffered element, if any."""
+        raw = "".join(self._element).strip()
+        self._element = []
+        if not raw:
+            return None
+        index = self.index
+        self.index += 1
+        try:
+            return index, json.loads(raw), None
+        except json.JSONDecodeError as e:
+            logger.debug(f"Element {index} is not valid JSON: {raw[:200]}")
+            return index, None, f"invalid JSON ({e})"
+
+    @property
+    def pending(self) -> str:
+        """Text of the element still being received (unfinished at stream end)."""
+        return "".join(self._element)
@@ -1,8 +1,10 @@
 """
 LLM client wrapper for OpenAI-compatible APIs.
 """
-from typing import List, Dict, Any, Optional
-from openai import OpenAI
+import asyncio
+import threading
+from typing import TYPE_CHECKING, List, Dict, Any, Iterator, Optional
+from openai import AsyncOpenAI, OpenAI
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 from openai.types.chat import (
     ChatCompletionAssistantMessageParam,
@@ -20,27 +22,175 @@ from config import (
     PRESENCE_PENALTY,
     FREQUENCY_PENALTY
 )
+from .http_clients import get_http_client_pool
 from .model_params import build_generation_params
+from .rate_limiter import RateLimiter
+from .response_cache import ResponseCache
+from .retry import RetryPolicy, aretry_call, get_circuit_breaker, retry_call
+from .token_utils import num_tokens_from_messages
+
+if TYPE_CHECKING:
+    from .provider_router import ProviderRouter
+
+
+def _api_key(api_key: Optional[str]) -> str:
+    """Return the given API key or the configured Metis key; fail if neither is set."""
+    api_key = api_key or METIS_API_KEY
+    if not api_key:
+        # Checked here rather than when config is imported, so modules that
+        # never call Metis (e.g. the analyzer) work without the key
+        raise ValueError("METIS_API_KEY environment variable is not set. Please set it in your .env file.")
+    return api_key
 
 
 def create_openai_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> OpenAI:
     """
     Create an OpenAI client instance.
     
+    Clients of the same base URL share one pooled HTTP client (see
+    `utils.http_clients`), so their connections are kept alive and reused.
+    The SDK's own retries are off; `LLMClient` retries through `utils.retry`.
+    
     Args:
         api_key: API key (defaults to config)
         base_url: Base URL (defaults to config)
     
     Returns:
         OpenAI client instance
+    
+    Raises:
+        ValueError: If no API key is given and METIS_API_KEY is not set
     """
+    base_url = base_url or METIS_BASE_URL
     return OpenAI(
-        api_key=api_key or METIS_API_KEY,
-        base_url=base_url or METIS_BASE_URL,
-        http_client=None
+        api_key=_api_key(api_key),
+        base_url=base_url,
+        http_client=get_http_client_pool().get(base_url),
+        max_retries=0
+    )
+
+
+def create_async_openai_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> AsyncOpenAI:
+    """
+    Create an AsyncOpenAI client instance.
+    
+    Inside an event loop, clients of the same base URL share one pooled
+    HTTP client for that loop (see `utils.http_clients`).
+    
+    Args:
+        api_key: API key (defaults to config)
+        base_url: Base URL (defaults to config)
+    
+    Returns:
+        AsyncOpenAI client instance
+    
+    Raises:
+        ValueError: If no API key is given and METIS_API_KEY is not set
+    """
+    base_url = base_url or METIS_BASE_URL
+    return AsyncOpenAI(
+        api_key=_api_key(api_key),
+        base_url=base_url,
+        http_client=get_http_client_pool().get_async(base_url),
+        max_retries=0
     )
 
 
+def cached_prompt_tokens(usage: Any) -> int:
+    """
+    Prompt tokens served from the provider's prefix cache.
+    
+    Reads `usage.prompt_tokens_details.cached_tokens` (OpenAI) or
+    `usage.prompt_cache_hit_tokens` (DeepSeek-style providers).
+    
+    Args:
+        usage: Usage object of a completion (or None)
+    
+    Returns:
+        Cached prompt tokens (0 if not reported)
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None)
+    if cached is None:
+        cached = getattr(usage, "prompt_cache_hit_tokens", None)
+    return cached or 0
+
+
+class UsageStats:
+    """Token usage reported by the API, summed over calls (thread-safe)."""
+    
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+    
+    def record(self, usage: Any) -> None:
+        """
+        Add the usage of one completion.
+        
+        Args:
+            usage: Usage object of the response (ignored if None)
+        """
+        if usage is None:
+            return
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += getattr(usage, "prompt_tokens", None) or 0
+            self.cached_tokens += cached_prompt_tokens(usage)
+            self.completion_tokens += getattr(usage, "completion_tokens", None) or 0
+    
+    @property
+    def cache_hit_rate(self) -> float:
+        """Share of prompt tokens served from the provider's prefix cache."""
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+    
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cache_hit_rate": self.cache_hit_rate,
+        }
+
+
+class CompletionStream:
+    """
+    Text deltas of a streamed chat completion.
+
+    Iterate to receive content pieces as they arrive; `finish_reason` and
+    `usage` are set once the stream is exhausted.
+    """
+    
+    def __init__(self, chunks: Any, on_done=None):
+        """
+        Args:
+            chunks: Iterable of ChatCompletionChunk objects
+            on_done: Called with the usage object (or None) after the last chunk
+        """
+        self._chunks = chunks
+        self._on_done = on_done
+        self.finish_reason: Optional[str] = None
+        self.usage: Any = None
+    
+    def __iter__(self) -> Iterator[str]:
+        try:
+            for chunk in self._chunks:
+                if getattr(chunk, "usage", None):
+                    self.usage = chunk.usage
+                for choice in chunk.choices:
+                    if choice.finish_reason:
+                        self.finish_reason = choice.finish_reason
+                    if choice.delta and choice.delta.content:
+                        yield choice.delta.content
+        finally:
+            if self._on_done is not None:
+                self._on_done(self.usage)
+                self._on_done = None
+
+
 class LLMClient:
     """Wrapper for LLM API calls with support for langchain messages."""
     
@@ -50,7 +200,12 @@ class LLMClient:
         temperature: float = TEMPERATURE,
         top_p: float = TOP_P,
         presence_penalty: float = PRESENCE_PENALTY,
-        frequency_penalty: float = FREQUENCY_PENALTY
+        frequency_penalty: float = FREQUENCY_PENALTY,
+        rate_limiter: Optional[RateLimiter] = None,
+        expected_output_tokens: int = 1024,
+        cache: Optional[ResponseCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        router: Optional["ProviderRouter"] = None
     ):
         """
         Initialize LLM client.
@@ -61,12 +216,33 @@ class LLMClient:
             top_p: Top-p for generation
             presence_penalty: Presence penalty
             frequency_penalty: Frequency penalty
+            rate_limiter: Optional shared rate limiter; calls block until the
+                provider/model budget allows them
+            expected_output_tokens: Output tokens reserved per call before the
+                real usage is known
+            cache: Optional on-disk response cache; identical requests are
+                served from it instead of calling the API
+            retry_policy: Backoff for rate limits and transient errors
+                (default: RetryPolicy()); calls also go through the
+                endpoint's circuit breaker
+            router: Optional provider router; when given, requests are spread
+                over its providers (with their own rate limits, circuit
+                breakers and failover) instead of going to `client`
+        
+        Token usage of every API response (including prompt tokens served
+        from the provider's prefix cache) is summed in `usage_stats`.
         """
         self.client = client or create_openai_client()
         self.temperature = temperature
         self.top_p = top_p
         self.presence_penalty = presence_penalty
         self.frequency_penalty = frequency_penalty
+        self.rate_limiter = rate_limiter
+        self.expected_output_tokens = expected_output_tokens
+        self.cache = cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.router = router
+        self.usage_stats = UsageStats()
     
     def _role(self, m: BaseMessage) -> str:
         """Extract role from message."""
@@ -107,6 +283,88 @@ class LLMClient:
                 ))
         return payload
     
+    def _generation_params(self, model_name: str, **kwargs) -> Dict[str, Any]:
+        """Build generation parameters, falling back to the client defaults."""
+        return build_generation_params(
+            model=model_name,
+            temperature=kwargs.get("temperature", self.temperature),
+            top_p=kwargs.get("top_p", self.top_p),
+            presence_penalty=kwargs.get("presence_penalty", self.presence_penalty),
+            frequency_penalty=kwargs.get("frequency_penalty", self.frequency_penalty),
+            **{k: v for k, v in kwargs.items() if k not in ["temperature", "top_p", "presence_penalty", "frequency_penalty"]}
+        )
+    
+    def _estimate_tokens(self, messages: List[Any], model_name: str) -> int:
+        """Estimate the tokens a request will consume against the rate limit."""
+        return num_tokens_from_messages(messages, model_name) + self.expected_output_tokens
+    
+    def _limiter_for(self, model_name: str):
+        """Get the provider/model limiter for this client, if rate limiting is on."""
+        if self.rate_limiter is None:
+            return None
+        return self.rate_limiter.get(str(self.client.base_url), model_name)
+    
+    def _attempt(self, call, limiter, estimated: int):
+        """Wrap one API call with its rate-limit reservation (returned if the call fails)."""
+        def attempt():
+            if limiter is not None:
+                limiter.acquire(estimated)
+            try:
+                return call()
+            except Exception:
+                if limiter is not None:
+                    limiter.record_usage(estimated, 0)
+                raise
+        return attempt
+    
+    def _cache_lookup(self, model_name: str, generation_params: Dict[str, Any], messages: List[Any]):
+        """Return (cache key, cached response) for a request; both None without a cache."""
+        if self.cache is None:
+            return None, None
+        cache_key = self.cache.make_key(model_name, generation_params, messages)
+        return cache_key, self.cache.get(cache_key)
+    
+    def _record_response(self, model_name: str, response: Any, limiter, estimated: int, cache_key: Optional[str]) -> None:
+        """Settle the rate limit with the real usage, record it and store the response in the cache."""
+        usage = getattr(response, "usage", None)
+        self.usage_stats.record(usage)
+        if limiter is not None:
+            limiter.record_usage(estimated, getattr(usage, "total_tokens", None))
+        if cache_key is not None:
+            self.cache.put(cache_key, model_name, response)
+    
+    def _create(self, model_name: str, messages: List[Any], generation_params: Dict[str, Any]) -> Any:
+        """Send a chat completion request, respecting the cache and rate limit."""
+        cache_key, cached = self._cache_lookup(model_name, generation_params, messages)
+        if cached is not None:
+            return cached
+        
+        if self.router is not None:
+            response = self.router.call(
+                model_name,
+                lambda client: client.chat.completions.create(model=model_name, messages=messages, **generation_params),
+                self._estimate_tokens(messages, model_name),
+            )
+            self._record_response(model_name, response, None, 0, cache_key)
+            return response
+        
+        limiter = self._limiter_for(model_name)
+        estimated = self._estimate_tokens(messages, model_name) if limiter is not None else 0
+        
+        response = retry_call(
+            self._attempt(
+                lambda: self.client.chat.completions.create(model=model_name, messages=messages, **generation_params),
+                limiter,
+                estimated,
+            ),
+            self.retry_policy,
+            breaker=get_circuit_breaker(str(self.client.base_url)),
+            limiter=limiter,
+        )
+        
+        self._record_response(model_name, response, limiter, estimated, cache_key)
+        return response
+    
     def generate(
         self,
         messages: List[BaseMessage],
@@ -129,20 +387,9 @@ class LLMClient:
         model_name = model or DEFAULT_MODEL
         
         # Build parameters based on model capabilities
-        generation_params = build_generation_params(
-            model=model_name,
-            temperature=kwargs.get("temperature", self.temperature),
-            top_p=kwargs.get("top_p", self.top_p),
-            presence_penalty=kwargs.get("presence_penalty", self.presence_penalty),
-            frequency_penalty=kwargs.get("frequency_penalty", self.frequency_penalty),
-            **{k: v for k, v in kwargs.items() if k not in ["temperature", "top_p", "presence_penalty", "frequency_penalty"]}
-        )
+        generation_params = self._generation_params(model_name, **kwargs)
         
-        return self.client.chat.completions.create(
-            model=model_name,
-            messages=payload,
-            **generation_params
-        )
+        return self._create(model_name, payload, generation_params)
     
     def generate_simple(
         self,
@@ -164,18 +411,218 @@ class LLMClient:
         model_name = model or DEFAULT_MODEL
         
         # Build parameters based on model capabilities
-        generation_params = build_generation_params(
-            model=model_name,
-            temperature=kwargs.get("temperature", self.temperature),
-            top_p=kwargs.get("top_p", self.top_p),
-            presence_penalty=kwargs.get("presence_penalty", self.presence_penalty),
-            frequency_penalty=kwargs.get("frequency_penalty", self.frequency_penalty),
-            **{k: v for k, v in kwargs.items() if k not in ["temperature", "top_p", "presence_penalty", "frequency_penalty"]}
-        )
+        generation_params = self._generation_params(model_name, **kwargs)
         
-        return self.client.chat.completions.create(
-            model=model_name,
-            messages=messages,  # type: ignore[arg-type]
-            **generation_params
+        return self._create(model_name, messages, generation_params)
+    
+    def stream_simple(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        **kwargs
+    ) -> CompletionStream:
+        """
+        Stream a completion from simple dict messages.
+        
+        Streamed requests respect the rate limit but bypass the response cache.
+        With a router, only opening the stream fails over, and the provider's
+        budget keeps the estimated (not the reported) usage.
+        
+        Args:
+            messages: List of dicts with 'role' and 'content' keys
+            model: Model to use
+            **kwargs: Additional generation parameters
+        
+        Returns:
+            CompletionStream yielding content pieces
+        """
+        model_name = model or DEFAULT_MODEL
+        generation_params = self._generation_params(model_name, **kwargs)
+        
+        def open_stream(client):
+            return client.chat.completions.create(
+                model=model_name,
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},
+                **generation_params
+            )
+        
+        if self.router is not None:
+            return CompletionStream(
+                self.router.call(model_name, open_stream, self._estimate_tokens(messages, model_name)),
+                on_done=self.usage_stats.record,
+            )
+        
+        limiter = self._limiter_for(model_name)
+        estimated = self._estimate_tokens(messages, model_name) if limiter is not None else 0
+        
+        # Only opening the stream is retried; a stream that breaks off is the caller's to handle
+        chunks = retry_call(
+            self._attempt(
+                lambda: open_stream(self.client),
+                limiter,
+                estimated,
+            ),
+            self.retry_policy,
+            breaker=get_circuit_breaker(str(self.client.base_url)),
+            limiter=limiter,
         )
+        
+        def settle(usage: Any) -> None:
+            self.usage_stats.record(usage)
+            if limiter is not None:
+                limiter.record_usage(estimated, getattr(usage, "total_tokens", None))
+        
+        return CompletionStream(chunks, on_done=settle)
+
 
+class AsyncLLMClient(LLMClient):
+    """
+    Asyncio variant of LLMClient built on AsyncOpenAI.
+    
+    Message conversion and parameter filtering are shared with LLMClient;
+    only the API calls are awaited.
+    """
+    
+    def __init__(
+        self,
+        client: Optional[AsyncOpenAI] = None,
+        temperature: float = TEMPERATURE,
+        top_p: float = TOP_P,
+        presence_penalty: float = PRESENCE_PENALTY,
+        frequency_penalty: float = FREQUENCY_PENALTY,
+        rate_limiter: Optional[RateLimiter] = None,
+        expected_output_tokens: int = 1024,
+        cache: Optional[ResponseCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        router: Optional["ProviderRouter"] = None
+    ):
+        """
+        Initialize async LLM client.
+        
+        Args:
+            client: AsyncOpenAI client (creates default if not provided)
+            temperature: Temperature for generation
+            top_p: Top-p for generation
+            presence_penalty: Presence penalty
+            frequency_penalty: Frequency penalty
+            rate_limiter: Optional shared rate limiter
+            expected_output_tokens: Output tokens reserved per call
+            cache: Optional on-disk response cache
+            retry_policy: Backoff for rate limits and transient errors
+            router: Optional provider router (requests use its async clients)
+        """
+        super().__init__(
+            client=client or create_async_openai_client(),  # type: ignore[arg-type]
+            temperature=temperature,
+            top_p=top_p,
+            presence_penalty=presence_penalty,
+            frequency_penalty=frequency_penalty,
+            rate_limiter=rate_limiter,
+            expected_output_tokens=expected_output_tokens,
+            cache=cache,
+            retry_policy=retry_policy,
+            router=router
+        )
+    
+    async def _acache_lookup(self, model_name: str, generation_params: Dict[str, Any], messages: List[Any]):
+        """`_cache_lookup` in a worker thread (SQLite reads would block the event loop)."""
+        if self.cache is None:
+            return None, None
+        return await asyncio.to_thread(self._cache_lookup, model_name, generation_params, messages)
+    
+    async def _arecord_response(
+        self, model_name: str, response: Any, limiter, estimated: int, cache_key: Optional[str]
+    ) -> None:
+        """`_record_response` with the cache write in a worker thread."""
+        self._record_response(model_name, response, limiter, estimated, None)
+        if cache_key is not None:
+            await asyncio.to_thread(self.cache.put, cache_key, model_name, response)
+    
+    async def _acreate(self, model_name: str, messages: List[Any], generation_params: Dict[str, Any]) -> Any:
+        """Send a chat completion request, respecting the cache and rate limit."""
+        cache_key, cached = await self._acache_lookup(model_name, generation_params, messages)
+        if cached is not None:
+            return cached
+        
+        if self.router is not None:
+            response = await self.router.acall(
+                model_name,
+                lambda client: client.chat.completions.create(model=model_name, messages=messages, **generation_params),
+                self._estimate_tokens(messages, model_name),
+            )
+            await self._arecord_response(model_name, response, None, 0, cache_key)
+            return response
+        
+        limiter = self._limiter_for(model_name)
+        estimated = self._estimate_tokens(messages, model_name) if limiter is not None else 0
+        
+        async def attempt():
+            if limiter is not None:
+                await limiter.aacquire(estimated)
+            try:
+                return await self.client.chat.completions.create(
+                    model=model_name,
+                    messages=messages,
+                    **generation_params
+                )
+            except Exception:
+                if limiter is not None:
+                    limiter.record_usage(estimated, 0)
+                raise
+        
+        response = await aretry_call(
+            attempt,
+            self.retry_policy,
+            breaker=get_circuit_breaker(str(self.client.base_url)),
+            limiter=limiter,
+        )
+        
+        await self._arecord_response(model_name, response, limiter, estimated, cache_key)
+        return response
+    
+    async def generate(  # type: ignore[override]
+        self,
+        messages: List[BaseMessage],
+        model: Optional[str] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Generate completion from messages.
+        
+        Args:
+            messages: List of langchain messages
+            model: Model to use (defaults to config)
+            **kwargs: Additional generation parameters
+        
+        Returns:
+            OpenAI completion response
+        """
+        payload = self._build_payload(messages)
+        model_name = model or DEFAULT_MODEL
+        generation_params = self._generation_params(model_name, **kwargs)
+        
+        return await self._acreate(model_name, payload, generation_params)
+    
+    async def generate_simple(  # type: ignore[override]
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Generate completion from simple dict messages.
+        
+        Args:
+            messages: List of dicts with 'role' and 'content' keys
+            model: Model to use
+            **kwargs: Additional generation parameters
+        
+        Returns:
+            OpenAI completion response
+        """
+        model_name = model or DEFAULT_MODEL
+        generation_params = self._generation_params(model_name, **kwargs)
+        
+        return await self._acreate(model_name, messages, generation_params)
@@ -5,7 +5,7 @@ This module provides a centralized way to handle model-specific parameter suppor
 avoiding code duplication and making it easy to add new models.
 """
 from typing import Dict, Set, Any, Optional
-from config import TEMPERATURE, TOP_P, PRESENCE_PENALTY, FREQUENCY_PENALTY
+from config import TEMPERATURE, TOP_P, PRESENCE_PENALTY, FREQUENCY_PENALTY, METIS_BASE_URL, AVALAI_BASE_URL
 
 
 # Model capabilities registry
@@ -22,6 +22,45 @@ MODEL_CAPABILITIES: Dict[str, Set[str]] = {
     "gpt-5-nano": {"temperature"},
 }
 
+# Rate limit registry
+# Maps base URL -> model -> {"rpm": requests per minute, "tpm": tokens per minute}
+# The "*" model entry is the provider-wide default for models not listed.
+RATE_LIMITS: Dict[str, Dict[str, Dict[str, int]]] = {
+    METIS_BASE_URL: {
+        "gpt-5": {"rpm": 500, "tpm": 500_000},
+        "gpt-5-mini": {"rpm": 500, "tpm": 500_000},
+        "gpt-5-nano": {"rpm": 500, "tpm": 500_000},
+        "gpt-4o": {"rpm": 500, "tpm": 300_000},
+        "grok-3": {"rpm": 120, "tpm": 200_000},
+        "gemini-2.5-pro-preview-06-05": {"rpm": 60, "tpm": 250_000},
+        "*": {"rpm": 60, "tpm": 100_000},
+    },
+    # Used by the interview analyzer (analyzer_v1)
+    AVALAI_BASE_URL: {
+        "gpt-4o": {"rpm": 500, "tpm": 300_000},
+        "*": {"rpm": 60, "tpm": 100_000},
+    },
+}
+
+# Budget used for providers/models missing from RATE_LIMITS
+DEFAULT_RATE_LIMIT = {"rpm": 60, "tpm": 100_000}
+
+# Output token budget registry
+# Maps model names to the output tokens a single completion should plan for.
+# Kept well below each model's hard completion limit so that long JSON replies
+# (and reasoning tokens of gpt-5 models) are not truncated.
+OUTPUT_TOKEN_BUDGETS: Dict[str, int] = {
+    "gpt-5": 16_000,
+    "gpt-5-mini": 16_000,
+    "gpt-5-nano": 8_000,
+    "gpt-4o": 8_000,
+    "grok-3": 8_000,
+    "gemini-2.5-pro-preview-06-05": 16_000,
+}
+
+# Budget used for models missing from OUTPUT_TOKEN_BUDGETS
+DEFAULT_OUTPUT_TOKEN_BUDGET = 4_000
+
 # Default parameter values
 DEFAULT_PARAMS = {
     "temperature": TEMPERATURE,
@@ -109,3 +148,69 @@ def add_model_capabilities(model: str, supported_params: Set[str]) -> None:
     """
     MODEL_CAPABILITIES[model] = supported_params
 
+
+def normalize_base_url(base_url: str) -> str:
+    """Normalize a base URL so registry lookups ignore trailing slashes."""
+    return str(base_url).rstrip("/")
+
+
+def get_rate_limit(model: str, base_url: Optional[str] = None) -> Dict[str, int]:
+    """
+    Get the requests-per-minute and tokens-per-minute budget for a model.
+    
+    Args:
+        model: Model name
+        base_url: Provider base URL (defaults to config)
+        
+    Returns:
+        Dictionary with "rpm" and "tpm" keys
+    """
+    url = normalize_base_url(base_url or METIS_BASE_URL)
+    provider_limits = {}
+    for registered_url, limits in RATE_LIMITS.items():
+        if normalize_base_url(registered_url) == url:
+            provider_limits = limits
+            break
+    return dict(provider_limits.get(model) or provider_limits.get("*") or DEFAULT_RATE_LIMIT)
+
+
+def add_rate_limit(model: str, rpm: int, tpm: int, base_url: Optional[str] = None) -> None:
+    """
+    Add or update the rate limit budget for a model.
+    
+    Args:
+        model: Model name ("*" sets the provider-wide default)
+        rpm: Requests per minute
+        tpm: Tokens per minute
+        base_url: Provider base URL (defaults to config)
+    """
+    url = normalize_base_url(base_url or METIS_BASE_URL)
+    for registered_url in RATE_LIMITS:
+        if normalize_base_url(registered_url) == url:
+            url = registered_url
+            break
+    RATE_LIMITS.setdefault(url, {})[model] = {"rpm": rpm, "tpm": tpm}
+
+
+def get_output_token_budget(model: str) -> int:
+    """
+    Get the output tokens a single completion of a model should plan for.
+    
+    Args:
+        model: Model name
+        
+    Returns:
+        Output token budget
+    """
+    return OUTPUT_TOKEN_BUDGETS.get(model, DEFAULT_OUTPUT_TOKEN_BUDGET)
+
+
+def add_output_token_budget(model: str, tokens: int) -> None:
+    """
+    Add or update the output token budget for a model.
+    
+    Args:
+        model: Model name
+        tokens: Output tokens per completion
+    """
+    OUTPUT_TOKEN_BUDGETS[model] = tokens
@@ -0,0 +1,369 @@
+"""
+Routing of chat completions across several OpenAI-compatible providers.
+
+Every configured provider (API key present) becomes an endpoint serving the
+models listed for it in `PROVIDERS`. Each request goes to the endpoint with
+the lowest expected cost: the time its rate limit would make the request
+wait, plus its observed latency scaled by the requests it already has in
+flight. When an endpoint fails with a retryable error (or does not serve
+the model after all), the request moves on to the next endpoint at once;
+only when every endpoint has failed does it back off. Total throughput is
+the sum of the providers' budgets instead of a single provider's quota.
+"""
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+import openai
+
+from config import (
+    AVAILABLE_MODELS,
+    AVALAI_API_KEY,
+    AVALAI_BASE_URL,
+    METIS_API_KEY,
+    METIS_BASE_URL,
+    TAPSAGE_API_KEY,
+    TAPSAGE_BASE_URL,
+)
+from .llm_client import create_async_openai_client, create_openai_client
+from .rate_limiter import RateLimiter, get_rate_limiter
+from .retry import (
+    FATAL,
+    RATE_LIMIT,
+    TRANSIENT,
+    CircuitOpenError,
+    RetryPolicy,
+    classify_error,
+    get_circuit_breaker,
+)
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+# Provider registry
+# Maps provider name -> {"base_url", "api_key", "models"}; "*" in models
+# means the provider serves any model
+PROVIDERS: Dict[str, Dict[str, Any]] = {
+    "metis": {"base_url": METIS_BASE_URL, "api_key": METIS_API_KEY, "models": set(AVAILABLE_MODELS)},
+    "tapsage": {"base_url": TAPSAGE_BASE_URL, "api_key": TAPSAGE_API_KEY, "models": {"gpt-5", "gpt-5-mini", "gpt-5-nano", "gpt-4o"}},
+    "avalai": {"base_url": AVALAI_BASE_URL, "api_key": AVALAI_API_KEY, "models": {"gpt-4o"}},
+}
+
+# Weight of the newest latency sample in the moving average
+LATENCY_EWMA_ALPHA = 0.2
+
+
+def add_provider(name: str, base_url: str, api_key: Optional[str], models: Iterable[str]) -> None:
+    """
+    Add or update a provider in the registry.
+
+    Args:
+        name: Provider name
+        base_url: OpenAI-compatible base URL
+        api_key: API key (providers without one are not routed to)
+        models: Models the provider serves ("*" for any)
+    """
+    PROVIDERS[name] = {"base_url": base_url, "api_key": api_key, "models": set(models)}
+
+
+def configured_providers() -> List[str]:
+    """Names of the registered providers that have an API key."""
+    return [name for name, provider in PROVIDERS.items() if provider["api_key"]]
+
+
+class Endpoint:
+    """One provider as seen by the router: clients, models and live statistics."""
+
+    def __init__(self, name: str, base_url: str, api_key: str, models: Set[str]):
+        """
+        Initialize endpoint.
+
+        Args:
+            name: Provider name
+            base_url: OpenAI-compatible base URL
+            api_key: API key
+            models: Models served ("*" for any)
+        """
+        self.name = name
+        self.base_url = base_url
+        self.api_key = api_key
+        self.models = set(models)
+        self.client = create_openai_client(api_key, base_url)
+        self.breaker = get_circuit_breaker(base_url)
+        self.latency: Optional[float] = None
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self._async_client = None
+        self._lock = threading.Lock()
+
+    @property
+    def async_client(self):
+        # Created on first use, inside the caller's event loop
+        if self._async_client is None:
+            self._async_client = create_async_openai_client(self.api_key, self.base_url)
+        return self._async_client
+
+    def serves(self, model: str) -> bool:
+        return "*" in self.models or model in self.models
+
+    def start(self) -> float:
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+        return time.monotonic()
+
+    def finish(self, started: float, ok: Optional[bool]) -> None:
+        # ok=None: the call never completed (cancelled or interrupted)
+        with self._lock:
+            self.in_flight -= 1
+            if ok is None:
+                return
+            if ok:
+                elapsed = time.monotonic() - started
+                self.latency = elapsed if self.latency is None else (
+                    LATENCY_EWMA_ALPHA * elapsed + (1 - LATENCY_EWMA_ALPHA) * self.latency
+                )
+            else:
+                self.failures += 1
+
+
+class ProviderRouter:
+    """Spreads chat completions over providers with failover."""
+
+    def __init__(
+        self,
+        providers: Optional[List[str]] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ):
+        """
+        Initialize provider router.
+
+        Args:
+            providers: Names from PROVIDERS to route to (default: every
+                provider with an API key)
+            rate_limiter: Rate limiter holding each provider's budget
+                (default: the process-wide one)
+            retry_policy: Backoff once every endpoint has failed a request
+        """
+        names = providers or configured_providers()
+        unknown = [name for name in names if name not in PROVIDERS]
+        if unknown:
+            raise ValueError(f"Unknown provider(s) {unknown} (expected some of {list(PROVIDERS)})")
+        missing = [name for name in names if not PROVIDERS[name]["api_key"]]
+        if missing:
+            raise ValueError(f"No API key configured for provider(s) {missing}")
+        if not names:
+            raise ValueError("No provider has an API key configured")
+        self.endpoints = [
+            Endpoint(name, PROVIDERS[name]["base_url"], PROVIDERS[name]["api_key"], PROVIDERS[name]["models"])
+            for name in names
+        ]
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+
+    def cost(self, endpoint: Endpoint, model: str, tokens: int) -> float:
+        """
+        Expected seconds until a request would be answered by an endpoint.
+
+        Args:
+            endpoint: Candidate endpoint
+            model: Model name
+            tokens: Estimated tokens of the request
+
+        Returns:
+            Rate-limit wait plus latency scaled by the requests in flight
+        """
+        wait = self.rate_limiter.get(endpoint.base_url, model).wait_time(tokens)
+        # Unmeasured endpoints cost nothing, so each gets tried (and measured) early
+        latency = endpoint.latency or 0.0
+        return wait + latency * (endpoint.in_flight + 1)
+
+    def select(self, model: str, tokens: int, exclude: Iterable[Endpoint] = ()) -> Optional[Endpoint]:
+        """
+        Pick the cheapest endpoint serving a model.
+
+        Args:
+            model: Model name
+            tokens: Estimated tokens of the request
+            exclude: Endpoints that already failed this request
+
+        Returns:
+            Endpoint, or None if no remaining endpoint serves the model
+        """
+        excluded = set(map(id, exclude))
+        candidates = [
+            endpoint for endpoint in self.endpoints
+            if endpoint.serves(model) and id(endpoint) not in excluded and not endpoint.breaker.is_open
+        ]
+        if not candidates:
+            # Open circuits are tried only when nothing else is left
+            candidates = [
+                endpoint for endpoint in self.endpoints if endpoint.serves(model) and id(endpoint) not in excluded
+            ]
+        return min(candidates, key=lambda endpoint: self.cost(endpoint, model, tokens), default=None)
+
+    def _failed(self, endpoint: Endpoint, model: str, error: Exception) -> bool:
+        """Book a failed attempt; return whether another endpoint may take the request."""
+        kind = classify_error(error)
+        if isinstance(error, openai.NotFoundError):
+            # The provider does not serve this model after all
+            logger.warning(f"{endpoint.name} does not serve {model}; routing it elsewhere")
+            endpoint.models.discard(model)
+            return True
+        if kind == FATAL:
+            # The endpoint answered, so it is up; the request itself is bad
+            endpoint.breaker.record_success()
+            return False
+        if kind == TRANSIENT:
+            endpoint.breaker.record_failure()
+        elif kind == RATE_LIMIT:
+            endpoint.breaker.record_success()
+            self.rate_limiter.get(endpoint.base_url, model).penalize(self.retry_policy.delay(0, error))
+        logger.info(f"{type(error).__name__} from {endpoint.name}; failing over")
+        return True
+
+    def _next(self, model: str, tokens: int, tried: List[Endpoint], attempt: int, error: Optional[Exception]):
+        """Next endpoint to try, and the backoff before it (0 while untried endpoints remain)."""
+        endpoint = self.select(model, tokens, exclude=tried)
+        if endpoint is not None:
+            return endpoint, 0.0
+        if error is not None and attempt + 1 >= self.retry_policy.max_attempts:
+            raise error
+        if not any(endpoint.serves(model) for endpoint in self.endpoints):
+            if error is not None:
+                raise error
+            raise ValueError(f"No configured provider serves model {model}")
+        # Every endpoint failed this round: back off, then start over
+        tried.clear()
+        return self.select(model, tokens), self.retry_policy.delay(attempt, error)
+
+    def call(self, model: str, fn: Callable[[Any], Any], tokens: int = 0) -> Any:
+        """
+        Run a request on the best endpoint, failing over on errors.
+
+        Args:
+            model: Model name
+            fn: Function sending the request with the given OpenAI client
+            tokens: Estimated tokens of the request (for the rate limit)
+
+        Returns:
+            Result of `fn`
+        """
+        tried: List[Endpoint] = []
+        error: Optional[Exception] = None
+        attempt = 0
+        while True:
+            endpoint, wait = self._next(model, tokens, tried, attempt, error)
+            if wait:
+                attempt += 1
+                time.sleep(wait)
+            try:
+                probe = endpoint.breaker.before_call()
+            except CircuitOpenError as e:
+                # Nothing is sent, so no rate budget is taken
+                self._failed(endpoint, model, e)
+                tried.append(endpoint)
+                error = e
+                continue
+            limiter = self.rate_limiter.get(endpoint.base_url, model)
+            try:
+                limiter.acquire(tokens)
+            except BaseException:
+                if probe:
+                    endpoint.breaker.release_probe()
+                raise
+            started = endpoint.start()
+            ok: Optional[bool] = None
+            try:
+                result = fn(endpoint.client)
+                ok = True
+            except Exception as e:
+                ok = False
+                limiter.record_usage(tokens, 0)
+                if not self._failed(endpoint, model, e):
+                    raise
+                tried.append(endpoint)
+                error = e
+                continue
+            except BaseException:
+                if probe:
+                    endpoint.breaker.release_probe()
+                raise
+            finally:
+                endpoint.finish(started, ok=ok)
+            endpoint.breaker.record_success()
+            usage = getattr(result, "usage", None)
+            limiter.record_usage(tokens, getattr(usage, "total_tokens", None))
+            return result
+
+    async def acall(self, model: str, fn: Callable[[Any], Awaitable[Any]], tokens: int = 0) -> Any:
+        """Async variant of `call`; `fn` receives an AsyncOpenAI client."""
+        tried: List[Endpoint] = []
+        error: Optional[Exception] = None
+        attempt = 0
+        while True:
+            endpoint, wait = self._next(model, tokens, tried, attempt, error)
+            if wait:
+                attempt += 1
+                await asyncio.sleep(wait)
+            try:
+                probe = endpoint.breaker.before_call()
+            except CircuitOpenError as e:
+                # Nothing is sent, so no rate budget is taken
+                self._failed(endpoint, model, e)
+                tried.append(endpoint)
+                error = e
+                continue
+            limiter = self.rate_limiter.get(endpoint.base_url, model)
+            try:
+                await limiter.aacquire(tokens)
+            except BaseException:
+                if probe:
+                    endpoint.breaker.release_probe()
+                raise
+            started = endpoint.start()
+            ok: Optional[bool] = None
+            try:
+                result = await fn(endpoint.async_client)
+                ok = True
+            except Exception as e:
+                ok = False
+                limiter.record_usage(tokens, 0)
+                if not self._failed(endpoint, model, e):
+                    raise
+                tried.append(endpoint)
+                error = e
+                continue
+            except BaseException:
+                if probe:
+                    endpoint.breaker.release_probe()
+                raise
+            finally:
+                endpoint.finish(started, ok=ok)
+            endpoint.breaker.record_success()
+            usage = getattr(result, "usage", None)
+            limiter.record_usage(tokens, getattr(usage, "total_tokens", None))
+            return result
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Per-endpoint statistics.
+
+        Returns:
+            List of dictionaries with "provider", "requests", "failures",
+            "latency" (moving average in seconds) and "circuit_open"
+        """
+        return [
+            {
+                "provider": endpoint.name,
+                "requests": endpoint.requests,
+                "failures": endpoint.failures,
+                "latency": endpoint.latency,
+                "circuit_open": endpoint.breaker.is_open,
+            }
+            for endpoint in self.endpoints
+        ]
@@ -0,0 +1,246 @@
+"""
+Token-bucket rate limiting per provider and model.
+
+Budgets (requests per minute and tokens per minute) come from the
+`RATE_LIMITS` registry in `model_params.py`. Callers block only as long as
+the budget requires instead of sleeping a fixed delay between calls.
+"""
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from .model_params import get_rate_limit, normalize_base_url
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket that refills continuously."""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        """
+        Initialize token bucket.
+
+        Args:
+            capacity: Maximum number of tokens the bucket holds
+            refill_per_second: Tokens added per second
+        """
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.level = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        """Add the tokens accrued since the last update (lock must be held)."""
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take `amount` tokens, allowing the bucket to go into debt.
+
+        Reserving up front keeps concurrent callers in arrival order: each
+        caller waits until the debt it added has been refilled.
+
+        Args:
+            amount: Number of tokens to take
+
+        Returns:
+            Seconds the caller must wait before proceeding
+        """
+        with self._lock:
+            self._refill()
+            self.level -= amount
+            if self.level >= 0:
+                return 0.0
+            return -self.level / self.refill_per_second
+
+    def wait_time(self, amount: float) -> float:
+        """
+        Seconds until `amount` tokens are available, without taking them.
+
+        Args:
+            amount: Number of tokens
+
+        Returns:
+            Seconds to wait (0 if available now)
+        """
+        with self._lock:
+            self._refill()
+            return max(0.0, (amount - self.level) / self.refill_per_second)
+
+    def adjust(self, amount: float) -> None:
+        """
+        Return (positive) or take (negative) tokens without waiting.
+
+        Args:
+            amount: Number of tokens to add back to the bucket
+        """
+        with self._lock:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+
+class ProviderRateLimiter:
+    """Requests-per-minute and tokens-per-minute budget for one provider/model."""
+
+    def __init__(self, rpm: int, tpm: int):
+        """
+        Initialize provider rate limiter.
+
+        Args:
+            rpm: Requests per minute
+            tpm: Tokens per minute
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = TokenBucket(rpm, rpm / 60.0)
+        self.tokens = TokenBucket(tpm, tpm / 60.0)
+
+    def reserve(self, tokens: int) -> float:
+        """
+        Reserve one request and `tokens` tokens.
+
+        Args:
+            tokens: Estimated tokens for the request
+
+        Returns:
+            Seconds to wait before sending the request
+        """
+        return max(self.requests.reserve(1), self.tokens.reserve(tokens))
+
+    def wait_time(self, tokens: int) -> float:
+        """
+        Seconds a request of `tokens` tokens would wait now, without reserving.
+
+        Args:
+            tokens: Estimated tokens for the request
+
+        Returns:
+            Seconds to wait (0 while there is headroom)
+        """
+        return max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+
+    def acquire(self, tokens: int) -> float:
+        """
+        Block until the budget allows a request of `tokens` tokens.
+
+        Args:
+            tokens: Estimated tokens for the request
+
+        Returns:
+            Seconds spent waiting
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            logger.debug(f"Rate limiter waiting {wait:.2f}s")
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, tokens: int) -> float:
+        """
+        Async variant of `acquire`.
+
+        Args:
+            tokens: Estimated tokens for the request
+
+        Returns:
+            Seconds spent waiting
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            logger.debug(f"Rate limiter waiting {wait:.2f}s")
+            await asyncio.sleep(wait)
+        return wait
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """
+        Correct the token budget once the real usage is known.
+
+        Args:
+            estimated_tokens: Tokens reserved before the request
+            actual_tokens: Tokens reported by the API (ignored if None)
+        """
+        if actual_tokens is not None:
+            self.tokens.adjust(estimated_tokens - actual_tokens)
+
+    def penalize(self, seconds: float) -> None:
+        """
+        Push the budget into debt after the provider reported a rate limit.
+
+        Subsequent callers wait roughly `seconds` before the next request.
+
+        Args:
+            seconds: How long the provider asked us to back off
+        """
+        self.requests.adjust(-seconds * self.requests.refill_per_second)
+        self.tokens.adjust(-seconds * self.tokens.refill_per_second)
+
+
+class RateLimiter:
+    """Registry of ProviderRateLimiter instances keyed by base URL and model."""
+
+    def __init__(self, limits: Optional[Dict[Tuple[str, str], Dict[str, int]]] = None):
+        """
+        Initialize rate limiter registry.
+
+        Args:
+            limits: Optional overrides keyed by (base_url, model); anything not
+                listed is looked up in the model_params registry on first use
+        """
+        self._overrides = {
+            (normalize_base_url(url), model): budget
+            for (url, model), budget in (limits or {}).items()
+        }
+        self._limiters: Dict[Tuple[str, str], ProviderRateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, base_url: str, model: str) -> ProviderRateLimiter:
+        """
+        Get the limiter for a provider/model, creating it on first use.
+
+        Args:
+            base_url: Provider base URL
+            model: Model name
+
+        Returns:
+            ProviderRateLimiter instance
+        """
+        key = (normalize_base_url(base_url), model)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                budget = self._overrides.get(key) or get_rate_limit(model, base_url)
+                logger.debug(f"Rate limit for {model} at {key[0]}: {budget['rpm']} rpm, {budget['tpm']} tpm")
+                limiter = ProviderRateLimiter(budget["rpm"], budget["tpm"])
+                self._limiters[key] = limiter
+            return limiter
+
+    def acquire(self, base_url: str, model: str, tokens: int) -> float:
+        """Block until the provider/model budget allows the request."""
+        return self.get(base_url, model).acquire(tokens)
+
+    async def aacquire(self, base_url: str, model: str, tokens: int) -> float:
+        """Async variant of `acquire`."""
+        return await self.get(base_url, model).aacquire(tokens)
+
+
+_shared_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Get the process-wide rate limiter shared by all clients.
+
+    Returns:
+        Shared RateLimiter instance
+    """
+    global _shared_rate_limiter
+    if _shared_rate_limiter is None:
+        _shared_rate_limiter = RateLimiter()
+    return _shared_rate_limiter
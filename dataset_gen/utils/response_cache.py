@@ -0,0 +1,204 @@
+"""
+Content-addressed on-disk cache for chat completion responses.
+
+Responses are keyed by a hash of the model, the filtered generation
+parameters and the message payload, so re-running a half-finished job only
+pays for the requests that never completed.
+"""
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from openai.types.chat import ChatCompletion
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+
+class CacheMissError(LookupError):
+    """Raised in replay mode when a request is not in the cache."""
+
+
+class ResponseCache:
+    """SQLite-backed response cache with TTL and size-based eviction."""
+
+    def __init__(
+        self,
+        path: str = "cache/llm_responses.sqlite",
+        ttl_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        replay: bool = False,
+    ):
+        """
+        Initialize response cache.
+
+        Args:
+            path: Path to the SQLite database file
+            ttl_seconds: Entries older than this are ignored and evicted (None keeps forever)
+            max_bytes: Evict least recently used entries beyond this total size (None is unbounded)
+            replay: Read-only replay mode; misses raise CacheMissError instead of calling the API
+
+        Raises:
+            FileNotFoundError: In replay mode, if the cache file does not exist
+        """
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.replay = replay
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        if self.replay:
+            # Opened read-only: replaying never creates, migrates or writes the cache
+            if not self.path.is_file():
+                raise FileNotFoundError(f"No response cache to replay at {self.path}")
+            self._conn = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+            self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        if not self.replay:
+            self.evict()
+
+    @staticmethod
+    def make_key(model: str, params: Dict[str, Any], messages: List[Any]) -> str:
+        """
+        Build the cache key for a request.
+
+        Args:
+            model: Model name
+            params: Generation parameters from `build_generation_params`
+            messages: Message payload sent to the API
+
+        Returns:
+            Hex SHA-256 digest of the canonical request
+        """
+        canonical = json.dumps(
+            {"model": model, "params": params, "messages": messages},
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[ChatCompletion]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Cache key from `make_key`
+
+        Returns:
+            Cached ChatCompletion, or None on a miss
+
+        Raises:
+            CacheMissError: On a miss in replay mode
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            expired = row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds
+            if row is None or expired:
+                self.misses += 1
+            else:
+                self.hits += 1
+                if not self.replay:
+                    self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                    self._conn.commit()
+
+        if row is None or expired:
+            if self.replay:
+                raise CacheMissError(f"No cached response for request {key[:12]}")
+            return None
+
+        logger.debug(f"Cache hit for request {key[:12]}")
+        return ChatCompletion.model_validate_json(row[0])
+
+    def put(self, key: str, model: str, response: Any) -> None:
+        """
+        Store a response (no-op in replay mode).
+
+        Args:
+            key: Cache key from `make_key`
+            model: Model name
+            response: ChatCompletion returned by the API
+        """
+        if self.replay:
+            return
+        data = response.model_dump_json()
+        size = len(data.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, data, size, now, now),
+            )
+            self._conn.commit()
+            self._total_bytes += size - (old[0] if old else 0)
+        if self.max_bytes is not None and self._total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove expired entries, then least recently used ones until under `max_bytes`.
+
+        Returns:
+            Number of entries removed
+        """
+        removed = 0
+        with self._lock:
+            if self.ttl_seconds is not None:
+                cursor = self._conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+                )
+                removed += cursor.rowcount
+                self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+            if self.max_bytes is not None and self._total_bytes > self.max_bytes:
+                rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_used ASC").fetchall()
+                stale = []
+                for key, size in rows:
+                    if self._total_bytes <= self.max_bytes:
+                        break
+                    stale.append((key,))
+                    self._total_bytes -= size
+                self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+                removed += len(stale)
+            self._conn.commit()
+
+        if removed:
+            logger.debug(f"Evicted {removed} cached response(s)")
+        return removed
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,372 @@
+"""
+Shared retry policy for API calls.
+
+Errors are classified by OpenAI exception type and HTTP status code:
+rate limits and transient failures (timeouts, connection errors, 5xx) are
+retried with jittered exponential backoff, honouring the provider's
+`Retry-After` header; client errors (bad request, authentication, ...) are
+raised at once. A circuit breaker per endpoint stops hammering a provider
+that keeps failing and lets a single probe through once it has cooled down.
+"""
+import time
+import random
+import asyncio
+import logging
+import threading
+import email.utils
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+import openai
+
+from .model_params import normalize_base_url
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Error classes
+RATE_LIMIT = "rate_limit"
+TRANSIENT = "transient"
+CIRCUIT_OPEN = "circuit_open"
+FATAL = "fatal"
+
+# Status codes worth retrying besides 429 and 5xx
+RETRYABLE_STATUS_CODES = {408, 409}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit breaker is open."""
+
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"Circuit open for {endpoint}; next probe in {retry_in:.1f}s")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    Classify an exception raised by an API call.
+
+    Args:
+        error: Exception raised by the OpenAI client (or httpx)
+
+    Returns:
+        RATE_LIMIT, TRANSIENT, CIRCUIT_OPEN or FATAL
+    """
+    if isinstance(error, CircuitOpenError):
+        return CIRCUIT_OPEN
+    if isinstance(error, openai.RateLimitError):
+        return RATE_LIMIT
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, httpx.TransportError)):
+        return TRANSIENT
+    if isinstance(error, openai.APIStatusError):
+        status = error.status_code
+        if status == 429:
+            return RATE_LIMIT
+        if status >= 500 or status in RETRYABLE_STATUS_CODES:
+            return TRANSIENT
+    return FATAL
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    Seconds the provider asked to wait before retrying.
+
+    Reads `retry-after-ms`, then `retry-after` (seconds or HTTP date) from
+    the error's response.
+
+    Args:
+        error: Exception raised by the OpenAI client
+
+    Returns:
+        Seconds to wait, or None if the response did not say
+    """
+    if isinstance(error, CircuitOpenError):
+        return error.retry_in
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers["retry-after-ms"]) / 1000
+    except (KeyError, TypeError, ValueError):
+        pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        parsed = email.utils.parsedate_tz(value)
+        return max(0.0, email.utils.mktime_tz(parsed) - time.time()) if parsed else None
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one endpoint (thread-safe).
+
+    Opens after `failure_threshold` transient failures in a row; while open
+    calls fail fast with CircuitOpenError. After `reset_timeout` seconds one
+    probe call is let through; its success closes the circuit, its failure
+    opens it again. Rate limits do not count as failures (the endpoint is
+    alive and the rate limiter handles them).
+    """
+
+    def __init__(self, endpoint: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize circuit breaker.
+
+        Args:
+            endpoint: Name used in errors and logs (the base URL)
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a probe
+        """
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def before_call(self) -> bool:
+        """
+        Check the circuit before a call.
+
+        Returns:
+            True if the call is the probe of an open circuit; the caller must
+            then record its outcome or `release_probe` if it never finishes
+
+        Raises:
+            CircuitOpenError: While the circuit is open (or another probe is running)
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0 or self._probing:
+                raise CircuitOpenError(self.endpoint, max(remaining, 1.0))
+            self._probing = True
+            return True
+
+    def release_probe(self) -> None:
+        """Give up a probe that was cancelled or interrupted; the next call probes again."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info(f"Circuit for {self.endpoint} closed")
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+                logger.warning(
+                    f"Circuit for {self.endpoint} opened after {self.failures} consecutive failure(s); "
+                    f"pausing calls for {self.reset_timeout:.0f}s"
+                )
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(base_url: str) -> CircuitBreaker:
+    """
+    Get the process-wide circuit breaker of an endpoint.
+
+    Args:
+        base_url: Provider base URL
+
+    Returns:
+        Shared CircuitBreaker instance
+    """
+    key = normalize_base_url(base_url)
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(key)
+            _breakers[key] = breaker
+        return breaker
+
+
+class RetryPolicy:
+    """Jittered exponential backoff for retryable API errors."""
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 1.0, max_delay: float = 60.0):
+        """
+        Initialize retry policy.
+
+        Args:
+            max_attempts: Attempts per call, including the first
+            base_delay: Backoff before the first retry (doubles per retry)
+            max_delay: Upper bound on the computed backoff
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, error: BaseException, attempt: int) -> bool:
+        """
+        Whether a failed attempt is retried.
+
+        Args:
+            error: Exception of the attempt
+            attempt: Zero-based attempt number
+
+        Returns:
+            True for retryable errors while attempts remain
+        """
+        return attempt + 1 < self.max_attempts and classify_error(error) != FATAL
+
+    def delay(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """
+        Seconds to wait before the next attempt.
+
+        `Retry-After` is honoured when present; otherwise "full jitter"
+        backoff is used (uniform in [0, min(max_delay, base_delay * 2**attempt)]).
+
+        Args:
+            attempt: Zero-based number of the attempt that failed
+            error: Exception of the attempt
+
+        Returns:
+            Seconds to wait
+        """
+        requested = retry_after(error) if error is not None else None
+        if requested is not None:
+            return requested + random.uniform(0, 0.1 * requested)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+def _describe(error: BaseException) -> str:
+    status = getattr(error, "status_code", None)
+    return f"{type(error).__name__}" + (f" ({status})" if status else "")
+
+
+def retry_call(
+    fn: Callable[[], T],
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    limiter: Optional[Any] = None,
+    on_retry: Optional[Callable[[BaseException, int, float], None]] = None,
+) -> T:
+    """
+    Call `fn`, retrying retryable errors.
+
+    Args:
+        fn: Function making one API call
+        policy: Retry policy (default: RetryPolicy())
+        breaker: Circuit breaker of the endpoint (optional)
+        limiter: ProviderRateLimiter that `fn` acquires before each call;
+            rate limits push it into debt instead of sleeping, so concurrent
+            callers back off too (optional)
+        on_retry: Called with (error, attempt, delay) before each retry
+
+    Returns:
+        Result of `fn`
+
+    Raises:
+        The last error once it is not retryable or attempts are exhausted
+    """
+    policy = policy or RetryPolicy()
+    attempt = 0
+    while True:
+        probe = False
+        try:
+            if breaker is not None:
+                probe = breaker.before_call()
+            result = fn()
+        except Exception as e:
+            wait = _on_error(e, attempt, policy, breaker, limiter, on_retry)
+            if wait is None:
+                raise
+            # Rate limits wait through the shared limiter's next acquire
+            if classify_error(e) != RATE_LIMIT or limiter is None:
+                time.sleep(wait)
+            attempt += 1
+            continue
+        except BaseException:
+            # KeyboardInterrupt etc.: do not leave the circuit stuck in probing
+            if probe:
+                breaker.release_probe()
+            raise
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+
+async def aretry_call(
+    fn: Callable[[], Awaitable[T]],
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    limiter: Optional[Any] = None,
+    on_retry: Optional[Callable[[BaseException, int, float], None]] = None,
+) -> T:
+    """Async variant of `retry_call`; `fn` returns an awaitable."""
+    policy = policy or RetryPolicy()
+    attempt = 0
+    while True:
+        probe = False
+        try:
+            if breaker is not None:
+                probe = breaker.before_call()
+            result = await fn()
+        except Exception as e:
+            wait = _on_error(e, attempt, policy, breaker, limiter, on_retry)
+            if wait is None:
+                raise
+            if classify_error(e) != RATE_LIMIT or limiter is None:
+                await asyncio.sleep(wait)
+            attempt += 1
+            continue
+        except BaseException:
+            # Cancelled (e.g. a sibling task failed): free the probe slot
+            if probe:
+                breaker.release_probe()
+            raise
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+
+def _on_error(
+    error: Exception,
+    attempt: int,
+    policy: RetryPolicy,
+    breaker: Optional[CircuitBreaker],
+    limiter: Optional[Any],
+    on_retry: Optional[Callable[[BaseException, int, float], None]],
+) -> Optional[float]:
+    """Book a failed attempt; return the backoff, or None if the error is final."""
+    kind = classify_error(error)
+    if breaker is not None and kind == TRANSIENT:
+        breaker.record_failure()
+    elif breaker is not None and kind != CIRCUIT_OPEN:
+        # The endpoint answered (rate limit or client error), so it is up
+        breaker.record_success()
+    if not policy.should_retry(error, attempt):
+        return None
+    wait = policy.delay(attempt, error)
+    if kind == RATE_LIMIT and limiter is not None:
+        limiter.penalize(wait)
+    logger.warning(
+        f"{_describe(error)} on attempt {attempt + 1}/{policy.max_attempts}; retrying in {wait:.1f}s"
+        + (" (rate limited)" if kind == RATE_LIMIT else "")
+    )
+    if on_retry is not None:
+        on_retry(error, attempt, wait)
+    return wait
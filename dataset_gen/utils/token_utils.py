@@ -120,3 +120,27 @@ def estimate_run_tokens(
         "total": input_tokens + output_tokens
     }
 
+
+def compare_token_counts(
+    before: str,
+    after: str,
+    model: str = DEFAULT_MODEL
+) -> Dict[str, int]:
+    """
+    Compare token counts of two renderings of the same prompt content.
+    
+    Args:
+        before: Original text
+        after: Replacement text
+        model: Model name
+    
+    Returns:
+        Dictionary with before_tokens, after_tokens, and saved_tokens
+    """
+    before_tokens = num_tokens_from_string(before, model)
+    after_tokens = num_tokens_from_string(after, model)
+    return {
+        "before_tokens": before_tokens,
+        "after_tokens": after_tokens,
+        "saved_tokens": before_tokens - after_tokens
+    }